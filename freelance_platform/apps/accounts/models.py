@@ -1,13 +1,16 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
-from apps.common.models import BaseModel, chinese_phone_validator, wechat_id_validator, PROVINCE_CHOICES
+from apps.common.models import BaseModel, FieldSnapshotModel, chinese_phone_validator, wechat_id_validator, PROVINCE_CHOICES
 import uuid
 
 
-class User(AbstractUser, BaseModel):
+class User(FieldSnapshotModel, AbstractUser, BaseModel):
     """Extended User model for freelance platform"""
 
+    # Embedded in order search documents (see apps.orders.signals)
+    snapshot_fields = ('username',)
+
     USER_TYPE_CHOICES = [
         ('client', '客户'),
         ('freelancer', '自由职业者'),
@@ -0,0 +1,156 @@
+"""
+Write-behind event buffers
+Requests append events and bump per-key counters in memory or Redis; a flusher
+drains them in batches and hands each batch to a writer callback
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BaseEventBuffer:
+    """
+    Base class for event buffers
+
+    ``write_batch(events, counts)`` receives up to ``batch_size`` raw events and
+    the coalesced per-key counters accumulated since the last drain.
+    """
+
+    def __init__(self, name, write_batch, max_size=10000, batch_size=1000, flush_interval=10):
+        self.name = name
+        self.write_batch = write_batch
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def add(self, key, event=None):
+        """Count one occurrence of ``key`` and, if given, queue the raw ``event``"""
+        raise NotImplementedError
+
+    def drain(self):
+        """Remove and return ``(events, counts)`` for the next batch"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Drain the buffer and write it out; returns the number of raw events written"""
+        written = 0
+        while True:
+            events, counts = self.drain()
+            if not events and not counts:
+                break
+            self.write_batch(events, counts)
+            written += len(events)
+            if len(events) < self.batch_size:
+                break
+        return written
+
+
+class MemoryEventBuffer(BaseEventBuffer):
+    """Per-process buffer flushed by a background thread"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._events = deque()
+        self._counts = Counter()
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, key, event=None):
+        with self._lock:
+            # Counters are bounded by the number of keys, so they are always kept;
+            # raw rows are shed once the buffer is full
+            self._counts[key] += 1
+            if event is not None:
+                if len(self._events) < self.max_size:
+                    self._events.append(event)
+                else:
+                    self._dropped += 1
+        self._ensure_flusher()
+
+    def drain(self):
+        with self._lock:
+            events = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            counts, self._counts = self._counts, Counter()
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            logger.warning(f"{self.name} buffer full, dropped {dropped} raw records")
+        return events, counts
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name=f'{self.name}-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"{self.name} flush failed: {str(e)}")
+            finally:
+                close_old_connections()
+
+
+class RedisEventBuffer(BaseEventBuffer):
+    """Buffer shared by all workers, flushed by a Celery beat task"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import redis
+
+        self.client = redis.Redis.from_url(getattr(settings, 'REDIS_URL', 'redis://localhost:6379/0'))
+        self.events_key = f'{self.name}:events'
+        self.counts_key = f'{self.name}:counts'
+
+    def add(self, key, event=None):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hincrby(self.counts_key, key, 1)
+        if event is not None:
+            pipe.rpush(self.events_key, json.dumps(event))
+        results = pipe.execute()
+
+        if event is not None and results[-1] > self.max_size:
+            # Backpressure: trim raw events back to the limit, counters stay exact
+            self.client.ltrim(self.events_key, 0, self.max_size - 1)
+
+    def drain(self):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrange(self.events_key, 0, self.batch_size - 1)
+        pipe.ltrim(self.events_key, self.batch_size, -1)
+        pipe.hgetall(self.counts_key)
+        pipe.delete(self.counts_key)
+        raw_events, _, raw_counts, _ = pipe.execute()
+
+        events = [json.loads(raw) for raw in raw_events]
+        counts = {key.decode(): int(count) for key, count in raw_counts.items()}
+        return events, counts
+
+
+EVENT_BUFFERS = {
+    'memory': MemoryEventBuffer,
+    'redis': RedisEventBuffer,
+}
+
+
+def create_event_buffer(backend, name, write_batch, **options):
+    """Instantiate the buffer class registered for ``backend``"""
+    try:
+        buffer_class = EVENT_BUFFERS[backend]
+    except KeyError:
+        raise ValueError(f"Unsupported event buffer backend: {backend}")
+    return buffer_class(name, write_batch, **options)
@@ -0,0 +1,27 @@
+"""
+Client address extraction
+Forwarded headers are client controlled, so every candidate is parsed with
+``ipaddress`` before it can reach an inet column
+"""
+import ipaddress
+
+
+def normalize_ip(value):
+    """``value`` as a canonical IP address string, or None when it is not one"""
+    try:
+        return str(ipaddress.ip_address((value or '').strip()))
+    except ValueError:
+        return None
+
+
+def get_client_ip(request):
+    """
+    The first ``X-Forwarded-For`` entry when it is a valid address, otherwise
+    ``REMOTE_ADDR``; None when neither holds a usable address
+    """
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded:
+        ip_address = normalize_ip(forwarded.split(',')[0])
+        if ip_address:
+            return ip_address
+    return normalize_ip(request.META.get('REMOTE_ADDR'))
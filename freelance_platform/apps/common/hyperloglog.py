@@ -0,0 +1,63 @@
+"""
+HyperLogLog cardinality sketch
+Mergeable approximate distinct counting for analytics rollups
+"""
+import hashlib
+import math
+
+DEFAULT_PRECISION = 10  # 1024 registers, ~3% standard error
+
+
+class HyperLogLog:
+    """HyperLogLog sketch stored as one byte per register"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError("Register count does not match precision")
+
+    @classmethod
+    def from_bytes(cls, data, precision=DEFAULT_PRECISION):
+        """Load a sketch serialized with ``to_bytes``; empty data gives an empty sketch"""
+        if not data:
+            return cls(precision)
+        data = bytes(data)
+        return cls(len(data).bit_length() - 1, data)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch (union of the counted sets)"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Estimated number of distinct values added"""
+        size = self.size
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+
+        # Small range correction: linear counting while registers are still empty
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
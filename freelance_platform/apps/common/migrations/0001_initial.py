@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='名称')),
+                ('high_water_mark', models.DateTimeField(blank=True, null=True, verbose_name='高水位')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '汇总检查点',
+                'verbose_name_plural': '汇总检查点',
+                'db_table': 'common_rollup_checkpoint',
+            },
+        ),
+    ]
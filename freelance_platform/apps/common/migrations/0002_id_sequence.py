@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+ID_SEQUENCES = ['order', 'transaction', 'payout_batch']
+
+
+def create_sequences(apps, schema_editor):
+    # PostgreSQL allocates ID blocks from native sequences; other databases use IdSequence rows
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in ID_SEQUENCES:
+            schema_editor.execute(f"CREATE SEQUENCE IF NOT EXISTS common_id_seq_{name}")
+
+
+def drop_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name in ID_SEQUENCES:
+            schema_editor.execute(f"DROP SEQUENCE IF EXISTS common_id_seq_{name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='名称')),
+                ('last_value', models.BigIntegerField(default=0, verbose_name='已分配到')),
+            ],
+            options={
+                'verbose_name': '编号序列',
+                'verbose_name_plural': '编号序列',
+                'db_table': 'common_id_sequence',
+            },
+        ),
+        migrations.RunPython(create_sequences, drop_sequences),
+    ]
@@ -49,6 +49,80 @@ class BaseModel(UUIDModel, TimeStampedModel, SoftDeleteModel):
         abstract = True
 
 
+class FieldSnapshotModel(models.Model):
+    """
+    Abstract base remembering the stored values of ``snapshot_fields``, so
+    ``field_changed()`` can tell what a save will change without a query
+    """
+    snapshot_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot(instance.snapshot_fields)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._take_snapshot(self.snapshot_fields if fields is None else set(self.snapshot_fields).intersection(fields))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self._take_snapshot(
+            self.snapshot_fields if update_fields is None else set(self.snapshot_fields).intersection(update_fields)
+        )
+
+    def _take_snapshot(self, fields):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for field in fields:
+            # Deferred fields are not in __dict__ and stay unknown
+            if field in self.__dict__:
+                loaded[field] = self.__dict__[field]
+
+    def field_changed(self, field, update_fields=None):
+        """
+        Whether saving with ``update_fields`` is about to change ``field``;
+        assumed so when its stored value was never loaded
+        """
+        if self._state.adding or (update_fields is not None and field not in update_fields):
+            return False
+        loaded = self.__dict__.get('_loaded_values', {})
+        return field not in loaded or loaded[field] != getattr(self, field)
+
+
+class RollupCheckpoint(models.Model):
+    """High-water mark for incremental aggregation jobs"""
+    name = models.CharField('名称', max_length=100, unique=True)
+    high_water_mark = models.DateTimeField('高水位', null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'common_rollup_checkpoint'
+        verbose_name = '汇总检查点'
+        verbose_name_plural = '汇总检查点'
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
+
+
+class IdSequence(models.Model):
+    """Counter backing block ID allocation on databases without native sequences"""
+    name = models.CharField('名称', max_length=100, unique=True)
+    last_value = models.BigIntegerField('已分配到', default=0)
+
+    class Meta:
+        db_table = 'common_id_sequence'
+        verbose_name = '编号序列'
+        verbose_name_plural = '编号序列'
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+
 # Country/Region choices for Chinese market
 PROVINCE_CHOICES = [
     ('beijing', 'Beijing'),
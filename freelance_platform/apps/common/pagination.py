@@ -0,0 +1,288 @@
+"""
+Keyset pagination
+Seeks past the last row of the previous page on the queryset's own ordering
+columns instead of using OFFSET, so every page costs the same and no COUNT runs
+"""
+import datetime
+import json
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SALT = 'apps.common.pagination.keyset'
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """Keeps full microsecond precision, which DjangoJSONEncoder truncates"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class _CursorSerializer:
+    """JSON serializer for signed cursors that also handles datetimes, decimals and UUIDs"""
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), cls=_CursorEncoder).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def get_ordering_keys(queryset):
+    """
+    Return ``[(name, descending), ...]`` for the queryset's effective ordering,
+    with the primary key appended as a tie-breaker so the order is total
+    """
+    ordering = queryset.query.order_by
+    if not ordering and queryset.query.default_ordering:
+        ordering = queryset.model._meta.ordering
+
+    keys = []
+    for item in ordering:
+        if isinstance(item, OrderBy) and isinstance(item.expression, F):
+            name, descending = item.expression.name, item.descending
+        elif isinstance(item, str) and item != '?':
+            name, descending = item.lstrip('-'), item.startswith('-')
+        else:
+            raise ValueError(f"Keyset pagination cannot seek on ordering {item!r}")
+        if name == 'pk':
+            name = queryset.model._meta.pk.name
+        keys.append((name, descending))
+
+    pk_name = queryset.model._meta.pk.name
+    if pk_name not in [name for name, _ in keys]:
+        keys.append((pk_name, keys[-1][1] if keys else False))
+    return keys
+
+
+def approximate_count(queryset):
+    """
+    Planner row estimate for ``queryset``, or None when the database has none
+
+    Only PostgreSQL exposes a cheap estimate; other backends return None rather
+    than falling back to COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Could not estimate row count: {str(e)}")
+        return None
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over any combination of ordering columns
+
+    The cursor is a signed snapshot of the boundary row's ordering values, so it
+    is opaque to clients and cannot be tampered with. NULLs always sort last.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'include_total'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE', 20)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.set_ordering(queryset)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true', 'True'):
+            self.count = approximate_count(queryset)
+
+        values, reverse = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.get_order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self.get_seek_filter(values, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Walking backwards, the page we came from is always there; walking
+        # forwards, an earlier page exists whenever a cursor was supplied
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else values is not None
+        self.page = rows
+        return rows
+
+    def set_ordering(self, queryset):
+        self.keys = get_ordering_keys(queryset)
+        self.signature = [f"{'-' if descending else ''}{name}" for name, descending in self.keys]
+        self.model = queryset.model
+
+    def get_cursor_link(self, queryset, url, row, reverse=False):
+        """
+        Link into the endpoint at ``url`` (which paginates ``queryset``) for the
+        page after ``row``, or before it when ``reverse`` is set
+
+        Lets a response that embeds a preview of a list hand out the cursor
+        where the full list continues.
+        """
+        self.base_url = url
+        self.set_ordering(queryset)
+        return self.encode_cursor(row, reverse)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_order_by(self, reverse):
+        order_by = []
+        for name, descending in self.keys:
+            if reverse:
+                order_by.append(F(name).asc(nulls_first=True) if descending else F(name).desc(nulls_first=True))
+            else:
+                order_by.append(F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True))
+        return order_by
+
+    def get_seek_filter(self, values, reverse):
+        """Rows strictly after (or, walking backwards, before) the boundary row"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self.keys, values):
+            if value is None:
+                # NULLs sort last: nothing follows them, every non-NULL precedes them
+                beyond = Q(**{f'{name}__isnull': False}) if reverse else None
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                lookup = 'lt' if descending != reverse else 'gt'
+                beyond = Q(**{f'{name}__{lookup}': value})
+                if not reverse:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+
+            if beyond is not None:
+                condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def get_row_values(self, row):
+        values = []
+        for name, _ in self.keys:
+            value = row
+            for part in name.split('__'):
+                value = getattr(value, part) if value is not None else None
+            values.append(value)
+        return values
+
+    def encode_cursor(self, row, reverse):
+        payload = {'o': self.signature, 'v': self.get_row_values(row), 'r': int(reverse)}
+        cursor = signing.dumps(payload, salt=CURSOR_SALT, serializer=_CursorSerializer, compress=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """Return ``(values, reverse)`` from the request, ``(None, False)`` on the first page"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT, serializer=_CursorSerializer)
+        except signing.BadSignature:
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor only makes sense for the ordering it was issued under
+        if payload.get('o') != self.signature or len(payload.get('v', [])) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+
+        values = [self.to_python(name, value) for (name, _), value in zip(self.keys, payload['v'])]
+        return values, bool(payload.get('r'))
+
+    def to_python(self, name, value):
+        if value is None:
+            return None
+        model = self.model
+        try:
+            *path, last = name.split('__')
+            for part in path:
+                model = model._meta.get_field(part).related_model
+            return model._meta.get_field(last).to_python(value)
+        except (FieldDoesNotExist, AttributeError):
+            # Annotations such as search rank have no model field; JSON already round-trips them
+            return value
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'results': data
+        }
+        if self.count is not None:
+            response['approximate_count'] = self.count
+        return Response(response)
+
+
+class KeysetOptInPagination(BasePagination):
+    """
+    Page-number pagination by default, keyset pagination on request
+
+    Clients opt in with ``?pagination=cursor`` (or by following a cursor link);
+    existing clients keep the page-number response unchanged.
+    """
+    page_number_class = PageNumberPagination
+    keyset_class = KeysetPagination
+    mode_query_param = 'pagination'
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.paginator = self.keyset_class()
+        else:
+            self.paginator = self.page_number_class()
+        return self.paginator.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_number_class().get_schema_operation_parameters(view)
@@ -0,0 +1,178 @@
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .buffers import MemoryEventBuffer
+from .client_ip import get_client_ip
+from .ids import COUNTER_DIGITS, BlockIdAllocator, generate_number
+from .models import RollupCheckpoint
+from .pagination import KeysetPagination
+
+
+class KeysetPaginationTests(TestCase):
+    """游标分页：按排序列定位，重复值与 NULL 不丢行、不重复"""
+
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now().replace(microsecond=123456)
+        # Pairs share a timestamp so the primary key has to break ties; two rows have none
+        for i in range(10):
+            RollupCheckpoint.objects.create(
+                name=f'checkpoint-{i}',
+                high_water_mark=None if i >= 8 else base - timedelta(seconds=i // 2)
+            )
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def get_queryset(self):
+        return RollupCheckpoint.objects.order_by('-high_water_mark')
+
+    def paginate(self, params=None, queryset=None):
+        paginator = KeysetPagination()
+        request = Request(self.factory.get('/checkpoints/', params or {}))
+        rows = paginator.paginate_queryset(queryset if queryset is not None else self.get_queryset(), request)
+        return paginator, [row.name for row in rows]
+
+    def cursor(self, link):
+        return parse_qs(urlparse(link).query)['cursor'][0]
+
+    def expected_names(self):
+        return list(
+            RollupCheckpoint.objects.order_by('-high_water_mark', '-id').values_list('name', flat=True)
+        )
+
+    def test_forward_walk_returns_every_row_once_in_order(self):
+        seen = []
+        paginator, names = self.paginate({'page_size': 3})
+        seen.extend(names)
+        self.assertIsNone(paginator.get_previous_link())
+        while paginator.get_next_link():
+            paginator, names = self.paginate({'page_size': 3, 'cursor': self.cursor(paginator.get_next_link())})
+            seen.extend(names)
+
+        # NULL timestamps sort last on every page boundary
+        self.assertEqual(seen, self.expected_names())
+        self.assertEqual(seen[-2:], ['checkpoint-9', 'checkpoint-8'])
+
+    def test_previous_link_returns_the_preceding_page(self):
+        first, first_names = self.paginate({'page_size': 4})
+        second, _ = self.paginate({'page_size': 4, 'cursor': self.cursor(first.get_next_link())})
+        back, back_names = self.paginate({'page_size': 4, 'cursor': self.cursor(second.get_previous_link())})
+        self.assertEqual(back_names, first_names)
+
+    def test_cursor_keeps_microseconds(self):
+        paginator, names = self.paginate({'page_size': 1})
+        _, next_names = self.paginate({'page_size': 1, 'cursor': self.cursor(paginator.get_next_link())})
+        self.assertEqual(next_names, self.expected_names()[1:2])
+
+    def test_tampered_cursor_is_rejected(self):
+        paginator, _ = self.paginate({'page_size': 3})
+        cursor = self.cursor(paginator.get_next_link())
+        with self.assertRaises(NotFound):
+            self.paginate({'cursor': cursor[:-2] + ('AA' if not cursor.endswith('AA') else 'BB')})
+
+    def test_cursor_from_another_ordering_is_rejected(self):
+        paginator, _ = self.paginate({'page_size': 3})
+        with self.assertRaises(NotFound):
+            self.paginate(
+                {'cursor': self.cursor(paginator.get_next_link())},
+                queryset=RollupCheckpoint.objects.order_by('name')
+            )
+
+
+class BlockIdAllocatorTests(TestCase):
+    """编号分配：每个进程按块预取，块之间不重叠"""
+    # Only sequence names created by the common migrations exist on PostgreSQL
+
+    def test_values_come_from_one_block_until_it_is_used_up(self):
+        allocator = BlockIdAllocator('order', block_size=5)
+        first = allocator.next_value()
+        with self.assertNumQueries(0):
+            rest = [allocator.next_value() for _ in range(4)]
+        self.assertEqual([first] + rest, list(range(first, first + 5)))
+
+    def test_allocators_sharing_a_sequence_get_disjoint_blocks(self):
+        one = BlockIdAllocator('transaction', block_size=3)
+        two = BlockIdAllocator('transaction', block_size=3)
+        values = [one.next_value(), two.next_value(), one.next_value(), two.next_value()]
+        self.assertEqual(len(set(values)), len(values))
+        self.assertEqual(values[2], values[0] + 1)
+        self.assertGreaterEqual(abs(values[1] - values[0]), 3)
+
+    def test_reset_drops_the_prefetched_block(self):
+        allocator = BlockIdAllocator('payout_batch', block_size=10)
+        first = allocator.next_value()
+        allocator.reset()
+        self.assertGreaterEqual(allocator.next_value(), first + 10)
+
+    def test_generated_numbers_carry_prefix_and_date(self):
+        number = generate_number('order', 'ORD')
+        self.assertTrue(number.startswith(f"ORD{timezone.localdate():%Y%m%d}"))
+        self.assertEqual(len(number), 3 + 8 + COUNTER_DIGITS)
+        self.assertLess(number, generate_number('order', 'ORD'))
+
+
+class ClientIpTests(TestCase):
+    """客户端地址：转发头无效时回退到 REMOTE_ADDR"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def test_first_forwarded_address_wins(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='203.0.113.7, 10.0.0.1', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(get_client_ip(request), '203.0.113.7')
+
+    def test_invalid_forwarded_entry_falls_back_to_remote_addr(self):
+        for header in ('unknown', '1.2.3.4:80', '', '999.1.1.1'):
+            request = self.factory.get('/', HTTP_X_FORWARDED_FOR=header, REMOTE_ADDR='10.0.0.2')
+            self.assertEqual(get_client_ip(request), '10.0.0.2', header)
+
+    def test_no_usable_address(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='unknown', REMOTE_ADDR='')
+        self.assertIsNone(get_client_ip(request))
+
+
+class MemoryEventBufferTests(SimpleTestCase):
+    """内存事件缓冲：按批次排空，满载时丢弃原始事件但保留计数"""
+
+    def setUp(self):
+        # Flushes are driven by the test, not the background thread
+        flusher = mock.patch.object(MemoryEventBuffer, '_ensure_flusher')
+        flusher.start()
+        self.addCleanup(flusher.stop)
+
+    def create(self, **options):
+        self.batches = []
+        return MemoryEventBuffer(
+            'test', lambda events, counts: self.batches.append((events, dict(counts))), **options
+        )
+
+    def test_flush_drains_events_in_batches(self):
+        buffer = self.create(batch_size=3)
+        for i in range(7):
+            buffer.add('a' if i % 2 else 'b', {'n': i})
+
+        self.assertEqual(buffer.flush(), 7)
+        self.assertEqual([[event['n'] for event in events] for events, _ in self.batches], [[0, 1, 2], [3, 4, 5], [6]])
+        # Counters are handed over once, with the first batch
+        self.assertEqual([counts for _, counts in self.batches], [{'a': 3, 'b': 4}, {}, {}])
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(self.batches), 3)
+
+    def test_full_buffer_sheds_events_and_keeps_counts(self):
+        buffer = self.create(max_size=2)
+        for i in range(5):
+            buffer.add('a', {'n': i})
+        buffer.add('b')
+
+        with self.assertLogs('apps.common.buffers', 'WARNING') as logs:
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.batches, [([{'n': 0}, {'n': 1}], {'a': 5, 'b': 1})])
+        self.assertIn('dropped 3', logs.output[0])
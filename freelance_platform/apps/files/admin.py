@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import StoredFile, FileUpload
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'content_type', 'created_at')
+    search_fields = ('sha256',)
+    ordering = ('-created_at',)
+
+
+@admin.register(FileUpload)
+class FileUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'owner', 'size', 'offset', 'status', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('filename', 'owner__username')
+    raw_id_fields = ('owner', 'stored_file')
+    ordering = ('-created_at',)
@@ -0,0 +1,16 @@
+"""
+Custom exceptions for file uploads
+"""
+
+class UploadError(Exception):
+    """Raised when an upload or one of its chunks is rejected"""
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class UploadOffsetMismatch(UploadError):
+    """Raised when a chunk does not start where the stored bytes end"""
+    def __init__(self, message, offset):
+        self.offset = offset
+        super().__init__(message)
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:15
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('size', models.PositiveBigIntegerField(verbose_name='大小')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='类型')),
+                ('file', models.FileField(max_length=255, upload_to='', verbose_name='文件')),
+            ],
+            options={
+                'verbose_name': '存储文件',
+                'verbose_name_plural': '存储文件',
+                'db_table': 'files_stored_file',
+            },
+        ),
+        migrations.CreateModel(
+            name='FileUpload',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='文件名')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='类型')),
+                ('size', models.PositiveBigIntegerField(verbose_name='大小')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='已接收字节')),
+                ('expected_sha256', models.CharField(blank=True, max_length=64, verbose_name='预期 SHA-256')),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='uploading', max_length=20, verbose_name='状态')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='file_uploads', to=settings.AUTH_USER_MODEL, verbose_name='上传者')),
+                ('stored_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='uploads', to='files.storedfile', verbose_name='存储文件')),
+            ],
+            options={
+                'verbose_name': '文件上传',
+                'verbose_name_plural': '文件上传',
+                'db_table': 'files_file_upload',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['owner', 'status'], name='files_file__owner_i_ec7d65_idx'), models.Index(fields=['status', 'updated_at'], name='files_file__status_10d959_idx')],
+            },
+        ),
+    ]
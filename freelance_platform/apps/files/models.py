@@ -0,0 +1,65 @@
+from django.db import models
+from apps.common.models import BaseModel
+from apps.accounts.models import User
+
+
+class StoredFile(BaseModel):
+    """Content-addressed file body, shared by every upload of the same bytes"""
+
+    sha256 = models.CharField('SHA-256', max_length=64, unique=True)
+    size = models.PositiveBigIntegerField('大小')
+    content_type = models.CharField('类型', max_length=100, blank=True)
+    file = models.FileField('文件', max_length=255)  # Stored under files/<aa>/<bb>/<sha256>
+
+    class Meta:
+        db_table = 'files_stored_file'
+        verbose_name = '存储文件'
+        verbose_name_plural = '存储文件'
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
+
+class FileUpload(BaseModel):
+    """A user's file: a resumable chunked upload session that ends pointing at a StoredFile"""
+
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='file_uploads', verbose_name='上传者')
+    filename = models.CharField('文件名', max_length=255)
+    content_type = models.CharField('类型', max_length=100, blank=True)
+    size = models.PositiveBigIntegerField('大小')
+    offset = models.PositiveBigIntegerField('已接收字节', default=0)
+    expected_sha256 = models.CharField('预期 SHA-256', max_length=64, blank=True)
+    status = models.CharField('状态', max_length=20, choices=STATUS_CHOICES, default='uploading', db_index=True)
+    stored_file = models.ForeignKey(
+        StoredFile,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='uploads',
+        verbose_name='存储文件'
+    )
+    completed_at = models.DateTimeField('完成时间', null=True, blank=True)
+
+    class Meta:
+        db_table = 'files_file_upload'
+        verbose_name = '文件上传'
+        verbose_name_plural = '文件上传'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'status']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+    @property
+    def is_complete(self):
+        return self.status == 'completed'
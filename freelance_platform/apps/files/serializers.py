@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+from .models import FileUpload
+
+
+class FileUploadCreateSerializer(serializers.Serializer):
+    """上传会话创建序列化器"""
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True, default='')
+
+
+class FileUploadSerializer(serializers.ModelSerializer):
+    """文件上传序列化器"""
+    sha256 = serializers.CharField(source='stored_file.sha256', read_only=True, default=None)
+
+    class Meta:
+        model = FileUpload
+        fields = [
+            'id', 'filename', 'content_type', 'size', 'offset', 'status',
+            'sha256', 'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
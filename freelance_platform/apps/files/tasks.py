@@ -0,0 +1,16 @@
+from celery import shared_task
+
+from .uploads import cleanup_stale_uploads, complete_upload
+
+
+@shared_task
+def finalize_file_upload(upload_id):
+    """Verify and store an upload whose last chunk has arrived"""
+    upload = complete_upload(upload_id)
+    return upload.status if upload is not None else None
+
+
+@shared_task
+def cleanup_file_uploads():
+    """Remove abandoned upload sessions and their partial files"""
+    return cleanup_stale_uploads()
@@ -0,0 +1,124 @@
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from .models import FileUpload, StoredFile
+from .tasks import finalize_file_upload
+
+
+class ResumableUploadTests(TestCase):
+    """分片上传：按偏移量续传，最后一个分片后异步校验并按内容去重保存"""
+
+    content = b'0123456789abcdefghijklmnopqrstuvwxyz'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', email='owner@example.com')
+        cls.other = User.objects.create(username='other', email='other@example.com')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.partial_dir = Path(self.media_root) / 'partial'
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            FILE_UPLOAD_PARTIAL_DIR=str(self.partial_dir),
+            FILE_UPLOAD_MAX_CHUNK_SIZE=16
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+        # Run the finalisation task inline instead of through the broker
+        delay = mock.patch.object(finalize_file_upload, 'delay', finalize_file_upload)
+        delay.start()
+        self.addCleanup(delay.stop)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def create(self, content=None, **extra):
+        content = self.content if content is None else content
+        response = self.client.post(
+            '/api/files/uploads/', {'filename': 'a.txt', 'size': len(content), **extra}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def send(self, upload_id, offset, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(
+                f'/api/files/uploads/{upload_id}/',
+                data,
+                content_type='application/offset+octet-stream',
+                HTTP_UPLOAD_OFFSET=str(offset)
+            )
+
+    def upload(self, content=None, **extra):
+        content = self.content if content is None else content
+        upload_id = self.create(content, **extra)
+        for offset in range(0, len(content), 16):
+            response = self.send(upload_id, offset, content[offset:offset + 16])
+        return upload_id, response
+
+    def test_chunks_resume_from_the_stored_offset(self):
+        upload_id = self.create()
+        self.assertEqual(self.send(upload_id, 0, self.content[:16]).status_code, 200)
+
+        # A retried chunk is refused and told where to continue
+        response = self.send(upload_id, 0, self.content[:16])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '16')
+
+        progress = self.client.get(f'/api/files/uploads/{upload_id}/')
+        self.assertEqual(progress.data['offset'], 16)
+        self.assertEqual(progress.data['status'], 'uploading')
+
+    def test_last_chunk_is_verified_and_stored(self):
+        upload_id, response = self.upload(sha256=hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'processing')
+
+        upload = FileUpload.objects.select_related('stored_file').get(pk=upload_id)
+        self.assertEqual(upload.status, 'completed')
+        self.assertEqual(upload.stored_file.sha256, hashlib.sha256(self.content).hexdigest())
+        with upload.stored_file.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertEqual(list(self.partial_dir.iterdir()), [])
+
+    def test_hash_mismatch_fails_the_upload(self):
+        upload_id, _ = self.upload(sha256='0' * 64)
+
+        self.assertEqual(FileUpload.objects.get(pk=upload_id).status, 'failed')
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertEqual(list(self.partial_dir.iterdir()), [])
+
+    def test_same_content_shares_one_stored_file(self):
+        first, _ = self.upload()
+        second, _ = self.upload()
+
+        self.assertEqual(StoredFile.objects.count(), 1)
+        self.assertEqual(
+            FileUpload.objects.get(pk=first).stored_file_id,
+            FileUpload.objects.get(pk=second).stored_file_id
+        )
+
+    def test_announced_hash_alone_does_not_grant_the_file(self):
+        self.upload()
+        self.client.force_authenticate(self.other)
+
+        upload_id = self.create(sha256=hashlib.sha256(self.content).hexdigest())
+        upload = FileUpload.objects.get(pk=upload_id)
+        self.assertEqual((upload.status, upload.offset, upload.stored_file_id), ('uploading', 0, None))
+        self.assertEqual(self.client.get(f'/api/files/uploads/{upload_id}/download/').status_code, 404)
+
+    def test_chunk_past_the_declared_size_is_rejected(self):
+        upload_id = self.create(b'short')
+        response = self.send(upload_id, 0, b'too long for it')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(FileUpload.objects.get(pk=upload_id).offset, 0)
@@ -0,0 +1,194 @@
+"""
+Chunked, resumable file uploads
+Chunks are streamed from the request straight onto a partial file on disk, so
+worker memory never depends on file size. Once the last byte arrives a Celery
+task hashes the file and stores it once per distinct content under a SHA-256
+derived path.
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .exceptions import UploadError, UploadOffsetMismatch
+from .models import FileUpload, StoredFile
+
+logger = logging.getLogger(__name__)
+
+# Bytes moved per read/write; bounds the memory a chunk request can use
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+def get_partial_dir():
+    return Path(getattr(settings, 'FILE_UPLOAD_PARTIAL_DIR', Path(settings.BASE_DIR) / 'tmp' / 'uploads'))
+
+
+def get_partial_path(upload):
+    return get_partial_dir() / f'{upload.pk}.part'
+
+
+def stored_name(sha256):
+    return f'files/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def create_upload(owner, filename, size, content_type='', sha256=''):
+    """
+    Open an upload session for ``size`` bytes
+
+    An announced ``sha256`` is only checked against the received bytes; every
+    upload sends its content, so knowing a hash never grants access to a file.
+    """
+    max_size = getattr(settings, 'FILE_UPLOAD_MAX_SIZE', 5 * 1024 ** 3)
+    if size > max_size:
+        raise UploadError(f'文件大小不能超过 {max_size} 字节')
+
+    upload = FileUpload.objects.create(
+        owner=owner,
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        expected_sha256=sha256.lower(),
+    )
+    get_partial_dir().mkdir(parents=True, exist_ok=True)
+    return upload
+
+
+def _check_chunk(upload, offset, length):
+    if upload.status != 'uploading':
+        raise UploadError('上传已结束')
+    if offset != upload.offset:
+        raise UploadOffsetMismatch('分片偏移量与已接收的数据不一致', upload.offset)
+    if offset + length > upload.size:
+        raise UploadError('分片超出了声明的文件大小')
+
+
+def write_chunk(upload_id, owner, offset, stream, length):
+    """
+    Write ``length`` bytes read from ``stream`` at ``offset``; returns the upload
+
+    The body is written before the row is locked, and the lock is held only to
+    re-check and advance the offset, so a slow client never blocks other
+    requests on the row. Two requests racing for the same offset both write the
+    same range (a client retry carries the same bytes); only the first advances
+    the offset. A chunk that ends early (client disconnect) still keeps the
+    bytes that arrived, so the client resumes from the returned offset.
+    """
+    max_chunk = getattr(settings, 'FILE_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+    if length <= 0 or length > max_chunk:
+        raise UploadError(f'分片大小必须在 1 到 {max_chunk} 字节之间')
+
+    upload = FileUpload.objects.get(pk=upload_id, owner=owner)
+    _check_chunk(upload, offset, length)
+
+    received = 0
+    # Open without truncating: earlier chunks stay, this one lands at its offset
+    with os.fdopen(os.open(get_partial_path(upload), os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as partial:
+        partial.seek(offset)
+        while received < length:
+            data = stream.read(min(COPY_BUFFER_SIZE, length - received))
+            if not data:
+                break
+            partial.write(data)
+            received += len(data)
+
+    with transaction.atomic():
+        upload = FileUpload.objects.select_for_update().get(pk=upload_id, owner=owner)
+        _check_chunk(upload, offset, received)
+        upload.offset = offset + received
+        if upload.offset == upload.size:
+            upload.status = 'processing'
+            transaction.on_commit(lambda: _finalize_later(upload_id))
+        upload.save(update_fields=['offset', 'status', 'updated_at'])
+    return upload
+
+
+def _finalize_later(upload_id):
+    from .tasks import finalize_file_upload
+
+    finalize_file_upload.delay(str(upload_id))
+
+
+def _hash_file(path, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        remaining = size
+        while remaining:
+            block = fh.read(min(COPY_BUFFER_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def complete_upload(upload_id):
+    """
+    Hash a fully received upload and attach it to the StoredFile for its content
+
+    Runs in the ``finalize_file_upload`` task; content that is already stored is
+    shared rather than copied again, which is safe here because the bytes were
+    actually received.
+    """
+    upload = FileUpload.objects.filter(pk=upload_id, status='processing').first()
+    if upload is None:
+        return None
+
+    path = get_partial_path(upload)
+    # Bytes past the declared size can only come from a losing duplicate chunk
+    with open(path, 'r+b') as partial:
+        partial.truncate(upload.size)
+    sha256 = _hash_file(path, upload.size)
+
+    if upload.expected_sha256 and upload.expected_sha256 != sha256:
+        FileUpload.objects.filter(pk=upload.pk).update(status='failed', updated_at=timezone.now())
+        path.unlink(missing_ok=True)
+        upload.status = 'failed'
+        logger.info(f"Upload {upload.pk} failed SHA-256 verification")
+        return upload
+
+    stored = StoredFile.objects.filter(sha256=sha256).first()
+    if stored is None:
+        with open(path, 'rb') as fh:
+            # Storage backends copy from the file object in chunks
+            name = default_storage.save(stored_name(sha256), File(fh))
+        try:
+            with transaction.atomic():
+                stored = StoredFile.objects.create(
+                    sha256=sha256, size=upload.size, content_type=upload.content_type, file=name
+                )
+        except IntegrityError:
+            # Another upload of the same content finished first
+            default_storage.delete(name)
+            stored = StoredFile.objects.get(sha256=sha256)
+    path.unlink(missing_ok=True)
+
+    upload.stored_file = stored
+    upload.status = 'completed'
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['stored_file', 'status', 'completed_at', 'updated_at'])
+    return upload
+
+
+def cleanup_stale_uploads():
+    """Delete uploads idle for ``FILE_UPLOAD_EXPIRY_HOURS`` along with their partial files"""
+    cutoff = timezone.now() - timedelta(hours=getattr(settings, 'FILE_UPLOAD_EXPIRY_HOURS', 24))
+    stale = FileUpload.objects.filter(status__in=['uploading', 'failed'], updated_at__lt=cutoff)
+
+    removed = 0
+    for upload_id in stale.values_list('pk', flat=True).iterator(chunk_size=1000):
+        try:
+            os.remove(get_partial_dir() / f'{upload_id}.part')
+        except FileNotFoundError:
+            pass
+        removed += 1
+    stale.delete()
+
+    logger.info(f"Removed {removed} stale uploads")
+    return removed
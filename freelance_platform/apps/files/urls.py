@@ -0,0 +1,14 @@
+"""
+文件上传URL配置
+"""
+
+from django.urls import path
+from . import views
+
+app_name = 'files'
+
+urlpatterns = [
+    path('uploads/', views.FileUploadCreateAPIView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', views.FileUploadChunkAPIView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:pk>/download/', views.FileDownloadAPIView.as_view(), name='upload-download'),
+]
@@ -0,0 +1,100 @@
+"""
+文件上传视图
+
+分片上传协议：
+1. POST 创建上传会话（可附带 sha256，接收完成后用于校验）
+2. PATCH 按 Upload-Offset 头追加分片，请求体为原始字节
+3. GET 查询已接收的偏移量，用于断点续传
+4. 最后一个分片返回 202，状态为 processing；后台校验并保存后变为 completed 或 failed，GET 轮询即可
+"""
+
+from django.db.models import Q
+from django.http import FileResponse
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .exceptions import UploadError, UploadOffsetMismatch
+from .models import FileUpload
+from .serializers import FileUploadCreateSerializer, FileUploadSerializer
+from .uploads import create_upload, write_chunk
+
+
+def _upload_response(upload, status_code=status.HTTP_200_OK):
+    response = Response(FileUploadSerializer(upload).data, status=status_code)
+    response['Upload-Offset'] = str(upload.offset)
+    return response
+
+
+class FileUploadCreateAPIView(APIView):
+    """创建上传会话"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = FileUploadCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = create_upload(request.user, **serializer.validated_data)
+        except UploadError as e:
+            return Response({'error': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        return _upload_response(upload, status.HTTP_201_CREATED)
+
+
+class FileUploadChunkAPIView(APIView):
+    """查询上传进度 / 追加分片"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            upload = FileUpload.objects.select_related('stored_file').get(pk=pk, owner=request.user)
+        except FileUpload.DoesNotExist:
+            return Response({'error': '上传不存在'}, status=status.HTTP_404_NOT_FOUND)
+        return _upload_response(upload)
+
+    def patch(self, request, pk):
+        try:
+            offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response({'error': '缺少有效的 Upload-Offset 或 Content-Length 头'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 直接读取原始请求流，不经过 request.data，分片不会整体载入内存
+        try:
+            upload = write_chunk(pk, request.user, offset, request._request, length)
+        except FileUpload.DoesNotExist:
+            return Response({'error': '上传不存在'}, status=status.HTTP_404_NOT_FOUND)
+        except UploadOffsetMismatch as e:
+            response = Response({'error': e.message, 'offset': e.offset}, status=status.HTTP_409_CONFLICT)
+            response['Upload-Offset'] = str(e.offset)
+            return response
+        except UploadError as e:
+            return Response({'error': e.message}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.status == 'processing':
+            return _upload_response(upload, status.HTTP_202_ACCEPTED)
+        return _upload_response(upload)
+
+
+class FileDownloadAPIView(APIView):
+    """下载文件：上传者本人或引用该文件的订单双方可下载"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        user = request.user
+        uploads = FileUpload.objects.filter(status='completed').select_related('stored_file')
+        if user.user_type != 'admin':
+            uploads = uploads.filter(
+                Q(owner=user) |
+                Q(deliveries__order__client=user) |
+                Q(deliveries__order__freelancer=user)
+            ).distinct()
+
+        upload = uploads.filter(pk=pk).first()
+        if upload is None:
+            return Response({'error': '文件不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        return FileResponse(
+            upload.stored_file.file.open('rb'),
+            as_attachment=True,
+            filename=upload.filename,
+            content_type=upload.content_type or None
+        )
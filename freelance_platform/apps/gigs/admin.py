@@ -1,8 +1,9 @@
 from django.contrib import admin
+from django.db.models import Count, Q
 from django.utils.html import format_html
 from .models import (
     Category, Gig, GigPackage, GigRequirement, GigFAQ,
-    GigExtra, GigFavorite, GigView, GigStat, GigSearchHistory, GigReport
+    GigExtra, GigFavorite, GigView, GigStat, GigSearchHistory, GigSearchQuery, GigReport
 )
 
 
@@ -34,9 +35,15 @@ class CategoryAdmin(admin.ModelAdmin):
     ordering = ('sort_order', 'name')
     # prepopulated_fields = {'slug': ('name',)}  # Commented out as slug field doesn't exist
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('parent').annotate(
+            active_gig_count=Count('gigs', filter=Q(gigs__status='active'))
+        )
+
     def gig_count(self, obj):
-        return obj.gigs.filter(status='active').count()
+        return obj.active_gig_count
     gig_count.short_description = 'Active Gigs'
+    gig_count.admin_order_field = 'active_gig_count'
 
 
 @admin.register(Gig)
@@ -175,6 +182,16 @@ class GigSearchHistoryAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(GigSearchQuery)
+class GigSearchQueryAdmin(admin.ModelAdmin):
+    list_display = ('query', 'search_count', 'last_results_count', 'last_searched_at')
+    search_fields = ('query',)
+    ordering = ('-search_count',)
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(GigReport)
 class GigReportAdmin(admin.ModelAdmin):
     list_display = ('gig', 'reporter', 'reason', 'status', 'created_at')
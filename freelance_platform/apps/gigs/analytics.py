@@ -0,0 +1,162 @@
+"""
+Gig statistics rollup
+Incrementally aggregates GigView, Order and GigFavorite rows into daily GigStat
+rows, processing only rows created (or, for favorites, removed) since each
+source's high-water mark
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.common.hyperloglog import HyperLogLog
+from apps.common.models import RollupCheckpoint
+from .models import GigFavorite, GigStat, GigView
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ['views', 'orders', 'revenue', 'favorites']
+
+
+def _window(queryset, since, until, field='created_at'):
+    queryset = queryset.filter(**{f'{field}__lt': until})
+    if since is not None:
+        queryset = queryset.filter(**{f'{field}__gte': since})
+    return queryset
+
+
+def _collect_views(since, until):
+    buckets = defaultdict(dict)
+    rows = _window(GigView.objects.all(), since, until).values(
+        'gig_id', 'ip_address', day=TruncDate('created_at')
+    ).annotate(hits=Count('id'))
+
+    for row in rows.iterator(chunk_size=2000):
+        bucket = buckets[(row['gig_id'], row['day'])]
+        bucket['views'] = bucket.get('views', 0) + row['hits']
+        bucket.setdefault('sketch', HyperLogLog()).add(row['ip_address'])
+    return buckets
+
+
+def _collect_orders(since, until):
+    from apps.orders.models import Order
+
+    rows = _window(Order.objects.all(), since, until).values(
+        'gig_id', day=TruncDate('created_at')
+    ).annotate(orders=Count('id'), revenue=Sum('total_price'))
+
+    return {
+        (row['gig_id'], row['day']): {'orders': row['orders'], 'revenue': row['revenue'] or 0}
+        for row in rows.iterator(chunk_size=2000)
+    }
+
+
+def _collect_favorites(since, until):
+    """Net favorites per gig and day: rows created minus rows soft-deleted in the window"""
+    buckets = defaultdict(lambda: {'favorites': 0})
+
+    added = _window(GigFavorite.objects.all(), since, until).values(
+        'gig_id', day=TruncDate('created_at')
+    ).annotate(count=Count('id'))
+    removed = _window(GigFavorite.objects.filter(is_deleted=True), since, until, field='deleted_at').values(
+        'gig_id', day=TruncDate('deleted_at')
+    ).annotate(count=Count('id'))
+
+    for rows, sign in ((added, 1), (removed, -1)):
+        for row in rows.iterator(chunk_size=2000):
+            buckets[(row['gig_id'], row['day'])]['favorites'] += sign * row['count']
+    return dict(buckets)
+
+
+SOURCES = {
+    'views': _collect_views,
+    'orders': _collect_orders,
+    'favorites': _collect_favorites,
+}
+
+
+def _apply(buckets):
+    """Add bucket deltas onto the matching GigStat rows, creating missing ones"""
+    existing = {
+        (stat.gig_id, stat.date): stat
+        for stat in GigStat.objects.select_for_update().filter(
+            gig_id__in={gig_id for gig_id, _ in buckets},
+            date__in={day for _, day in buckets},
+        )
+    }
+
+    to_create, to_update = [], []
+    for (gig_id, day), delta in buckets.items():
+        stat = existing.get((gig_id, day))
+        if stat is None:
+            stat = GigStat(gig_id=gig_id, date=day)
+            to_create.append(stat)
+        else:
+            to_update.append(stat)
+
+        for field in COUNTER_FIELDS:
+            if field in delta:
+                setattr(stat, field, getattr(stat, field) + delta[field])
+
+        if 'sketch' in delta:
+            sketch = HyperLogLog.from_bytes(stat.unique_sketch).merge(delta['sketch'])
+            stat.unique_sketch = sketch.to_bytes()
+            stat.unique_views = sketch.count()
+
+    GigStat.objects.bulk_create(to_create, batch_size=500)
+    GigStat.objects.bulk_update(
+        to_update, COUNTER_FIELDS + ['unique_views', 'unique_sketch'], batch_size=500
+    )
+
+
+def rollup_gig_stats(until=None):
+    """
+    Roll new views, orders and favorites into GigStat
+
+    Each source keeps its own checkpoint, so a failure in one does not replay
+    the others. Rows newer than ``GIG_STAT_ROLLUP_LAG`` seconds are left for the
+    next run to avoid missing transactions that commit late.
+    """
+    if until is None:
+        until = timezone.now() - timedelta(seconds=getattr(settings, 'GIG_STAT_ROLLUP_LAG', 60))
+
+    processed = {}
+    for source, collect in SOURCES.items():
+        with transaction.atomic():
+            checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(
+                name=f'gig_stats:{source}'
+            )
+            since = checkpoint.high_water_mark
+            if since is not None and since >= until:
+                continue
+
+            buckets = collect(since, until)
+            if buckets:
+                _apply(buckets)
+
+            checkpoint.high_water_mark = until
+            checkpoint.save(update_fields=['high_water_mark', 'updated_at'])
+            processed[source] = len(buckets)
+
+    logger.info(f"Gig stats rollup up to {until.isoformat()}: {processed}")
+    return processed
+
+
+def summarize_gig_stats(stats):
+    """Combine daily GigStat rows into period totals, merging unique visitor sketches"""
+    sketch = HyperLogLog()
+    totals = {field: 0 for field in COUNTER_FIELDS}
+
+    for stat in stats:
+        for field in COUNTER_FIELDS:
+            totals[field] += getattr(stat, field)
+        if stat.unique_sketch:
+            sketch.merge(HyperLogLog.from_bytes(stat.unique_sketch))
+
+    totals['unique_views'] = sketch.count()
+    return totals
@@ -0,0 +1,60 @@
+"""
+Cached category tree
+Loads all active categories with their active gig counts in one query, rolls the
+counts up to parents and caches the serialized tree until a category or gig changes
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Category
+
+CATEGORY_TREE_CACHE_KEY = 'gigs:category_tree'
+
+
+def load_category_tree():
+    """Return root categories with ``tree_children`` and ``subtree_gig_count`` attached"""
+    categories = list(
+        Category.objects.filter(is_active=True).annotate(
+            active_gig_count=Count('gigs', filter=Q(gigs__status='active'))
+        )
+    )
+
+    by_id = {category.pk: category for category in categories}
+    roots = []
+    for category in categories:
+        category.tree_children = []
+    for category in categories:
+        if category.parent_id is None:
+            roots.append(category)
+        elif category.parent_id in by_id:
+            by_id[category.parent_id].tree_children.append(category)
+
+    def roll_up(node):
+        node.subtree_gig_count = node.active_gig_count + sum(
+            roll_up(child) for child in node.tree_children
+        )
+        return node.subtree_gig_count
+
+    for root in roots:
+        roll_up(root)
+    return roots
+
+
+def get_category_tree():
+    """Serialized active category tree, served from cache when available"""
+    from .serializers import CategoryTreeSerializer
+
+    tree = cache.get(CATEGORY_TREE_CACHE_KEY)
+    if tree is None:
+        tree = CategoryTreeSerializer(load_category_tree(), many=True).data
+        cache.set(
+            CATEGORY_TREE_CACHE_KEY,
+            tree,
+            timeout=getattr(settings, 'CATEGORY_TREE_CACHE_TIMEOUT', 7200)
+        )
+    return tree
+
+
+def invalidate_category_tree():
+    cache.delete(CATEGORY_TREE_CACHE_KEY)
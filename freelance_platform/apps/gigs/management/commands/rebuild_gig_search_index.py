@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.gigs.models import Gig
+from apps.gigs.search import build_search_tokens, get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the gig full-text search index (run after changing the tokenizer, e.g. installing jieba)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = 0
+
+        for gig in Gig.objects.all().iterator(chunk_size=options['chunk_size']):
+            gig.search_tokens = build_search_tokens(gig)
+            Gig.objects.filter(pk=gig.pk).update(search_tokens=gig.search_tokens)
+            backend.index_gig(gig)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {count} gigs'))
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:38
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+try:
+    import jieba
+except ImportError:
+    jieba = None
+
+# Frozen copy of apps.gigs.search tokenization as of this migration, so later
+# changes to the search module cannot alter or break the backfill
+MAX_TERM_LENGTH = 64
+_CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_RE = re.compile(rf'[a-z0-9]+|[{_CJK_CHARS}]+')
+_CJK_RE = re.compile(rf'[{_CJK_CHARS}]')
+
+
+def _segment_cjk(run):
+    if jieba is not None:
+        return [word for word in jieba.cut_for_search(run) if word.strip()]
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _tokenize(text):
+    if not text:
+        return []
+    terms = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        if _CJK_RE.match(token):
+            terms.extend(_segment_cjk(token))
+        else:
+            terms.append(token)
+    return [term[:MAX_TERM_LENGTH] for term in terms]
+
+
+def build_search_tokens(gig):
+    return ' '.join(_tokenize(f"{gig.searchable_text} {gig.tags}"))
+
+
+def build_search_index(apps, schema_editor):
+    Gig = apps.get_model('gigs', 'Gig')
+    GigSearchTerm = apps.get_model('gigs', 'GigSearchTerm')
+    use_postgres = schema_editor.connection.vendor == 'postgresql'
+
+    if use_postgres:
+        schema_editor.execute(
+            "CREATE INDEX gigs_gig_search_tokens_gin ON gigs_gig "
+            "USING gin (to_tsvector('simple'::regconfig, COALESCE(search_tokens, '')))"
+        )
+
+    for gig in Gig.objects.all().iterator():
+        gig.search_tokens = build_search_tokens(gig)
+        Gig.objects.filter(pk=gig.pk).update(search_tokens=gig.search_tokens)
+        if not use_postgres and not gig.is_deleted:
+            GigSearchTerm.objects.bulk_create([
+                GigSearchTerm(gig=gig, term=term, weight=weight)
+                for term, weight in Counter(gig.search_tokens.split()).items()
+            ])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS gigs_gig_search_tokens_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0003_alter_category_options_alter_gig_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gig',
+            name='search_tokens',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='搜索分词'),
+        ),
+        migrations.CreateModel(
+            name='GigSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='词项')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='权重')),
+                ('gig', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='gigs.gig', verbose_name='服务')),
+            ],
+            options={
+                'verbose_name': '服务搜索词项',
+                'verbose_name_plural': '服务搜索词项',
+                'db_table': 'gigs_gig_search_term',
+                'unique_together': {('term', 'gig')},
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_package_summary(apps, schema_editor):
+    Gig = apps.get_model('gigs', 'Gig')
+    GigPackage = apps.get_model('gigs', 'GigPackage')
+
+    packages = GigPackage.objects.filter(gig=OuterRef('pk'))
+    basic = packages.filter(package_type='basic')
+    Gig.objects.update(
+        basic_price=Subquery(basic.values('price')[:1]),
+        basic_delivery_days=Subquery(basic.values('delivery_days')[:1]),
+        min_package_price=Subquery(packages.order_by('price').values('price')[:1]),
+        max_package_price=Subquery(packages.order_by('-price').values('price')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0004_gig_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gig',
+            name='basic_delivery_days',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='基础套餐交付天数'),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='basic_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='基础套餐价格'),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='max_package_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='最高套餐价格'),
+        ),
+        migrations.AddField(
+            model_name='gig',
+            name='min_package_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='最低套餐价格'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['status', 'basic_price'], name='gigs_gig_status_939003_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['status', 'basic_delivery_days'], name='gigs_gig_status_37bdfd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gig',
+            index=models.Index(fields=['category', 'status', 'basic_price'], name='gigs_gig_categor_1b6dbb_idx'),
+        ),
+        migrations.RunPython(populate_package_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0005_gig_package_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gigstat',
+            name='favorites',
+            field=models.PositiveIntegerField(default=0, verbose_name='收藏数'),
+        ),
+        migrations.AddField(
+            model_name='gigstat',
+            name='unique_sketch',
+            field=models.BinaryField(blank=True, default=b'', verbose_name='独立访客草图'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:54
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0006_gigstat_favorites_gigstat_unique_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GigSearchQuery',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('query', models.CharField(max_length=200, unique=True, verbose_name='搜索查询')),
+                ('search_count', models.PositiveIntegerField(default=0, verbose_name='搜索次数')),
+                ('last_results_count', models.PositiveIntegerField(default=0, verbose_name='最近结果数量')),
+                ('last_searched_at', models.DateTimeField(blank=True, null=True, verbose_name='最近搜索时间')),
+            ],
+            options={
+                'verbose_name': '热门搜索',
+                'verbose_name_plural': '热门搜索',
+                'db_table': 'gigs_gig_search_query',
+                'ordering': ['-search_count'],
+                'indexes': [models.Index(fields=['-search_count'], name='gigs_gig_se_search__17d124_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0007_gig_search_query'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='gigfavorite',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='gigstat',
+            name='favorites',
+            field=models.IntegerField(default=0, verbose_name='收藏净增数'),
+        ),
+        migrations.AddConstraint(
+            model_name='gigfavorite',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('user', 'gig'), name='gigs_unique_active_favorite'),
+        ),
+    ]
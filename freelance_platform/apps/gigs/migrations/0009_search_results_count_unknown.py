@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0008_favorite_removals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gigsearchhistory',
+            name='results_count',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='结果数量'),
+        ),
+        migrations.AlterField(
+            model_name='gigsearchquery',
+            name='last_results_count',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='最近结果数量'),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
-from apps.common.models import BaseModel
+from apps.common.models import BaseModel, FieldSnapshotModel
 from apps.accounts.models import User
 from django.urls import reverse
+from .search import INDEXED_FIELDS, build_search_tokens
 
 
 class Category(BaseModel):
@@ -38,9 +39,12 @@ class Category(BaseModel):
         return self.children.filter(is_active=True)
 
 
-class Gig(BaseModel):
+class Gig(FieldSnapshotModel, BaseModel):
     """Main gig/service model"""
 
+    # Embedded in order search documents (see apps.orders.signals)
+    snapshot_fields = ('title',)
+
     STATUS_CHOICES = [
         ('draft', '草稿'),
         ('active', '活跃'),
@@ -69,6 +73,7 @@ class Gig(BaseModel):
     # Search and discovery
     tags = models.TextField('标签', help_text="搜索用逗号分隔的标签")
     searchable_text = models.TextField('搜索文本', db_index=True)  # For full-text search
+    search_tokens = models.TextField('搜索分词', blank=True, default='', editable=False)  # Segmented terms, see apps.gigs.search
 
     # Media
     thumbnail = models.ImageField('缩略图', upload_to='gigs/thumbnails/', null=True, blank=True)
@@ -89,6 +94,12 @@ class Gig(BaseModel):
     )
     review_count = models.PositiveIntegerField('评价次数', default=0)
 
+    # Package summary, maintained from GigPackage writes for join-free filtering and sorting
+    basic_price = models.DecimalField('基础套餐价格', max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    basic_delivery_days = models.PositiveIntegerField('基础套餐交付天数', null=True, blank=True, editable=False)
+    min_package_price = models.DecimalField('最低套餐价格', max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    max_package_price = models.DecimalField('最高套餐价格', max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+
     # SEO
     slug = models.SlugField('URL别名', max_length=200, unique=True, db_index=True)
     meta_description = models.CharField('SEO描述', max_length=160, blank=True)
@@ -103,6 +114,9 @@ class Gig(BaseModel):
             models.Index(fields=['average_rating', 'review_count']),
             models.Index(fields=['view_count']),
             models.Index(fields=['order_count']),
+            models.Index(fields=['status', 'basic_price']),
+            models.Index(fields=['status', 'basic_delivery_days']),
+            models.Index(fields=['category', 'status', 'basic_price']),
         ]
         verbose_name = '服务'
         verbose_name_plural = '服务'
@@ -110,6 +124,15 @@ class Gig(BaseModel):
     def __str__(self):
         return f"{self.title} by {self.freelancer.username}"
 
+    def save(self, *args, **kwargs):
+        # Keep the segmented search document in step with the indexed text fields
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or INDEXED_FIELDS.intersection(update_fields):
+            self.search_tokens = build_search_tokens(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'search_tokens'}
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('gigs:detail', kwargs={'slug': self.slug})
 
@@ -127,6 +150,19 @@ class Gig(BaseModel):
             self.review_count = 0
         self.save(update_fields=['average_rating', 'review_count'])
 
+    def update_package_summary(self):
+        """Update denormalized price/delivery columns from packages"""
+        basic = models.Q(package_type='basic')
+        summary = self.packages.aggregate(
+            basic_price=models.Max('price', filter=basic),
+            basic_delivery_days=models.Max('delivery_days', filter=basic),
+            min_package_price=models.Min('price'),
+            max_package_price=models.Max('price'),
+        )
+        for field, value in summary.items():
+            setattr(self, field, value)
+        Gig.objects.filter(pk=self.pk).update(**summary)
+
 
 class GigPackage(BaseModel):
     """Gig packages (Basic, Standard, Premium)"""
@@ -257,14 +293,25 @@ class GigExtra(BaseModel):
 
 
 class GigFavorite(BaseModel):
-    """Users who favorited a gig"""
+    """
+    Users who favorited a gig
+
+    Unfavoriting soft-deletes the row and favoriting again creates a new one, so
+    the stats rollup can count both additions and removals per day.
+    """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorite_gigs', verbose_name='用户')
     gig = models.ForeignKey(Gig, on_delete=models.CASCADE, related_name='favorited_by', verbose_name='服务')
 
     class Meta:
         db_table = 'gigs_gig_favorite'
-        unique_together = ['user', 'gig']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'gig'],
+                condition=models.Q(is_deleted=False),
+                name='gigs_unique_active_favorite'
+            ),
+        ]
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['gig']),
@@ -310,6 +357,11 @@ class GigStat(BaseModel):
     clicks = models.PositiveIntegerField('点击次数', default=0)
     orders = models.PositiveIntegerField('订单数', default=0)
     revenue = models.DecimalField('收入', max_digits=10, decimal_places=2, default=0)
+    # Net change: favorites added minus favorites removed that day, so it can be negative
+    favorites = models.IntegerField('收藏净增数', default=0)
+
+    # HyperLogLog registers of visitor IPs, merged across days for multi-day uniques
+    unique_sketch = models.BinaryField('独立访客草图', default=b'', blank=True, editable=False)
 
     class Meta:
         db_table = 'gigs_gig_stat'
@@ -326,13 +378,31 @@ class GigStat(BaseModel):
         return f"Stats for {self.gig.title} on {self.date}"
 
 
+class GigSearchTerm(models.Model):
+    """Inverted index entry used by the non-PostgreSQL search backend"""
+
+    term = models.CharField('词项', max_length=64)
+    gig = models.ForeignKey(Gig, on_delete=models.CASCADE, related_name='search_terms', verbose_name='服务')
+    weight = models.PositiveIntegerField('权重', default=1)
+
+    class Meta:
+        db_table = 'gigs_gig_search_term'
+        unique_together = ['term', 'gig']
+        verbose_name = '服务搜索词项'
+        verbose_name_plural = '服务搜索词项'
+
+    def __str__(self):
+        return f"{self.term} -> {self.gig_id}"
+
+
 class GigSearchHistory(BaseModel):
     """Track search queries for analytics and optimization"""
 
     query = models.CharField('搜索查询', max_length=200, db_index=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='用户')
     ip_address = models.GenericIPAddressField('IP地址')
-    results_count = models.PositiveIntegerField('结果数量', default=0)
+    # NULL when the total is unknown (keyset pages without a planner estimate)
+    results_count = models.PositiveIntegerField('结果数量', null=True, blank=True)
     filters_applied = models.JSONField('应用的筛选', default=dict, blank=True)
 
     class Meta:
@@ -350,6 +420,27 @@ class GigSearchHistory(BaseModel):
         return f"Search: {self.query}"
 
 
+class GigSearchQuery(BaseModel):
+    """Running popularity totals per normalized search query"""
+
+    query = models.CharField('搜索查询', max_length=200, unique=True)
+    search_count = models.PositiveIntegerField('搜索次数', default=0)
+    last_results_count = models.PositiveIntegerField('最近结果数量', null=True, blank=True)
+    last_searched_at = models.DateTimeField('最近搜索时间', null=True, blank=True)
+
+    class Meta:
+        db_table = 'gigs_gig_search_query'
+        ordering = ['-search_count']
+        indexes = [
+            models.Index(fields=['-search_count']),
+        ]
+        verbose_name = '热门搜索'
+        verbose_name_plural = '热门搜索'
+
+    def __str__(self):
+        return f"{self.query} ({self.search_count})"
+
+
 class GigReport(BaseModel):
     """Report inappropriate gigs"""
 
@@ -0,0 +1,187 @@
+"""
+Full-text search for gigs
+Tokenizes gig text (with Chinese segmentation) into a precomputed index and
+serves ranked matches through PostgreSQL tsvector/GIN or an inverted index table
+"""
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+try:
+    import jieba
+except ImportError:  # pragma: no cover - optional dependency
+    jieba = None
+
+# Fields that feed the search document; saves touching none of them skip reindexing
+INDEXED_FIELDS = frozenset({'title', 'description', 'tags', 'searchable_text'})
+
+MAX_TERM_LENGTH = 64
+
+_CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_RE = re.compile(rf'[a-z0-9]+|[{_CJK_CHARS}]+')
+_CJK_RE = re.compile(rf'[{_CJK_CHARS}]')
+
+
+def _segment_cjk(run):
+    """Split a run of CJK characters into search terms"""
+    if jieba is not None:
+        return [word for word in jieba.cut_for_search(run) if word.strip()]
+
+    # Without a dictionary fall back to overlapping bigrams, which match any
+    # substring of two or more characters once the query is split the same way
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def iter_tokens(text):
+    """
+    Yield ``(token, start, is_cjk)`` for every latin word and CJK run in the
+    lowercased ``text``; ``start`` is the token's offset in that string
+    """
+    for match in _TOKEN_RE.finditer((text or '').lower()):
+        token = match.group()
+        yield token, match.start(), bool(_CJK_RE.match(token))
+
+
+def tokenize(text):
+    """Normalize text into a list of search terms (duplicates preserved)"""
+    terms = []
+    for token, _, is_cjk in iter_tokens(text):
+        if is_cjk:
+            terms.extend(_segment_cjk(token))
+        else:
+            terms.append(token)
+    return [term[:MAX_TERM_LENGTH] for term in terms]
+
+
+def build_search_tokens(gig):
+    """Build the space separated token document stored on ``Gig.search_tokens``"""
+    # searchable_text already contains title, description and tags; tags are
+    # added again so that tag matches rank above body matches
+    return ' '.join(tokenize(f"{gig.searchable_text} {gig.tags}"))
+
+
+class BaseSearchBackend:
+    """Base class for gig search backends"""
+
+    def index_gig(self, gig):
+        """Refresh the index entries of a single gig"""
+        raise NotImplementedError
+
+    def search(self, queryset, terms):
+        """Filter ``queryset`` to gigs matching every term, annotated with ``search_rank``"""
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector search over ``Gig.search_tokens`` using the GIN expression index"""
+
+    config = 'simple'
+
+    def index_gig(self, gig):
+        # The tsvector is an expression index over search_tokens, which is
+        # refreshed on the row itself before save
+        pass
+
+    def search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = SearchVector('search_tokens', config=self.config)
+        query = SearchQuery(' '.join(terms), config=self.config, search_type='plain')
+        # Matching on the bare vector expression lets the planner use the GIN index
+        return queryset.annotate(
+            search_vector=vector
+        ).filter(
+            search_vector=query
+        ).annotate(
+            search_rank=SearchRank(vector, query)
+        )
+
+
+class InvertedIndexSearchBackend(BaseSearchBackend):
+    """Pure Python/ORM fallback backed by the ``GigSearchTerm`` table"""
+
+    def index_gig(self, gig):
+        from .models import GigSearchTerm
+
+        with transaction.atomic():
+            GigSearchTerm.objects.filter(gig=gig).delete()
+            if gig.is_deleted:
+                return
+            counts = Counter(gig.search_tokens.split())
+            GigSearchTerm.objects.bulk_create([
+                GigSearchTerm(gig=gig, term=term, weight=weight)
+                for term, weight in counts.items()
+            ])
+
+    def search(self, queryset, terms):
+        from .models import GigSearchTerm
+
+        unique_terms = set(terms)
+        matches = GigSearchTerm.objects.filter(
+            term__in=unique_terms
+        ).values('gig_id').annotate(
+            score=Sum('weight'),
+            hits=Count('term')
+        ).filter(hits=len(unique_terms))
+
+        return queryset.filter(
+            pk__in=matches.values('gig_id')
+        ).annotate(
+            search_rank=Subquery(matches.filter(gig_id=OuterRef('pk')).values('score')[:1])
+        )
+
+
+_BACKENDS = {
+    'postgres': PostgresSearchBackend,
+    'inverted_index': InvertedIndexSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the configured search backend, defaulting by database vendor"""
+    name = getattr(settings, 'GIG_SEARCH_BACKEND', None)
+    if not name:
+        name = 'postgres' if connection.vendor == 'postgresql' else 'inverted_index'
+
+    try:
+        return _BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unsupported gig search backend: {name}")
+
+
+def index_gig(gig):
+    """Refresh the search index for ``gig``"""
+    get_search_backend().index_gig(gig)
+
+
+def search_gigs(queryset, query):
+    """Apply a full-text query to a gig queryset, returning it annotated with ``search_rank``"""
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none()
+    return get_search_backend().search(queryset, terms)
+
+
+class GigSearchFilter(BaseFilterBackend):
+    """Drop-in replacement for ``SearchFilter`` that queries the gig search index"""
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        queryset = search_gigs(queryset, query)
+
+        # Rank only when the client did not ask for an explicit sort
+        if request.query_params.get('sort_by', 'relevance') == 'relevance':
+            queryset = queryset.order_by('-search_rank', *queryset.model._meta.ordering)
+        return queryset
@@ -0,0 +1,142 @@
+"""
+Asynchronous gig search logging
+List requests push search events into an event buffer; a flusher bulk-inserts a
+sample of raw GigSearchHistory rows and folds exact per-query counts into GigSearchQuery
+"""
+import logging
+import random
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from apps.common.buffers import create_event_buffer
+from apps.common.client_ip import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+QUERY_MAX_LENGTH = 200
+
+
+def normalize_query(query):
+    """Collapse case and whitespace so equivalent queries share one popularity row"""
+    return ' '.join(query.lower().split())[:QUERY_MAX_LENGTH]
+
+
+def build_search_event(request, query, results_count):
+    """Extract the fields needed to record a search from the request"""
+    return {
+        'query': query[:QUERY_MAX_LENGTH],
+        'user_id': str(request.user.pk) if request.user.is_authenticated else None,
+        'ip_address': get_client_ip(request),
+        'results_count': results_count,
+        'filters_applied': {key: request.query_params.getlist(key) for key in request.query_params},
+    }
+
+
+def write_search_batch(events, query_counts):
+    """
+    Persist a drained batch: query totals first, then the sampled history rows
+
+    The two writes commit separately, so a history row the database rejects
+    costs only that batch's GigSearchHistory rows, never the popularity counts.
+    """
+    from .models import GigSearchHistory, GigSearchQuery
+
+    if query_counts:
+        # Latest known result count per query, used to skip dead queries in suggestions;
+        # searches whose total was unknown keep the previous value
+        results = {
+            normalize_query(event['query']): event['results_count']
+            for event in events
+            if event['results_count'] is not None
+        }
+
+        with transaction.atomic():
+            GigSearchQuery.objects.bulk_create(
+                [GigSearchQuery(query=query) for query in query_counts],
+                ignore_conflicts=True
+            )
+
+            # One UPDATE for every query searched during the window
+            GigSearchQuery.objects.filter(query__in=list(query_counts)).update(
+                search_count=F('search_count') + Case(
+                    *[When(query=query, then=Value(count)) for query, count in query_counts.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+                last_results_count=Case(
+                    *[When(query=query, then=Value(count)) for query, count in results.items()],
+                    default=F('last_results_count'),
+                    output_field=IntegerField(),
+                ),
+                last_searched_at=timezone.now(),
+            )
+
+    # Searches without a usable client address are counted but not stored
+    history = [
+        GigSearchHistory(
+            query=event['query'],
+            user_id=event['user_id'],
+            ip_address=event['ip_address'],
+            results_count=event['results_count'],
+            filters_applied=event['filters_applied'],
+        )
+        for event in events
+        if event['ip_address']
+    ]
+    if history:
+        try:
+            with transaction.atomic():
+                GigSearchHistory.objects.bulk_create(history, batch_size=500)
+        except Exception as e:
+            logger.error(f"Failed to store {len(history)} search history rows: {str(e)}")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_search_log_buffer():
+    """Return the process-wide search log buffer for the configured backend"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = create_event_buffer(
+                    getattr(settings, 'GIG_SEARCH_LOG_BACKEND', 'memory'),
+                    'gig_searches',
+                    write_search_batch,
+                    max_size=getattr(settings, 'GIG_SEARCH_LOG_MAX_SIZE', 10000),
+                    batch_size=getattr(settings, 'GIG_SEARCH_LOG_BATCH_SIZE', 1000),
+                    flush_interval=getattr(settings, 'GIG_SEARCH_LOG_FLUSH_INTERVAL', 10),
+                )
+    return _buffer
+
+
+def record_gig_search(request, query, results_count):
+    """
+    Queue a search for logging
+
+    Every search counts towards the query's popularity; only a
+    ``GIG_SEARCH_LOG_SAMPLE_RATE`` fraction is kept as a raw history row.
+    """
+    key = normalize_query(query)
+    if not key:
+        return
+
+    try:
+        event = None
+        if random.random() < getattr(settings, 'GIG_SEARCH_LOG_SAMPLE_RATE', 1.0):
+            event = build_search_event(request, query, results_count)
+        get_search_log_buffer().add(key, event)
+    except Exception as e:
+        # Search logging must never break the list endpoint
+        logger.error(f"Failed to buffer search '{key}': {str(e)}")
+
+
+def flush_gig_search_log():
+    """Flush pending searches from the configured buffer"""
+    return get_search_log_buffer().flush()
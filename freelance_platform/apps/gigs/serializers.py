@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Q, Sum, Prefetch
 from django.utils.text import slugify
 from .models import (
     Category, Gig, GigPackage, GigRequirement, GigFAQ,
@@ -10,6 +10,26 @@ from .models import (
 User = get_user_model()
 
 
+def get_basic_package(gig):
+    """Return the gig's basic package, preferring prefetched data over a query"""
+    if hasattr(gig, 'basic_packages'):
+        return gig.basic_packages[0] if gig.basic_packages else None
+    if 'packages' in getattr(gig, '_prefetched_objects_cache', {}):
+        return next((package for package in gig.packages.all() if package.package_type == 'basic'), None)
+    return gig.packages.filter(package_type='basic').first()
+
+
+def serialize_basic_package(gig):
+    basic_package = get_basic_package(gig)
+    if basic_package:
+        return {
+            'title': basic_package.title,
+            'price': basic_package.price,
+            'delivery_days': basic_package.delivery_days,
+        }
+    return None
+
+
 class CategorySerializer(serializers.ModelSerializer):
     """分类序列化器"""
     children = serializers.SerializerMethodField()
@@ -92,12 +112,27 @@ class GigListSerializer(serializers.ModelSerializer):
             'basic_package', 'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        """预加载序列化所需的关联数据，使查询数量与分页大小无关"""
+        return queryset.select_related(
+            f'{prefix}freelancer__profile', f'{prefix}category'
+        ).prefetch_related(
+            Prefetch(
+                f'{prefix}packages',
+                queryset=GigPackage.objects.filter(package_type='basic'),
+                to_attr='basic_packages'
+            )
+        )
+
     def get_freelancer_info(self, obj):
-        if obj.freelancer.profile:
+        # 用户可能没有资料记录，getattr避免RelatedObjectDoesNotExist
+        profile = getattr(obj.freelancer, 'profile', None)
+        if profile:
             return {
                 'id': obj.freelancer.id,
                 'username': obj.freelancer.username,
-                'avatar': obj.freelancer.profile.avatar.url if obj.freelancer.profile.avatar else None,
+                'avatar': profile.avatar.url if profile.avatar else None,
                 'freelancer_since': obj.freelancer.date_joined,
             }
         return {
@@ -108,14 +143,7 @@ class GigListSerializer(serializers.ModelSerializer):
         }
 
     def get_basic_package(self, obj):
-        basic_package = obj.packages.filter(package_type='basic').first()
-        if basic_package:
-            return {
-                'title': basic_package.title,
-                'price': basic_package.price,
-                'delivery_days': basic_package.delivery_days,
-            }
-        return None
+        return serialize_basic_package(obj)
 
 
 class GigDetailSerializer(GigListSerializer):
@@ -136,7 +164,7 @@ class GigDetailSerializer(GigListSerializer):
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return GigFavorite.objects.filter(user=request.user, gig=obj).exists()
+            return GigFavorite.objects.filter(user=request.user, gig=obj, is_deleted=False).exists()
         return False
 
     def get_tags_list(self, obj):
@@ -303,7 +331,7 @@ class GigStatSerializer(serializers.ModelSerializer):
         model = GigStat
         fields = [
             'id', 'date', 'views', 'unique_views', 'clicks',
-            'orders', 'revenue', 'created_at'
+            'orders', 'revenue', 'favorites', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
 
@@ -318,10 +346,15 @@ class CategoryTreeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'icon', 'children', 'gig_count']
 
     def get_children(self, obj):
-        children = obj.children.filter(is_active=True)
+        # 由category_tree.load_category_tree预先组装时不再逐节点查询
+        children = getattr(obj, 'tree_children', None)
+        if children is None:
+            children = obj.children.filter(is_active=True)
         return CategoryTreeSerializer(children, many=True).data
 
     def get_gig_count(self, obj):
+        if hasattr(obj, 'subtree_gig_count'):
+            return obj.subtree_gig_count
         return obj.gigs.filter(status='active').count()
 
 
@@ -351,6 +384,10 @@ class GigSearchSerializer(serializers.Serializer):
     is_premium = serializers.BooleanField(required=False)
 
 
+# 计入月度统计的订单状态
+MONTHLY_ORDER_STATUSES = ['active', 'completed']
+
+
 class FreelancerGigSerializer(serializers.ModelSerializer):
     """自由职业者服务序列化器"""
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -369,31 +406,41 @@ class FreelancerGigSerializer(serializers.ModelSerializer):
         ]
 
     def get_basic_package(self, obj):
-        basic_package = obj.packages.filter(package_type='basic').first()
-        if basic_package:
-            return {
-                'title': basic_package.title,
-                'price': basic_package.price,
-                'delivery_days': basic_package.delivery_days,
-            }
-        return None
+        return serialize_basic_package(obj)
 
-    def get_monthly_orders(self, obj):
+    @staticmethod
+    def attach_monthly_metrics(gigs):
+        """一次分组聚合计算本页所有服务的近30天订单数和收入"""
         from django.utils import timezone
         from datetime import timedelta
+        from apps.orders.models import Order
+
+        gigs = list(gigs)
         thirty_days_ago = timezone.now() - timedelta(days=30)
-        return obj.orders.filter(
-            created_at__gte=thirty_days_ago,
-            status__in=['active', 'completed']
-        ).count()
+        metrics = {
+            row['gig_id']: row
+            for row in Order.objects.filter(
+                gig_id__in=[gig.pk for gig in gigs],
+                created_at__gte=thirty_days_ago,
+                status__in=MONTHLY_ORDER_STATUSES
+            ).values('gig_id').annotate(
+                order_total=Count('id'),
+                revenue_total=Sum('total_price')
+            )
+        }
+
+        for gig in gigs:
+            row = metrics.get(gig.pk, {})
+            gig.monthly_order_total = row.get('order_total', 0)
+            gig.monthly_revenue_total = row.get('revenue_total') or 0
+        return gigs
+
+    def get_monthly_orders(self, obj):
+        if not hasattr(obj, 'monthly_order_total'):
+            self.attach_monthly_metrics([obj])
+        return obj.monthly_order_total
 
     def get_monthly_revenue(self, obj):
-        from django.utils import timezone
-        from datetime import timedelta
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        return obj.orders.filter(
-            created_at__gte=thirty_days_ago,
-            status__in=['active', 'completed']
-        ).aggregate(
-            total=models.Sum('total_price')
-        )['total'] or 0
\ No newline at end of file
+        if not hasattr(obj, 'monthly_revenue_total'):
+            self.attach_monthly_metrics([obj])
+        return obj.monthly_revenue_total
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .category_tree import invalidate_category_tree
+from .models import Category, Gig, GigPackage
+from .search import INDEXED_FIELDS, index_gig
+
+# Gig fields that affect the cached category tree counts
+CATEGORY_TREE_FIELDS = frozenset({'status', 'category', 'category_id', 'is_deleted'})
+
+
+@receiver(post_save, sender=Gig)
+def update_gig_search_index(sender, instance, update_fields=None, **kwargs):
+    """Reindex a gig when its searchable text changes or it is soft deleted"""
+    # Hard deletes cascade to the index rows, so only saves need handling here
+    if update_fields is not None and not (
+        INDEXED_FIELDS.intersection(update_fields) or 'is_deleted' in update_fields
+    ):
+        return
+    index_gig(instance)
+
+
+@receiver([post_save, post_delete], sender=GigPackage)
+def update_gig_package_summary(sender, instance, **kwargs):
+    """Keep the gig's denormalized package price/delivery columns in sync"""
+    instance.gig.update_package_summary()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_tree_on_category_change(sender, **kwargs):
+    # Invalidate after commit so a concurrent rebuild cannot re-cache the old tree
+    transaction.on_commit(invalidate_category_tree)
+
+
+@receiver(post_save, sender=Gig)
+def invalidate_category_tree_on_gig_save(sender, update_fields=None, **kwargs):
+    if update_fields is None or CATEGORY_TREE_FIELDS.intersection(update_fields):
+        transaction.on_commit(invalidate_category_tree)
+
+
+@receiver(post_delete, sender=Gig)
+def invalidate_category_tree_on_gig_delete(sender, **kwargs):
+    transaction.on_commit(invalidate_category_tree)
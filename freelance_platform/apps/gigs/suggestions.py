@@ -0,0 +1,346 @@
+"""
+Search autocomplete
+Keeps a per-process sorted prefix index over active gig titles, tags, category
+names and popular search queries, so suggestions never scan ``gigs_gig``. A
+background thread in each process keeps the index fresh, off the request path.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .search import iter_tokens
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 64
+# Prefixes up to this length get weight-ordered buckets; longer ones are
+# usually narrow enough to read straight off the sorted key list
+BUCKET_PREFIX_LENGTH = 3
+# Upper bound on index entries examined per lookup, keeps short prefixes fast
+MAX_SCAN = 2000
+# Re-read rows updated slightly before the last refresh to catch late commits
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+SUGGESTION_LIMITS = {
+    'gig': 5,
+    'category': 3,
+    'tag': 5,
+    'query': 5,
+}
+
+
+def normalize_text(text):
+    return ' '.join((text or '').lower().split())
+
+
+def prefix_keys(text):
+    """
+    Index keys for ``text``: the normalized string starting at every word, and at
+    every character of CJK runs, so prefixes match anywhere a word begins
+    """
+    normalized = normalize_text(text)
+    starts = set()
+    for token, start, is_cjk in iter_tokens(normalized):
+        if is_cjk:
+            starts.update(range(start, start + len(token)))
+        else:
+            starts.add(start)
+    return {normalized[start:start + MAX_KEY_LENGTH] for start in starts}
+
+
+def bucket_prefixes(keys):
+    return {key[:length] for key in keys for length in range(1, min(len(key), BUCKET_PREFIX_LENGTH) + 1)}
+
+
+def split_tags(tags):
+    return [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+
+
+def gig_weight(row):
+    return row['view_count'] + 10 * row['order_count']
+
+
+class SuggestionIndex:
+    """
+    Sorted ``(key, kind, ident)`` list with entry texts and weights alongside,
+    plus ``(-weight, ident)`` buckets per short prefix and kind so broad
+    prefixes are answered in weight order
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}  # (kind, ident) -> [text, weight, keys, bucket prefixes]
+        self._buckets = {}  # (prefix, kind) -> sorted [(-weight, ident)]
+        self._gig_tags = {}  # gig id -> normalized tags it contributes
+        self._tag_counts = Counter()
+        self._lock = threading.RLock()
+        # While bulk loading a fresh index keys are appended and sorted once at the end
+        self._bulk = False
+        self.built_at = None
+        self.full_built_at = None
+
+    def put(self, kind, ident, text, weight):
+        with self._lock:
+            entry = self._entries.get((kind, ident))
+            if entry is not None and entry[0] == text:
+                if entry[1] != weight:
+                    self._unbucket(kind, ident, entry)
+                    entry[1] = weight
+                    self._bucket(kind, ident, entry)
+                return
+            self.remove(kind, ident)
+            keys = prefix_keys(text)
+            entry = [text, weight, keys, bucket_prefixes(keys)]
+            if self._bulk:
+                self._keys.extend((key, kind, ident) for key in keys)
+            else:
+                for key in keys:
+                    insort(self._keys, (key, kind, ident))
+            self._entries[(kind, ident)] = entry
+            self._bucket(kind, ident, entry)
+
+    def remove(self, kind, ident):
+        with self._lock:
+            entry = self._entries.pop((kind, ident), None)
+            if entry is None:
+                return
+            for key in entry[2]:
+                position = bisect_left(self._keys, (key, kind, ident))
+                if position < len(self._keys) and self._keys[position] == (key, kind, ident):
+                    del self._keys[position]
+            self._unbucket(kind, ident, entry)
+
+    def _bucket(self, kind, ident, entry):
+        # Bulk loads fill the buckets once, from the final weights, in finish_bulk()
+        if self._bulk:
+            return
+        for prefix in entry[3]:
+            insort(self._buckets.setdefault((prefix, kind), []), (-entry[1], ident))
+
+    def _unbucket(self, kind, ident, entry):
+        if self._bulk:
+            return
+        for prefix in entry[3]:
+            bucket = self._buckets.get((prefix, kind))
+            if not bucket:
+                continue
+            position = bisect_left(bucket, (-entry[1], ident))
+            if position < len(bucket) and bucket[position] == (-entry[1], ident):
+                del bucket[position]
+            if not bucket:
+                del self._buckets[(prefix, kind)]
+
+    def finish_bulk(self):
+        """Sort the appended keys and build the weight-ordered buckets in one pass"""
+        with self._lock:
+            self._keys.sort()
+            self._buckets = {}
+            for (kind, ident), entry in self._entries.items():
+                for prefix in entry[3]:
+                    self._buckets.setdefault((prefix, kind), []).append((-entry[1], ident))
+            for bucket in self._buckets.values():
+                bucket.sort()
+            self._bulk = False
+
+    def put_gig(self, row):
+        """Index an active gig's title and count its tags"""
+        gig_id = row['id']
+        self.put('gig', gig_id, row['title'], gig_weight(row))
+
+        tags = {normalize_text(tag): tag for tag in split_tags(row['tags'])}
+        old_tags = self._gig_tags.get(gig_id, {})
+        for tag in old_tags.keys() - tags.keys():
+            self._adjust_tag(tag, old_tags[tag], -1)
+        for tag in tags.keys() - old_tags.keys():
+            self._adjust_tag(tag, tags[tag], 1)
+        self._gig_tags[gig_id] = tags
+
+    def remove_gig(self, gig_id):
+        self.remove('gig', gig_id)
+        for tag, display in self._gig_tags.pop(gig_id, {}).items():
+            self._adjust_tag(tag, display, -1)
+
+    def _adjust_tag(self, tag, display, delta):
+        self._tag_counts[tag] += delta
+        if self._tag_counts[tag] <= 0:
+            del self._tag_counts[tag]
+            self.remove('tag', tag)
+        else:
+            entry = self._entries.get(('tag', tag))
+            self.put('tag', tag, entry[0] if entry else display, self._tag_counts[tag])
+
+    def suggest(self, query, limits=SUGGESTION_LIMITS):
+        """
+        Highest-weighted distinct texts per kind whose words start with ``query``
+
+        A prefix matching at most ``MAX_SCAN`` keys is ranked exactly from the
+        sorted key list. Broader prefixes walk their weight-ordered bucket
+        instead, so any cut-off drops the lightest entries, never the ones
+        that happen to sort last.
+        """
+        prefix = normalize_text(query)[:MAX_KEY_LENGTH]
+
+        with self._lock:
+            position = bisect_left(self._keys, (prefix,))
+            end = bisect_left(self._keys, (prefix + '\U0010ffff',), position)
+            if end - position > MAX_SCAN:
+                return {kind: self._top_texts(prefix, kind, limit) for kind, limit in limits.items()}
+
+            candidates = {kind: {} for kind in limits}
+            for key, kind, ident in self._keys[position:end]:
+                if kind not in candidates:
+                    continue
+                text, weight = self._entries[(kind, ident)][:2]
+                seen = candidates[kind].get(text)
+                if seen is None or weight > seen:
+                    candidates[kind][text] = weight
+
+        return {
+            kind: [text for text, _ in heapq.nlargest(limits[kind], found.items(), key=lambda item: item[1])]
+            for kind, found in candidates.items()
+        }
+
+    def _top_texts(self, prefix, kind, limit):
+        """
+        First ``limit`` distinct texts from the bucket for ``prefix``; a prefix
+        longer than the bucket's is filtered, examining at most ``MAX_SCAN`` entries
+        """
+        exact = len(prefix) <= BUCKET_PREFIX_LENGTH
+        texts = []
+        for examined, (_, ident) in enumerate(self._buckets.get((prefix[:BUCKET_PREFIX_LENGTH], kind), ())):
+            if len(texts) >= limit or (not exact and examined >= MAX_SCAN):
+                break
+            text, _, keys = self._entries[(kind, ident)][:3]
+            if text not in texts and (exact or any(key.startswith(prefix) for key in keys)):
+                texts.append(text)
+        return texts
+
+    def refresh(self, full=False):
+        """
+        Load rows changed since the last refresh; ``full`` rereads everything,
+        which also drops hard-deleted gigs and resyncs popularity weights
+        """
+        from .models import Category, Gig, GigSearchQuery
+
+        started = timezone.now()
+        since = None if full or self.built_at is None else self.built_at - REFRESH_OVERLAP
+
+        gigs = Gig.objects.values('id', 'title', 'tags', 'status', 'is_deleted', 'view_count', 'order_count')
+        queries = GigSearchQuery.objects.values('query', 'search_count', 'last_results_count')
+        if since is not None:
+            gigs = gigs.filter(updated_at__gte=since)
+            queries = queries.filter(Q(updated_at__gte=since) | Q(last_searched_at__gte=since))
+
+        categories = Category.objects.filter(is_active=True).annotate(
+            active_gig_count=Count('gigs', filter=Q(gigs__status='active'))
+        ).values('id', 'name', 'active_gig_count')
+
+        # Read outside the lock so lookups keep being served during the queries
+        gig_rows = list(gigs.iterator(chunk_size=2000))
+        query_rows = list(queries.iterator(chunk_size=2000))
+        category_rows = list(categories)
+
+        target = self if since is not None else SuggestionIndex()
+        with target._lock:
+            target._bulk = target is not self
+            target._apply(gig_rows, category_rows, query_rows)
+            if target._bulk:
+                target.finish_bulk()
+
+        with self._lock:
+            if target is not self:
+                self._keys, self._entries, self._buckets = target._keys, target._entries, target._buckets
+                self._gig_tags, self._tag_counts = target._gig_tags, target._tag_counts
+                self.full_built_at = started
+            self.built_at = started
+
+    def _apply(self, gig_rows, category_rows, query_rows):
+        for row in gig_rows:
+            if row['status'] == 'active' and not row['is_deleted']:
+                self.put_gig(row)
+            else:
+                self.remove_gig(row['id'])
+
+        current = {row['id'] for row in category_rows}
+        for row in category_rows:
+            self.put('category', row['id'], row['name'], row['active_gig_count'])
+        for kind, ident in [key for key in self._entries if key[0] == 'category']:
+            if ident not in current:
+                self.remove(kind, ident)
+
+        for row in query_rows:
+            # Queries known to find nothing are not worth suggesting
+            if row['last_results_count'] != 0:
+                self.put('query', row['query'], row['query'], row['search_count'])
+            else:
+                self.remove('query', row['query'])
+
+
+_index = SuggestionIndex()
+_build_lock = threading.Lock()
+_refresher = None
+
+
+def refresh_suggestion_index():
+    """Incremental refresh, or a full rebuild once ``GIG_SUGGESTION_REBUILD_INTERVAL`` has passed"""
+    rebuild_interval = getattr(settings, 'GIG_SUGGESTION_REBUILD_INTERVAL', 3600)
+    full = (
+        _index.full_built_at is None
+        or timezone.now() - _index.full_built_at >= timedelta(seconds=rebuild_interval)
+    )
+    _index.refresh(full=full)
+
+
+def _run_refresher():
+    interval = getattr(settings, 'GIG_SUGGESTION_REFRESH_INTERVAL', 60)
+    while True:
+        time.sleep(interval)
+        close_old_connections()
+        try:
+            refresh_suggestion_index()
+        except Exception as e:
+            logger.error(f"Failed to refresh search suggestion index: {str(e)}")
+        finally:
+            close_old_connections()
+
+
+def _ensure_refresher():
+    global _refresher
+    if _refresher is not None:
+        return
+    with _build_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_run_refresher, name='gig-suggestions-refresher', daemon=True)
+            _refresher.start()
+
+
+def get_suggestion_index():
+    """
+    Return the process-wide index
+
+    The first lookup in a process builds it; after that a background thread
+    refreshes it every ``GIG_SUGGESTION_REFRESH_INTERVAL`` seconds, so requests
+    only ever read.
+    """
+    if _index.built_at is None:
+        with _build_lock:
+            if _index.built_at is None:
+                try:
+                    _index.refresh(full=True)
+                except Exception as e:
+                    logger.error(f"Failed to build search suggestion index: {str(e)}")
+    _ensure_refresher()
+    return _index
+
+
+def get_suggestions(query):
+    return get_suggestion_index().suggest(query)
@@ -0,0 +1,23 @@
+from celery import shared_task
+
+from .analytics import rollup_gig_stats
+from .search_history import flush_gig_search_log
+from .view_tracking import flush_gig_views
+
+
+@shared_task
+def flush_gig_view_buffer():
+    """Write buffered gig views to the database"""
+    return flush_gig_views()
+
+
+@shared_task
+def flush_gig_search_buffer():
+    """Write buffered gig searches and query popularity to the database"""
+    return flush_gig_search_log()
+
+
+@shared_task
+def rollup_gig_statistics():
+    """Incrementally roll new views, orders and favorites into GigStat"""
+    return rollup_gig_stats()
@@ -1,3 +1,325 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.accounts.models import User, UserProfile
+from apps.common.buffers import MemoryEventBuffer
+from . import search, suggestions, view_tracking
+from .analytics import rollup_gig_stats, summarize_gig_stats
+from .models import Category, Gig, GigFavorite, GigPackage, GigStat, GigView
+from .suggestions import SuggestionIndex
+
+
+class GigListQueryCountTests(TestCase):
+    """服务列表查询数量不随分页大小增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='设计')
+        for i in range(30):
+            freelancer = User.objects.create(
+                username=f'freelancer{i}',
+                email=f'freelancer{i}@example.com',
+                user_type='freelancer'
+            )
+            if i % 2:
+                UserProfile.objects.create(user=freelancer)
+            gig = Gig.objects.create(
+                title=f'Logo设计 {i}',
+                description='专业设计',
+                freelancer=freelancer,
+                category=cls.category,
+                tags='logo,设计',
+                searchable_text=f'Logo设计 {i} 专业设计 logo,设计',
+                slug=f'logo-{i}',
+                status='active'
+            )
+            for package_type, price in [('basic', 100 + i), ('premium', 300 + i)]:
+                GigPackage.objects.create(
+                    gig=gig,
+                    package_type=package_type,
+                    title=package_type,
+                    description='套餐',
+                    price=price,
+                    delivery_days=3
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get_query_count(self, page_size):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/gigs/', {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(context.captured_queries)
+
+    def test_query_count_is_constant_across_page_sizes(self):
+        self.assertEqual(self.get_query_count(5), self.get_query_count(25))
+
+    def test_list_uses_count_page_and_package_prefetch_only(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/gigs/', {'page_size': 20})
+        basic_package = response.data['results'][0]['basic_package']
+        self.assertEqual(basic_package['title'], 'basic')
+
+
+@mock.patch.object(suggestions, 'MAX_SCAN', 5)
+class SuggestionRankingTests(SimpleTestCase):
+    """搜索建议：前缀命中超过扫描上限时仍按权重排序，而不是按字母顺序截断"""
+
+    def setUp(self):
+        self.index = SuggestionIndex()
+        for i in range(10):
+            self.index.put('query', f'design a{i}', f'design a{i}', i)
+        self.index.put('query', 'design zz', 'design zz', 100)
+
+    def test_broad_prefix_returns_the_heaviest_entries(self):
+        expected = ['design zz', 'design a9', 'design a8', 'design a7', 'design a6']
+        self.assertEqual(self.index.suggest('de')['query'], expected)
+        # Longer than the bucket prefix, so the bucket is filtered
+        self.assertEqual(self.index.suggest('design')['query'], expected)
+
+    def test_filtered_bucket_stops_at_the_scan_limit_in_weight_order(self):
+        # 'design zz' uses one of the five entries examined, lighter matches are the ones left out
+        self.assertEqual(self.index.suggest('design a')['query'], ['design a9', 'design a8', 'design a7', 'design a6'])
+
+    def test_narrow_prefix_is_ranked_exactly(self):
+        self.index.put('query', 'design a1x', 'design a1x', 50)
+        self.assertEqual(self.index.suggest('design a1')['query'], ['design a1x', 'design a1'])
+
+    def test_weight_changes_and_removals_reorder_the_buckets(self):
+        self.index.put('query', 'design zz', 'design zz', 0)
+        self.index.remove('query', 'design a9')
+        self.assertEqual(self.index.suggest('de')['query'], ['design a8', 'design a7', 'design a6', 'design a5', 'design a4'])
+
+
+@mock.patch.object(suggestions, 'MAX_SCAN', 5)
+class SuggestionIndexRefreshTests(TestCase):
+    """搜索建议：全量重建后的索引同样按权重返回服务标题"""
+
+    @classmethod
+    def setUpTestData(cls):
+        freelancer = User.objects.create(username='designer', email='designer@example.com', user_type='freelancer')
+        category = Category.objects.create(name='设计')
+        for i in range(8):
+            Gig.objects.create(
+                title=f'Logo设计 {i}',
+                description='专业设计',
+                freelancer=freelancer,
+                category=category,
+                tags='logo',
+                searchable_text=f'Logo设计 {i}',
+                slug=f'logo-{i}',
+                status='active',
+                view_count=100 if i == 7 else i
+            )
+
+    def test_full_rebuild_ranks_gigs_by_weight(self):
+        index = SuggestionIndex()
+        index.refresh(full=True)
+        result = index.suggest('lo')
+        self.assertEqual(result['gig'], ['Logo设计 7', 'Logo设计 6', 'Logo设计 5', 'Logo设计 4', 'Logo设计 3'])
+        self.assertEqual(result['tag'], ['logo'])
+
+
+class GigStatRollupTests(TestCase):
+    """服务统计汇总：增量执行不重复计数，取消收藏抵消收藏，独立访客草图可合并"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create(username='designer', email='designer@example.com', user_type='freelancer')
+        cls.fan = User.objects.create(username='fan', email='fan@example.com')
+        cls.gig = Gig.objects.create(
+            title='Logo设计',
+            description='专业设计',
+            freelancer=cls.freelancer,
+            category=Category.objects.create(name='设计'),
+            tags='logo',
+            searchable_text='Logo设计',
+            slug='logo',
+            status='active'
+        )
+
+    def add_views(self, ips, created_at=None):
+        views = GigView.objects.bulk_create([GigView(gig=self.gig, ip_address=ip) for ip in ips])
+        if created_at is not None:
+            GigView.objects.filter(pk__in=[view.pk for view in views]).update(created_at=created_at)
+
+    def totals(self):
+        return summarize_gig_stats(GigStat.objects.filter(gig=self.gig))
+
+    def test_rerun_does_not_double_count(self):
+        until = timezone.now() + timedelta(minutes=1)
+        self.add_views(['10.0.0.1', '10.0.0.2', '10.0.0.1'])
+        rollup_gig_stats(until)
+        self.assertEqual(rollup_gig_stats(until), {})
+
+        # Only rows past the previous high-water mark are added by the next run
+        self.add_views(['10.0.0.3', '10.0.0.4'], created_at=until + timedelta(seconds=1))
+        rollup_gig_stats(until + timedelta(minutes=1))
+        rollup_gig_stats(until + timedelta(minutes=2))
+
+        totals = self.totals()
+        self.assertEqual(totals['views'], 5)
+        self.assertEqual(totals['unique_views'], 4)
+
+    def test_unfavorite_cancels_the_favorite(self):
+        until = timezone.now() + timedelta(minutes=1)
+        favorite = GigFavorite.objects.create(user=self.fan, gig=self.gig)
+        rollup_gig_stats(until)
+        self.assertEqual(self.totals()['favorites'], 1)
+
+        favorite.soft_delete()
+        GigFavorite.objects.filter(pk=favorite.pk).update(deleted_at=until + timedelta(seconds=1))
+        rollup_gig_stats(until + timedelta(minutes=1))
+        self.assertEqual(self.totals()['favorites'], 0)
+
+    def test_favorite_and_unfavorite_in_one_window_net_to_zero(self):
+        GigFavorite.objects.create(user=self.fan, gig=self.gig).soft_delete()
+        rollup_gig_stats(timezone.now() + timedelta(minutes=1))
+        self.assertEqual(list(GigStat.objects.filter(gig=self.gig).values_list('favorites', flat=True)), [0])
+
+    def test_merged_unique_visitors_stay_within_tolerance(self):
+        ips = [f'10.0.{i // 256}.{i % 256}' for i in range(900)]
+        # 600 visitors a day, 300 of them on both days
+        self.add_views(ips[:600], created_at=timezone.now() - timedelta(days=1))
+        self.add_views(ips[300:])
+        rollup_gig_stats(timezone.now() + timedelta(minutes=1))
+
+        stats = GigStat.objects.filter(gig=self.gig)
+        self.assertEqual(stats.count(), 2)
+        for stat in stats:
+            self.assertAlmostEqual(stat.unique_views, 600, delta=60)
+        totals = summarize_gig_stats(stats)
+        self.assertEqual(totals['views'], 1200)
+        self.assertAlmostEqual(totals['unique_views'], 900, delta=90)
+
+
+class GigViewBufferTests(TestCase):
+    """浏览记录缓冲：刷新后浏览次数按服务合计，原始记录被丢弃时计数不丢"""
+
+    @classmethod
+    def setUpTestData(cls):
+        freelancer = User.objects.create(username='designer', email='designer@example.com', user_type='freelancer')
+        category = Category.objects.create(name='设计')
+        cls.gigs = [
+            Gig.objects.create(
+                title=f'Logo设计 {i}',
+                description='专业设计',
+                freelancer=freelancer,
+                category=category,
+                searchable_text=f'Logo设计 {i}',
+                slug=f'logo-{i}',
+                status='active'
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        # Flushes are driven by the test, not the background thread
+        flusher = mock.patch.object(MemoryEventBuffer, '_ensure_flusher')
+        flusher.start()
+        self.addCleanup(flusher.stop)
+
+    def view(self, buffer, gig, **headers):
+        request = APIRequestFactory().get('/', **headers)
+        request.user = mock.Mock(is_authenticated=False)
+        with mock.patch.object(view_tracking, 'get_view_buffer', return_value=buffer):
+            view_tracking.record_gig_view(gig, request)
+
+    def view_counts(self):
+        return [Gig.objects.get(pk=gig.pk).view_count for gig in self.gigs]
+
+    def test_flush_applies_view_counts_and_stores_rows(self):
+        buffer = MemoryEventBuffer('gig_views', view_tracking.write_view_batch, batch_size=2)
+        for _ in range(3):
+            self.view(buffer, self.gigs[0], REMOTE_ADDR='10.0.0.1')
+        self.view(buffer, self.gigs[1], REMOTE_ADDR='10.0.0.2')
+        # No usable address: counted, but no GigView row
+        self.view(buffer, self.gigs[1], HTTP_X_FORWARDED_FOR='unknown', REMOTE_ADDR='')
+
+        self.assertEqual(self.view_counts(), [0, 0])
+        buffer.flush()
+
+        self.assertEqual(self.view_counts(), [3, 2])
+        self.assertEqual(GigView.objects.count(), 4)
+
+    def test_shed_rows_still_count(self):
+        buffer = MemoryEventBuffer('gig_views', view_tracking.write_view_batch, max_size=2)
+        for _ in range(4):
+            self.view(buffer, self.gigs[0], REMOTE_ADDR='10.0.0.1')
+
+        with self.assertLogs('apps.common.buffers', 'WARNING'):
+            buffer.flush()
+
+        self.assertEqual(self.view_counts(), [4, 0])
+        self.assertEqual(GigView.objects.count(), 2)
+
+
+class GigSearchTests(TestCase):
+    """全文搜索：中文按二元组匹配，按相关性排序，删除或下架的服务不再出现"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancer = User.objects.create(username='designer', email='designer@example.com', user_type='freelancer')
+        category = Category.objects.create(name='设计')
+        # Index with the dictionary-free segmentation the assertions below rely on
+        with mock.patch.object(search, 'jieba', None):
+            cls.brand = cls.create_gig(category, '品牌标志设计', 'logo,品牌', '品牌标志设计 品牌视觉 logo,品牌')
+            cls.poster = cls.create_gig(category, '海报设计', '海报', '海报设计 顺带品牌配色 海报')
+
+    @classmethod
+    def create_gig(cls, category, title, tags, searchable_text):
+        return Gig.objects.create(
+            title=title,
+            description='专业设计',
+            freelancer=cls.freelancer,
+            category=category,
+            tags=tags,
+            searchable_text=searchable_text,
+            slug=f'gig-{Gig.objects.count()}',
+            status='active'
+        )
+
+    def setUp(self):
+        for patcher in (mock.patch.object(search, 'jieba', None), mock.patch('apps.gigs.views.record_gig_search')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get('/api/gigs/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['results']]
+
+    def test_cjk_substrings_match_through_bigrams(self):
+        self.assertEqual(self.search('标志设'), ['品牌标志设计'])
+        self.assertEqual(self.search('海报'), ['海报设计'])
+        # Every bigram of the query has to be present
+        self.assertEqual(self.search('志海'), [])
+
+    def test_results_are_ranked_by_relevance(self):
+        # '品牌' recurs in the brand gig's title, text and tags but appears once in the newer poster gig
+        self.assertEqual(self.search('品牌'), ['品牌标志设计', '海报设计'])
+        self.assertEqual(self.search('海报 设计'), ['海报设计'])
+
+    def test_deactivated_gig_leaves_the_results(self):
+        gig = Gig.objects.get(pk=self.poster.pk)
+        gig.status = 'paused'
+        gig.save()
+        self.assertEqual(self.search('海报'), [])
+
+    def test_deleted_gig_leaves_the_results(self):
+        self.client.force_authenticate(self.freelancer)
+        response = self.client.delete(f'/api/gigs/{self.poster.slug}/delete/')
+        self.assertEqual(response.status_code, 204)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.search('海报'), [])
+        self.assertEqual(self.search('品牌'), ['品牌标志设计'])
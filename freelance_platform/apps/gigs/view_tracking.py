@@ -0,0 +1,102 @@
+"""
+Buffered gig view ingestion
+Detail requests append view events to an in-process or Redis event buffer; a flusher
+writes them with bulk_create and applies one coalesced view_count increment per gig
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from apps.common.buffers import create_event_buffer
+from apps.common.client_ip import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT_MAX_LENGTH = 512
+
+
+def build_view_event(gig, request):
+    """Extract the fields needed to record a view from the request"""
+    return {
+        'gig_id': str(gig.pk),
+        'user_id': str(request.user.pk) if request.user.is_authenticated else None,
+        'ip_address': get_client_ip(request),
+        'user_agent': request.META.get('HTTP_USER_AGENT', '')[:USER_AGENT_MAX_LENGTH],
+    }
+
+
+def write_view_batch(events, view_counts):
+    """
+    Persist a drained batch: coalesced counters first, then the raw views
+
+    The two writes commit separately, so a raw row the database rejects costs
+    only that batch's GigView rows, never the view_count increments.
+    """
+    from .models import Gig, GigView
+
+    if view_counts:
+        # One UPDATE for every gig viewed during the window
+        Gig.objects.filter(pk__in=list(view_counts)).update(
+            view_count=F('view_count') + Case(
+                *[When(pk=gig_id, then=Value(count)) for gig_id, count in view_counts.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+
+    # Views without a usable client address are counted but not stored
+    views = [
+        GigView(
+            gig_id=event['gig_id'],
+            user_id=event['user_id'],
+            ip_address=event['ip_address'],
+            user_agent=event['user_agent'],
+        )
+        for event in events
+        if event['ip_address']
+    ]
+    if views:
+        try:
+            with transaction.atomic():
+                GigView.objects.bulk_create(views, batch_size=500)
+        except Exception as e:
+            logger.error(f"Failed to store {len(views)} gig views: {str(e)}")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_view_buffer():
+    """Return the process-wide view buffer for the configured backend"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = create_event_buffer(
+                    getattr(settings, 'GIG_VIEW_BUFFER_BACKEND', 'memory'),
+                    'gig_views',
+                    write_view_batch,
+                    max_size=getattr(settings, 'GIG_VIEW_BUFFER_MAX_SIZE', 10000),
+                    batch_size=getattr(settings, 'GIG_VIEW_FLUSH_BATCH_SIZE', 1000),
+                    flush_interval=getattr(settings, 'GIG_VIEW_FLUSH_INTERVAL', 10),
+                )
+    return _buffer
+
+
+def record_gig_view(gig, request):
+    """Queue a view of ``gig``; the write happens on the next flush"""
+    try:
+        event = build_view_event(gig, request)
+        get_view_buffer().add(event['gig_id'], event)
+    except Exception as e:
+        # View tracking must never break the detail page
+        logger.error(f"Failed to buffer view for gig {gig.pk}: {str(e)}")
+
+
+def flush_gig_views():
+    """Flush pending views from the configured buffer"""
+    return get_view_buffer().flush()
@@ -7,7 +7,7 @@ from rest_framework import status, permissions, generics, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django.http import Http404
 
 from .models import (
@@ -21,6 +21,13 @@ from .serializers import (
     GigSearchHistorySerializer, GigReportSerializer, GigStatSerializer,
     CategoryTreeSerializer, GigSearchSerializer, FreelancerGigSerializer
 )
+from apps.common.pagination import KeysetOptInPagination
+from .analytics import summarize_gig_stats
+from .category_tree import get_category_tree
+from .search import GigSearchFilter
+from .search_history import record_gig_search
+from .suggestions import get_suggestions
+from .view_tracking import record_gig_view
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -42,17 +49,24 @@ class StandardResultsSetPagination(PageNumberPagination):
         })
 
 
+class GigListPagination(KeysetOptInPagination):
+    """服务列表分页器，?pagination=cursor 时切换为游标分页（不做COUNT，深翻页不变慢）"""
+    page_number_class = StandardResultsSetPagination
+
+
 class CategoryListAPIView(generics.ListAPIView):
     """分类列表API"""
     queryset = Category.objects.filter(is_active=True, parent=None)
     serializer_class = CategoryTreeSerializer
     permission_classes = [permissions.AllowAny]
 
-    def get_queryset(self):
-        return Category.objects.filter(
-            is_active=True,
-            parent=None
-        ).prefetch_related('children')
+    def list(self, request, *args, **kwargs):
+        # 整棵分类树（含子树服务数）从缓存读取，分类或服务变更时失效
+        tree = get_category_tree()
+        page = self.paginate_queryset(tree)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(tree)
 
 
 class CategoryDetailAPIView(generics.RetrieveAPIView):
@@ -67,23 +81,23 @@ class GigListAPIView(generics.ListAPIView):
     """服务列表API"""
     serializer_class = GigListSerializer
     permission_classes = [permissions.AllowAny]
-    pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    search_fields = ['title', 'description', 'tags', 'searchable_text']
+    pagination_class = GigListPagination
+    # 全文搜索走预计算索引；默认排序由模型Meta和sort_by决定，避免覆盖相关性排序
+    filter_backends = [DjangoFilterBackend, GigSearchFilter, OrderingFilter]
     filterset_fields = ['category', 'status', 'is_featured', 'is_premium']
-    ordering_fields = ['created_at', 'updated_at', 'view_count', 'order_count', 'average_rating', 'price']
-    ordering = ['-is_featured', '-created_at']
+    ordering_fields = ['created_at', 'updated_at', 'view_count', 'order_count', 'average_rating', 'basic_price']
 
     def get_queryset(self):
-        queryset = Gig.objects.filter(status='active').select_related(
-            'freelancer', 'category'
-        ).prefetch_related('packages')
+        queryset = GigListSerializer.setup_eager_loading(
+            Gig.objects.filter(status='active')
+        )
 
         # 应用高级过滤
         category_id = self.request.query_params.get('category')
         freelancer_id = self.request.query_params.get('freelancer')
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
+        delivery_days = self.request.query_params.get('delivery_days')
         min_rating = self.request.query_params.get('min_rating')
         tags = self.request.query_params.get('tags')
         sort_by = self.request.query_params.get('sort_by', 'relevance')
@@ -95,16 +109,13 @@ class GigListAPIView(generics.ListAPIView):
             queryset = queryset.filter(freelancer_id=freelancer_id)
 
         if min_price:
-            queryset = queryset.filter(
-                packages__price__gte=min_price,
-                packages__package_type='basic'
-            ).distinct()
+            queryset = queryset.filter(basic_price__gte=min_price)
 
         if max_price:
-            queryset = queryset.filter(
-                packages__price__lte=max_price,
-                packages__package_type='basic'
-            ).distinct()
+            queryset = queryset.filter(basic_price__lte=max_price)
+
+        if delivery_days:
+            queryset = queryset.filter(basic_delivery_days__lte=delivery_days)
 
         if min_rating:
             queryset = queryset.filter(average_rating__gte=min_rating)
@@ -114,11 +125,11 @@ class GigListAPIView(generics.ListAPIView):
             for tag in tag_list:
                 queryset = queryset.filter(Q(tags__icontains=tag) | Q(searchable_text__icontains=tag))
 
-        # 排序逻辑
+        # 排序逻辑（基于冗余的基础套餐字段，无需关联套餐表）
         if sort_by == 'price_low':
-            queryset = queryset.order_by('packages__price').filter(packages__package_type='basic')
+            queryset = queryset.filter(basic_price__isnull=False).order_by('basic_price')
         elif sort_by == 'price_high':
-            queryset = queryset.order_by('-packages__price').filter(packages__package_type='basic')
+            queryset = queryset.filter(basic_price__isnull=False).order_by('-basic_price')
         elif sort_by == 'rating':
             queryset = queryset.order_by('-average_rating', '-review_count')
         elif sort_by == 'orders':
@@ -126,37 +137,27 @@ class GigListAPIView(generics.ListAPIView):
         elif sort_by == 'newest':
             queryset = queryset.order_by('-created_at')
         elif sort_by == 'delivery':
-            queryset = queryset.order_by('packages__delivery_days').filter(packages__package_type='basic')
+            queryset = queryset.filter(basic_delivery_days__isnull=False).order_by('basic_delivery_days')
 
-        return queryset.distinct()
+        return queryset
 
     def list(self, request, *args, **kwargs):
-        # 记录搜索历史
-        query = request.query_params.get('search', '')
-        if query:
-            GigSearchHistory.objects.create(
-                query=query,
-                user=request.user if request.user.is_authenticated else None,
-                ip_address=self.get_client_ip(request),
-                results_count=self.get_queryset().count(),
-                filters_applied=dict(request.query_params)
-            )
+        response = super().list(request, *args, **kwargs)
 
-        return super().list(request, *args, **kwargs)
+        # 记录搜索历史（异步写入，结果数取自已执行的分页，不再重复查询）
+        query = request.query_params.get('search', '').strip()
+        if query:
+            # 游标分页没有总数（也没有估算）时记为未知，不用本页条数冒充
+            results_count = response.data.get('count', response.data.get('approximate_count'))
+            record_gig_search(request, query, results_count)
 
-    def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return response
 
 
 class GigDetailAPIView(generics.RetrieveAPIView):
     """服务详情API"""
     queryset = Gig.objects.all().select_related(
-        'freelancer', 'category'
+        'freelancer__profile', 'category'
     ).prefetch_related(
         'packages', 'requirements', 'faqs', 'extras'
     )
@@ -167,36 +168,12 @@ class GigDetailAPIView(generics.RetrieveAPIView):
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
 
-        # 记录浏览
-        self.record_view(instance, request)
-
-        # 更新浏览次数
-        Gig.objects.filter(pk=instance.pk).update(view_count=models.F('view_count') + 1)
+        # 记录浏览（写入缓冲区，由后台批量落库并合并浏览次数）
+        record_gig_view(instance, request)
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
-    def record_view(self, gig, request):
-        """记录浏览信息"""
-        ip_address = self.get_client_ip(request)
-        user = request.user if request.user.is_authenticated else None
-        user_agent = request.META.get('HTTP_USER_AGENT', '')
-
-        GigView.objects.create(
-            gig=gig,
-            user=user,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-
-    def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
-
 
 class GigCreateAPIView(generics.CreateAPIView):
     """创建服务API"""
@@ -259,6 +236,13 @@ class FreelancerGigListAPIView(generics.ListAPIView):
             freelancer=self.request.user
         ).select_related('category').prefetch_related('packages')
 
+    def paginate_queryset(self, queryset):
+        # 月度订单/收入对整页服务做一次分组聚合，而非每个服务两次查询
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            page = FreelancerGigSerializer.attach_monthly_metrics(page)
+        return page
+
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -268,21 +252,23 @@ def toggle_gig_favorite(request, slug):
         gig = get_object_or_404(Gig, slug=slug)
         favorite, created = GigFavorite.objects.get_or_create(
             user=request.user,
-            gig=gig
+            gig=gig,
+            is_deleted=False
         )
 
         if not created:
-            favorite.delete()
+            # 软删除保留取消记录，供统计汇总扣减收藏数
+            favorite.soft_delete()
             is_favorited = False
             # 更新收藏次数
             Gig.objects.filter(pk=gig.pk).update(
-                favorite_count=models.F('favorite_count') - 1
+                favorite_count=F('favorite_count') - 1
             )
         else:
             is_favorited = True
             # 更新收藏次数
             Gig.objects.filter(pk=gig.pk).update(
-                favorite_count=models.F('favorite_count') + 1
+                favorite_count=F('favorite_count') + 1
             )
 
         return Response({
@@ -302,9 +288,9 @@ def toggle_gig_favorite(request, slug):
 def user_favorites(request):
     """获取用户收藏的服务"""
     try:
-        favorites = GigFavorite.objects.filter(
-            user=request.user
-        ).select_related('gig').order_by('-created_at')
+        favorites = GigListSerializer.setup_eager_loading(
+            GigFavorite.objects.filter(user=request.user, is_deleted=False), prefix='gig__'
+        ).order_by('-created_at')
 
         serializer = GigFavoriteSerializer(favorites, many=True)
 
@@ -408,38 +394,14 @@ def search_suggestions(request):
         if len(query) < 2:
             return Response({'suggestions': []})
 
-        # 基于标题、标签的分类建议
-        gig_suggestions = Gig.objects.filter(
-            Q(title__icontains=query) | Q(tags__icontains=query),
-            status='active'
-        ).values_list('title', flat=True)[:5]
-
-        # 分类建议
-        category_suggestions = Category.objects.filter(
-            Q(name__icontains=query),
-            is_active=True
-        ).values_list('name', flat=True)[:3]
-
-        # 标签建议
-        tag_suggestions = []
-        gigs_with_tags = Gig.objects.filter(
-            tags__icontains=query,
-            status='active'
-        ).values_list('tags', flat=True)
-
-        all_tags = []
-        for tags in gigs_with_tags:
-            if tags:
-                all_tags.extend([tag.strip() for tag in tags.split(',')])
-
-        # 去重并筛选包含查询的标签
-        unique_tags = list(set(all_tags))
-        tag_suggestions = [tag for tag in unique_tags if query.lower() in tag.lower()][:5]
+        # 前缀索引常驻内存（服务标题、标签、分类名、热门搜索），不查询服务表
+        suggestions = get_suggestions(query)
 
         return Response({
-            'gigs': list(gig_suggestions),
-            'categories': list(category_suggestions),
-            'tags': tag_suggestions
+            'gigs': suggestions['gig'],
+            'categories': suggestions['category'],
+            'tags': suggestions['tag'],
+            'queries': suggestions['query']
         })
 
     except Exception as e:
@@ -460,52 +422,25 @@ def gig_analytics(request, slug):
         if request.user != gig.freelancer and not request.user.is_staff:
             raise permissions.PermissionDenied("您只能查看自己服务的分析数据")
 
-        # 30天统计数据
+        # 30天统计数据（读取预汇总的每日统计，独立访客由HyperLogLog草图合并得出）
         from datetime import timedelta
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-
-        # 浏览统计
-        views = GigView.objects.filter(
-            gig=gig,
-            created_at__gte=thirty_days_ago
-        ).count()
-
-        unique_views = GigView.objects.filter(
-            gig=gig,
-            created_at__gte=thirty_days_ago
-        ).values('ip_address').distinct().count()
-
-        # 订单统计
-        orders = gig.orders.filter(
-            created_at__gte=thirty_days_ago
-        )
-
-        order_stats = orders.aggregate(
-            total_orders=Count('id'),
-            total_revenue=Sum('total_price')
-        )
-
-        # 收藏统计
-        favorites = GigFavorite.objects.filter(
-            gig=gig,
-            created_at__gte=thirty_days_ago
-        ).count()
+        start_date = timezone.localdate() - timedelta(days=30)
 
-        # 日统计数据
-        daily_stats = GigStat.objects.filter(
+        daily_stats = list(GigStat.objects.filter(
             gig=gig,
-            date__gte=thirty_days_ago.date()
-        ).order_by('date')
+            date__gte=start_date
+        ).order_by('date'))
+        totals = summarize_gig_stats(daily_stats)
 
         stats_serializer = GigStatSerializer(daily_stats, many=True)
 
         return Response({
             'period_days': 30,
-            'views': views,
-            'unique_views': unique_views,
-            'orders': order_stats['total_orders'] or 0,
-            'revenue': float(order_stats['total_revenue'] or 0),
-            'favorites': favorites,
+            'views': totals['views'],
+            'unique_views': totals['unique_views'],
+            'orders': totals['orders'],
+            'revenue': float(totals['revenue']),
+            'favorites': totals['favorites'],
             'daily_stats': stats_serializer.data
         })
 
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    Conversation, Message, MessageAttachment, MessageReaction,
+    Conversation, ConversationInbox, Message, MessageAttachment, MessageReaction,
     MessageReport, MessageTemplate, MessagingStat, BlockedUser, ConversationTag
 )
 
@@ -13,6 +13,15 @@ class ConversationAdmin(admin.ModelAdmin):
     ordering = ('-last_message_at',)
 
 
+@admin.register(ConversationInbox)
+class ConversationInboxAdmin(admin.ModelAdmin):
+    list_display = ('user', 'conversation', 'last_message_at', 'unread_count', 'is_archived', 'is_blocked')
+    list_filter = ('is_archived', 'is_blocked')
+    search_fields = ('user__username',)
+    ordering = ('-last_message_at',)
+    raw_id_fields = ('user', 'conversation')
+
+
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('conversation', 'sender', 'recipient', 'message_type', 'is_read', 'created_at')
@@ -0,0 +1,177 @@
+"""
+Bulk messaging
+Sends one text message from a sender to many recipients with a fixed number of
+queries per batch: recipients and blocks are loaded up front, missing direct
+conversations are created with bulk_create, messages are inserted with
+bulk_create, and the conversation summaries and inbox rows are updated with
+one UPDATE each
+"""
+import logging
+import uuid
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import BlockedUser, Conversation, ConversationInbox, Message
+from .realtime import publish_message_created
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def _parse_ids(recipient_ids):
+    """Distinct recipient UUIDs in request order, plus the entries that are not UUIDs"""
+    valid, invalid = {}, []
+    for value in recipient_ids:
+        try:
+            valid.setdefault(uuid.UUID(str(value)), value)
+        except ValueError:
+            invalid.append(value)
+    return valid, invalid
+
+
+def _direct_conversations(sender, recipient_ids):
+    """Existing direct conversation with each recipient, keyed by recipient id"""
+    conversations = {}
+    existing = Conversation.objects.filter(
+        Q(participant1=sender, participant2_id__in=recipient_ids) |
+        Q(participant2=sender, participant1_id__in=recipient_ids),
+        conversation_type='direct'
+    ).order_by('created_at')
+    for conversation in existing:
+        other_id = (
+            conversation.participant2_id if conversation.participant1_id == sender.pk
+            else conversation.participant1_id
+        )
+        conversations.setdefault(other_id, conversation)
+    return conversations
+
+
+def _send_batch(sender, recipients, content, subject):
+    """Deliver to one batch of ``recipients`` (User instances) inside one transaction"""
+    now = timezone.now()
+    recipient_ids = [recipient.pk for recipient in recipients]
+
+    with transaction.atomic():
+        conversations = _direct_conversations(sender, recipient_ids)
+
+        # Participants are ordered by id, as elsewhere for direct conversations
+        new_conversations = []
+        for recipient in recipients:
+            if recipient.pk not in conversations:
+                first, second = sorted([sender, recipient], key=lambda user: user.pk)
+                conversation = Conversation(
+                    participant1=first,
+                    participant2=second,
+                    conversation_type='direct',
+                    subject=subject,
+                    is_active=True
+                )
+                conversations[recipient.pk] = conversation
+                new_conversations.append(conversation)
+        Conversation.objects.bulk_create(new_conversations, batch_size=BATCH_SIZE)
+        # bulk_create skips post_save, so the inbox rows are created here as well
+        ConversationInbox.objects.bulk_create(
+            [entry for conversation in new_conversations for entry in ConversationInbox.entries_for(conversation)],
+            batch_size=BATCH_SIZE
+        )
+
+        messages = [
+            Message(
+                conversation=conversations[recipient.pk],
+                sender=sender,
+                recipient=recipient,
+                message_type='text',
+                content=content
+            )
+            for recipient in recipients
+        ]
+        Message.objects.bulk_create(messages, batch_size=BATCH_SIZE)
+
+        # One UPDATE for every conversation: last message plus the recipient's unread counter
+        conversation_ids = [message.conversation_id for message in messages]
+        recipient_is_first = [
+            message.conversation_id for message in messages
+            if message.conversation.participant1_id == message.recipient_id
+        ]
+        Conversation.objects.filter(pk__in=conversation_ids).update(
+            last_message=Case(
+                *[When(pk=message.conversation_id, then=Value(message.pk)) for message in messages],
+                default=F('last_message'),
+            ),
+            last_message_at=now,
+            participant1_unread_count=F('participant1_unread_count') + Case(
+                When(pk__in=recipient_is_first, then=Value(1)), default=Value(0), output_field=IntegerField()
+            ),
+            participant2_unread_count=F('participant2_unread_count') + Case(
+                When(pk__in=recipient_is_first, then=Value(0)), default=Value(1), output_field=IntegerField()
+            ),
+            updated_at=now,
+        )
+        ConversationInbox.objects.filter(conversation_id__in=conversation_ids).update(
+            last_message_at=now,
+            unread_count=Case(
+                When(user=sender, then=F('unread_count')), default=F('unread_count') + 1
+            ),
+            updated_at=now,
+        )
+
+        # bulk_create skips post_save, so realtime events are published here
+        for message in messages:
+            publish_message_created(message)
+
+    return len(messages)
+
+
+def send_bulk_messages(sender, recipient_ids, content, subject=''):
+    """
+    Send ``content`` from ``sender`` to every user in ``recipient_ids``
+
+    Returns ``(success_count, failed_users)`` where each failure is a dict with
+    ``user_id`` and ``reason`` (and ``username`` when the user exists).
+    """
+    from apps.accounts.models import User
+
+    content = content.strip()
+    ids, invalid = _parse_ids(recipient_ids)
+    failed_users = [{'user_id': value, 'reason': '用户不存在'} for value in invalid]
+    success_count = 0
+
+    id_list = list(ids)
+    for start in range(0, len(id_list), BATCH_SIZE):
+        batch_ids = id_list[start:start + BATCH_SIZE]
+        users = User.objects.in_bulk(batch_ids)
+
+        # Blocks in either direction, one query for the whole batch
+        blocked_ids = set()
+        for blocker_id, blocked_id in BlockedUser.objects.filter(
+            Q(blocker=sender, blocked_id__in=batch_ids) | Q(blocked=sender, blocker_id__in=batch_ids)
+        ).values_list('blocker_id', 'blocked_id'):
+            blocked_ids.add(blocked_id if blocker_id == sender.pk else blocker_id)
+
+        recipients = []
+        for user_id in batch_ids:
+            user = users.get(user_id)
+            if user is None:
+                failed_users.append({'user_id': ids[user_id], 'reason': '用户不存在'})
+            elif user_id in blocked_ids:
+                failed_users.append({'user_id': ids[user_id], 'username': user.username, 'reason': '用户被拉黑'})
+            elif user_id == sender.pk:
+                failed_users.append({'user_id': ids[user_id], 'username': user.username, 'reason': '不能给自己发送消息'})
+            else:
+                recipients.append(user)
+
+        if recipients:
+            try:
+                success_count += _send_batch(sender, recipients, content, subject)
+            except Exception as e:
+                logger.error(f"Bulk message batch from {sender.pk} failed: {str(e)}")
+                failed_users.extend(
+                    {'user_id': ids[user.pk], 'username': user.username, 'reason': str(e)}
+                    for user in recipients
+                )
+
+    return success_count, failed_users
+
@@ -0,0 +1,180 @@
+"""
+ASGI endpoints for real-time messaging
+A WebSocket and a Server-Sent Events stream that push the events published in
+``apps.messaging.realtime`` to the authenticated user. Both are plain asyncio
+coroutines, so an idle connection costs a queue and a parked task.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .realtime import get_pubsub, user_channel
+
+logger = logging.getLogger(__name__)
+
+
+def _heartbeat_interval():
+    return getattr(settings, 'MESSAGING_HEARTBEAT_INTERVAL', 25)
+
+
+def _get_token(scope):
+    """JWT access token from ``?token=`` or an ``Authorization: Bearer`` header"""
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if token:
+        return token
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0].lower() == 'bearer':
+                return parts[1]
+    return None
+
+
+@sync_to_async
+def _authenticate(token):
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+    authentication = JWTAuthentication()
+    try:
+        user = authentication.get_user(authentication.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    finally:
+        # These connections bypass Django's request cycle, which normally does this
+        close_old_connections()
+    return user if user.is_active else None
+
+
+async def authenticate_scope(scope):
+    token = _get_token(scope)
+    if not token:
+        return None
+    return await _authenticate(token)
+
+
+async def _wait_for_disconnect(receive, disconnect_type):
+    while True:
+        message = await receive()
+        if message['type'] == disconnect_type:
+            return
+
+
+async def _pump_events(queue, send_event, send_heartbeat):
+    """Forward queued payloads to the client, with a heartbeat while idle"""
+    while True:
+        try:
+            payload = await asyncio.wait_for(queue.get(), timeout=_heartbeat_interval())
+        except asyncio.TimeoutError:
+            await send_heartbeat()
+            continue
+        await send_event(payload)
+
+
+async def _stream(user, receive, disconnect_type, send_event, send_heartbeat):
+    """Subscribe ``user`` and pump events until the client goes away"""
+    pubsub = get_pubsub()
+    channel = user_channel(user.pk)
+    queue = await pubsub.subscribe(channel)
+    pump = asyncio.create_task(_pump_events(queue, send_event, send_heartbeat))
+    disconnect = asyncio.create_task(_wait_for_disconnect(receive, disconnect_type))
+    try:
+        done, _ = await asyncio.wait([pump, disconnect], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is not None:
+                logger.info(f"Realtime connection for {user.pk} closed: {task.exception()!r}")
+    finally:
+        for task in (pump, disconnect):
+            task.cancel()
+        await pubsub.unsubscribe(channel, queue)
+
+
+async def websocket_app(scope, receive, send):
+    """WebSocket endpoint; events are sent as JSON text frames"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    user = await authenticate_scope(scope)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def send_event(payload):
+        await send({'type': 'websocket.send', 'text': payload})
+
+    async def send_heartbeat():
+        await send({'type': 'websocket.send', 'text': json.dumps({'type': 'ping'})})
+
+    try:
+        await _stream(user, receive, 'websocket.disconnect', send_event, send_heartbeat)
+    except OSError:
+        # The socket went away mid-send
+        pass
+
+
+async def sse_app(scope, receive, send):
+    """Server-Sent Events endpoint for clients that cannot use WebSockets"""
+    user = await authenticate_scope(scope)
+    if user is None:
+        await send({
+            'type': 'http.response.start',
+            'status': 401,
+            'headers': [(b'content-type', b'application/json')],
+        })
+        await send({'type': 'http.response.body', 'body': json.dumps({'error': '身份验证失败'}).encode()})
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+
+    async def send_event(payload):
+        event_type = json.loads(payload).get('type', 'message')
+        body = f"event: {event_type}\ndata: {payload}\n\n".encode()
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+    async def send_heartbeat():
+        await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+
+    await send_heartbeat()
+    try:
+        await _stream(user, receive, 'http.disconnect', send_event, send_heartbeat)
+    except OSError:
+        pass
+
+
+class RealtimeRouter:
+    """
+    Route the realtime paths to their ASGI endpoints and everything else to Django
+
+    The WebSocket lives at ``MESSAGING_WEBSOCKET_PATH`` and the event stream at
+    ``MESSAGING_SSE_PATH``.
+    """
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get('path', '')
+        if scope['type'] == 'websocket':
+            if path == getattr(settings, 'MESSAGING_WEBSOCKET_PATH', '/ws/messaging/'):
+                return await websocket_app(scope, receive, send)
+            await receive()
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        if scope['type'] == 'http' and path == getattr(settings, 'MESSAGING_SSE_PATH', '/api/messaging/stream/'):
+            return await sse_app(scope, receive, send)
+        return await self.django_application(scope, receive, send)
@@ -0,0 +1,20 @@
+"""
+消息系统过滤器
+"""
+
+import django_filters
+
+from .models import Conversation, ConversationInbox
+
+
+class ConversationInboxFilter(django_filters.FilterSet):
+    """收件箱过滤器，参数名与原对话列表保持一致"""
+    conversation_type = django_filters.ChoiceFilter(
+        field_name='conversation__conversation_type',
+        choices=Conversation.CONVERSATION_TYPES
+    )
+    is_active = django_filters.BooleanFilter(field_name='conversation__is_active')
+
+    class Meta:
+        model = ConversationInbox
+        fields = ['conversation_type', 'is_active', 'is_archived']
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:30
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_inbox(apps, schema_editor):
+    """One inbox row per participant of every existing conversation"""
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationInbox = apps.get_model('messaging', 'ConversationInbox')
+
+    batch = []
+    for conversation in Conversation.objects.iterator(chunk_size=500):
+        for prefix in ('participant1', 'participant2'):
+            batch.append(ConversationInbox(
+                user_id=getattr(conversation, f'{prefix}_id'),
+                conversation_id=conversation.pk,
+                last_message_at=conversation.last_message_at,
+                unread_count=getattr(conversation, f'{prefix}_unread_count'),
+                is_archived=getattr(conversation, f'is_archived_by_{prefix}'),
+                is_blocked=getattr(conversation, f'is_blocked_by_{prefix}'),
+            ))
+        if len(batch) >= 1000:
+            ConversationInbox.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ConversationInbox.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_alter_blockeduser_options_alter_conversation_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationInbox',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('is_archived', models.BooleanField(default=False)),
+                ('is_blocked', models.BooleanField(default=False)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='messaging.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '收件箱',
+                'verbose_name_plural': '收件箱',
+                'db_table': 'messaging_conversation_inbox',
+                'indexes': [models.Index(fields=['user', '-last_message_at'], name='messaging_c_user_id_de6f9c_idx'), models.Index(fields=['user', 'unread_count'], name='messaging_c_user_id_1e064f_idx')],
+                'unique_together': {('user', 'conversation')},
+            },
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
@@ -104,21 +104,159 @@ class Conversation(BaseModel):
             return self.participant2_unread_count
         return 0
 
+    def get_visible_messages(self, user):
+        """Messages of this conversation that ``user`` has not deleted for themselves"""
+        return self.messages.exclude(
+            models.Q(sender=user, is_deleted_by_sender=True) |
+            models.Q(recipient=user, is_deleted_by_recipient=True)
+        )
+
+    def _unread_field(self, user_id):
+        """Name of ``user_id``'s unread counter, or None for non-participants"""
+        if user_id == self.participant1_id:
+            return 'participant1_unread_count'
+        if user_id == self.participant2_id:
+            return 'participant2_unread_count'
+        return None
+
     def mark_as_read(self, user):
-        """Mark conversation as read for a specific user"""
-        if user == self.participant1:
-            self.participant1_unread_count = 0
-        elif user == self.participant2:
-            self.participant2_unread_count = 0
-        self.save(update_fields=['participant1_unread_count', 'participant2_unread_count'])
+        """
+        Mark conversation as read for a specific user
+
+        Clears the user's counter and flags all their unread messages in two
+        UPDATEs; returns the number of messages marked read.
+        """
+        from .realtime import publish_conversation_read
+
+        field = self._unread_field(user.pk)
+        if field is None:
+            return 0
+
+        now = timezone.now()
+        Conversation.objects.filter(pk=self.pk).update(**{field: 0})
+        ConversationInbox.objects.filter(conversation=self, user=user).update(unread_count=0, updated_at=now)
+        setattr(self, field, 0)
+        marked = Message.objects.filter(conversation=self, recipient=user, is_read=False).update(
+            is_read=True, read_at=now, updated_at=now
+        )
+        publish_conversation_read(self, user, now)
+        return marked
+
+    def _recipient_unread_field(self, sender_id):
+        """Counter of the participant receiving a message from ``sender_id``"""
+        if sender_id == self.participant1_id:
+            return 'participant2_unread_count'
+        if sender_id == self.participant2_id:
+            return 'participant1_unread_count'
+        return None
 
     def increment_unread_count(self, sender):
-        """Increment unread count for recipient"""
-        if sender == self.participant1:
-            self.participant2_unread_count += 1
-        elif sender == self.participant2:
-            self.participant1_unread_count += 1
-        self.save(update_fields=['participant1_unread_count', 'participant2_unread_count'])
+        """Atomically increment the recipient's unread count"""
+        field = self._recipient_unread_field(sender.pk)
+        if field is not None:
+            Conversation.objects.filter(pk=self.pk).update(**{field: models.F(field) + 1})
+            ConversationInbox.objects.filter(conversation=self).exclude(user=sender).update(
+                unread_count=models.F('unread_count') + 1
+            )
+
+    def register_message(self, message):
+        """
+        Record a new message with one UPDATE per table: last message fields plus
+        the recipient's unread counter, bumped with F() so concurrent sends never
+        lose an increment, on the conversation and on both inbox rows
+
+        The in-memory counter is not refreshed; reload the row when it is needed.
+        """
+        field = self._recipient_unread_field(message.sender_id)
+        if field is None:
+            return
+
+        now = timezone.now()
+        self.last_message, self.last_message_at = message, message.created_at
+        Conversation.objects.filter(pk=self.pk).update(**{
+            field: models.F(field) + 1,
+            'last_message': message,
+            'last_message_at': message.created_at,
+            'updated_at': now,
+        })
+        ConversationInbox.objects.filter(conversation=self).update(
+            last_message_at=message.created_at,
+            unread_count=models.Case(
+                models.When(user_id=message.sender_id, then=models.F('unread_count')),
+                default=models.F('unread_count') + 1,
+            ),
+            updated_at=now,
+        )
+
+
+class ConversationInbox(BaseModel):
+    """
+    One participant's view of a conversation
+
+    Each conversation has a row per participant carrying what the inbox sorts and
+    filters on, so a user's inbox is a range scan of (user, last_message_at)
+    instead of an OR across both participant columns of Conversation.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inbox_entries')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='inbox_entries')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+    is_archived = models.BooleanField(default=False)
+    is_blocked = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'messaging_conversation_inbox'
+        verbose_name = '收件箱'
+        verbose_name_plural = '收件箱'
+        unique_together = ['user', 'conversation']
+        indexes = [
+            models.Index(fields=['user', '-last_message_at']),
+            models.Index(fields=['user', 'unread_count']),
+        ]
+
+    def __str__(self):
+        return f"Inbox entry of {self.user_id} for {self.conversation_id}"
+
+    @classmethod
+    def entries_for(cls, conversation):
+        """Unsaved rows for both participants, built from ``conversation``'s current state"""
+        return [
+            cls(
+                user_id=getattr(conversation, f'{prefix}_id'),
+                conversation=conversation,
+                last_message_at=conversation.last_message_at,
+                unread_count=getattr(conversation, f'{prefix}_unread_count'),
+                is_archived=getattr(conversation, f'is_archived_by_{prefix}'),
+                is_blocked=getattr(conversation, f'is_blocked_by_{prefix}'),
+            )
+            for prefix in ('participant1', 'participant2')
+        ]
+
+    @classmethod
+    def sync_conversation(cls, conversation, created=False):
+        """
+        Bring both participants' rows in line with a saved ``conversation``
+
+        Only the archive and block flags are copied onto existing rows; the
+        counters there are kept by their own atomic UPDATEs and may be newer
+        than the in-memory instance.
+        """
+        if created:
+            cls.objects.bulk_create(cls.entries_for(conversation), ignore_conflicts=True)
+            return
+        for entry in cls.entries_for(conversation):
+            cls.objects.update_or_create(
+                user_id=entry.user_id,
+                conversation=conversation,
+                defaults={'is_archived': entry.is_archived, 'is_blocked': entry.is_blocked},
+                create_defaults={
+                    'last_message_at': entry.last_message_at,
+                    'unread_count': entry.unread_count,
+                    'is_archived': entry.is_archived,
+                    'is_blocked': entry.is_blocked,
+                },
+            )
 
 
 class Message(BaseModel):
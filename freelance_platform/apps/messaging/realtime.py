@@ -0,0 +1,222 @@
+"""
+Real-time messaging fan-out
+Events are published to per-user channels; WebSocket and SSE connections
+(see ``apps.messaging.consumers``) subscribe to their user's channel. The memory
+backend serves a single process and tests, Redis fans out across workers.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+USER_CHANNEL = 'messaging:user:{user_id}'
+
+# Events kept per connection while it is busy sending; older ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def user_channel(user_id):
+    return USER_CHANNEL.format(user_id=user_id)
+
+
+def _deliver(queue, payload):
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        logger.warning("Realtime subscriber queue full, dropping event")
+
+
+class BasePubSub:
+    """
+    Base class for realtime pub/sub backends
+
+    ``publish`` is synchronous and may be called from any thread; ``subscribe``
+    and ``unsubscribe`` run on the event loop that owns the connection.
+    """
+
+    def __init__(self):
+        # channel -> {queue: loop}, only touched from event loops under the lock
+        self._subscribers = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, payload):
+        raise NotImplementedError
+
+    async def subscribe(self, channel):
+        """Return a queue receiving the JSON payloads published to ``channel``"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            first = not self._subscribers[channel]
+            self._subscribers[channel][queue] = asyncio.get_running_loop()
+        if first:
+            await self._listen(channel)
+        return queue
+
+    async def unsubscribe(self, channel, queue):
+        with self._lock:
+            self._subscribers[channel].pop(queue, None)
+            last = not self._subscribers[channel]
+            if last:
+                del self._subscribers[channel]
+        if last:
+            await self._unlisten(channel)
+
+    def _dispatch(self, channel, payload):
+        """Hand ``payload`` to every local subscriber of ``channel``"""
+        with self._lock:
+            targets = list(self._subscribers.get(channel, {}).items())
+        for queue, loop in targets:
+            loop.call_soon_threadsafe(_deliver, queue, payload)
+
+    async def _listen(self, channel):
+        pass
+
+    async def _unlisten(self, channel):
+        pass
+
+
+class MemoryPubSub(BasePubSub):
+    """In-process pub/sub for development, single-process servers and tests"""
+
+    def publish(self, channel, payload):
+        self._dispatch(channel, payload)
+
+
+class RedisPubSub(BasePubSub):
+    """
+    Redis pub/sub shared by all workers
+
+    Each worker holds one Redis subscription connection, subscribed only to the
+    channels of users connected to that worker, and fans payloads out locally.
+    """
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self.url = getattr(settings, 'REDIS_URL', 'redis://localhost:6379/0')
+        self.client = redis.Redis.from_url(self.url)
+        self._pubsub = None
+        self._reader = None
+
+    def publish(self, channel, payload):
+        self.client.publish(channel, payload)
+
+    async def _ensure_reader(self):
+        if self._pubsub is None:
+            import redis.asyncio
+
+            self._pubsub = redis.asyncio.Redis.from_url(self.url).pubsub()
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.5)
+                    continue
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    self._dispatch(message['channel'].decode(), message['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Realtime Redis reader failed: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def _listen(self, channel):
+        await self._ensure_reader()
+        await self._pubsub.subscribe(channel)
+
+    async def _unlisten(self, channel):
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(channel)
+
+
+PUBSUB_BACKENDS = {
+    'memory': MemoryPubSub,
+    'redis': RedisPubSub,
+}
+
+_pubsub = None
+_pubsub_lock = threading.Lock()
+
+
+def get_pubsub():
+    """Return the process-wide pub/sub backend selected by ``MESSAGING_PUBSUB_BACKEND``"""
+    global _pubsub
+    if _pubsub is None:
+        with _pubsub_lock:
+            if _pubsub is None:
+                backend = getattr(settings, 'MESSAGING_PUBSUB_BACKEND', 'memory')
+                try:
+                    _pubsub = PUBSUB_BACKENDS[backend]()
+                except KeyError:
+                    raise ValueError(f"Unsupported messaging pub/sub backend: {backend}")
+    return _pubsub
+
+
+def publish_to_users(user_ids, event):
+    """Publish ``event`` to each user's channel once the current transaction commits"""
+    payload = json.dumps(event, cls=DjangoJSONEncoder)
+    user_ids = list(dict.fromkeys(user_ids))
+
+    def send():
+        pubsub = get_pubsub()
+        for user_id in user_ids:
+            try:
+                pubsub.publish(user_channel(user_id), payload)
+            except Exception as e:
+                # Realtime delivery is best effort; clients can still fetch over HTTP
+                logger.error(f"Failed to publish realtime event to {user_id}: {str(e)}")
+
+    transaction.on_commit(send)
+
+
+def message_created_event(message):
+    return {
+        'type': 'message.created',
+        'conversation': message.conversation_id,
+        'message': {
+            'id': message.id,
+            'sender': message.sender_id,
+            'recipient': message.recipient_id,
+            'message_type': message.message_type,
+            'content': message.content,
+            'attachments': message.attachments,
+            'reply_to': message.reply_to_id,
+            'created_at': message.created_at,
+        },
+    }
+
+
+def publish_message_created(message):
+    # The sender gets it too, so their other devices stay in sync
+    publish_to_users([message.sender_id, message.recipient_id], message_created_event(message))
+
+
+def publish_message_read(message):
+    publish_to_users([message.sender_id], {
+        'type': 'message.read',
+        'conversation': message.conversation_id,
+        'message': message.id,
+        'read_at': message.read_at,
+    })
+
+
+def publish_conversation_read(conversation, reader, read_at):
+    """Tell both participants that ``reader`` has read everything in ``conversation``"""
+    publish_to_users([conversation.participant1_id, conversation.participant2_id], {
+        'type': 'conversation.read',
+        'conversation': conversation.id,
+        'reader': reader.pk,
+        'read_at': read_at,
+    })
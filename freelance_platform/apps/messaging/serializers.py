@@ -5,8 +5,12 @@
 """
 
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import models
+from django.urls import reverse
 from django.utils import timezone
+from apps.common.pagination import KeysetPagination
 from .models import (
     Conversation, Message, MessageAttachment, MessageTemplate,
     MessageReaction, BlockedUser, MessageReport, MessagingStat,
@@ -55,11 +59,22 @@ class ConversationListSerializer(serializers.ModelSerializer):
         return 0
 
 
+class ConversationInboxSerializer(ConversationListSerializer):
+    """收件箱序列化器：输出与对话列表相同，未读数和归档状态取自收件箱"""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance.conversation)
+        data['unread_count'] = instance.unread_count
+        data['is_archived'] = instance.is_archived
+        return data
+
+
 class ConversationDetailSerializer(serializers.ModelSerializer):
     """对话详情序列化器"""
     participant1_info = UserMinimalSerializer(source='participant1', read_only=True)
     participant2_info = UserMinimalSerializer(source='participant2', read_only=True)
     messages = serializers.SerializerMethodField()
+    older_messages_url = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -70,26 +85,67 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
             'is_archived_by_participant1', 'is_archived_by_participant2',
             'is_blocked_by_participant1', 'is_blocked_by_participant2',
             'participant1_unread_count', 'participant2_unread_count',
-            'unread_count', 'messages', 'created_at', 'updated_at'
+            'unread_count', 'messages', 'older_messages_url', 'created_at', 'updated_at'
         ]
-
-    def get_messages(self, obj):
-        """获取对话的消息列表"""
-        messages = obj.messages.filter(
-            # 过滤掉用户删除的消息
-            models.Q(is_deleted_by_sender=False) | models.Q(is_deleted_by_recipient=False)
-        ).order_by('created_at')
+        # 未读计数由 F() 表达式原子维护，不接受客户端写入
+        read_only_fields = ['id', 'participant1_unread_count', 'participant2_unread_count', 'created_at', 'updated_at']
+
+    def update(self, instance, validated_data):
+        """只保存提交的字段，整行保存会用内存中的旧值覆盖并发更新的未读计数"""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+    def _get_message_window(self, obj):
+        """
+        最近的消息窗口，按时间正序返回 ``(messages, older_messages_url)``
+
+        详情只带最近 ``MESSAGING_CONVERSATION_MESSAGE_WINDOW`` 条消息，更早的历史
+        通过消息列表接口按游标向前翻页。
+        """
+        if not hasattr(self, '_message_windows'):
+            self._message_windows = {}
+        if obj.pk in self._message_windows:
+            return self._message_windows[obj.pk]
 
         request = self.context.get('request')
-        if request and request.user:
+        if request and request.user.is_authenticated:
             # 过滤掉当前用户删除的消息
-            messages = messages.filter(
-                models.Q(~models.Q(sender=request.user, is_deleted_by_sender=True)) &
-                models.Q(~models.Q(recipient=request.user, is_deleted_by_recipient=True))
+            history = obj.get_visible_messages(request.user)
+        else:
+            history = obj.messages.all()
+        # 与消息列表接口的排序一致，游标才能通用
+        history = history.order_by('created_at')
+
+        size = getattr(settings, 'MESSAGING_CONVERSATION_MESSAGE_WINDOW', 50)
+        window = list(
+            history.select_related('sender', 'recipient').order_by('-created_at', '-id')[:size + 1]
+        )
+        has_older = len(window) > size
+        window = window[:size]
+        window.reverse()
+
+        older_messages_url = None
+        if has_older and request:
+            url = request.build_absolute_uri(
+                reverse('messaging:message-list-create', kwargs={'conversation_id': obj.pk})
             )
+            older_messages_url = KeysetPagination().get_cursor_link(history, url, window[0], reverse=True)
+
+        self._message_windows[obj.pk] = (window, older_messages_url)
+        return self._message_windows[obj.pk]
 
+    def get_messages(self, obj):
+        """获取最近的消息"""
+        messages, _ = self._get_message_window(obj)
         return MessageSerializer(messages, many=True, context=self.context).data
 
+    def get_older_messages_url(self, obj):
+        """更早消息的游标分页链接，没有更早消息时为 None"""
+        _, older_messages_url = self._get_message_window(obj)
+        return older_messages_url
+
     def get_unread_count(self, obj):
         """获取当前用户的未读消息数"""
         request = self.context.get('request')
@@ -119,6 +175,30 @@ class MessageAttachmentSerializer(serializers.ModelSerializer):
         return None
 
 
+def get_reaction_counts(messages):
+    """一次分组聚合取出多条消息的表情回应统计，返回 {message_id: [{reaction_type, count}]}"""
+    counts = {message.pk: [] for message in messages}
+    if counts:
+        rows = MessageReaction.objects.filter(message_id__in=list(counts)).values(
+            'message_id', 'reaction_type'
+        ).annotate(count=models.Count('id')).order_by('message_id', 'reaction_type')
+        for row in rows:
+            counts[row['message_id']].append({'reaction_type': row['reaction_type'], 'count': row['count']})
+    return counts
+
+
+class MessageListSerializer(serializers.ListSerializer):
+    """消息列表序列化器：整页消息的表情回应只查询一次"""
+
+    def to_representation(self, data):
+        messages = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.reaction_counts = get_reaction_counts(messages)
+        try:
+            return super().to_representation(messages)
+        finally:
+            self.child.reaction_counts = None
+
+
 class MessageSerializer(serializers.ModelSerializer):
     """消息序列化器"""
     sender_info = UserMinimalSerializer(source='sender', read_only=True)
@@ -137,9 +217,14 @@ class MessageSerializer(serializers.ModelSerializer):
             'reactions', 'is_mine', 'time_ago', 'metadata', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'sender', 'is_read', 'read_at', 'created_at', 'updated_at']
+        list_serializer_class = MessageListSerializer
+
+    reaction_counts = None
 
     def get_reactions(self, obj):
         """获取消息的表情回应"""
+        if self.reaction_counts is not None:
+            return self.reaction_counts.get(obj.pk, [])
         reactions = obj.reactions.values('reaction_type').annotate(count=models.Count('id'))
         return list(reactions)
 
@@ -205,11 +290,8 @@ class MessageSerializer(serializers.ModelSerializer):
             **validated_data
         )
 
-        # 更新对话的最后消息信息
-        conversation.last_message = message
-        conversation.last_message_at = message.created_at
-        conversation.increment_unread_count(request.user)
-        conversation.save()
+        # 一次 UPDATE 同时更新最后消息和接收者的未读数（F() 原子自增）
+        conversation.register_message(message)
 
         return message
 
@@ -234,6 +316,20 @@ class MessageCreateSerializer(serializers.ModelSerializer):
 
         return value
 
+    def create(self, validated_data):
+        """创建消息：一次 INSERT 加一次对话 UPDATE"""
+        request = self.context.get('request')
+        conversation = validated_data['conversation']
+
+        if request.user.pk == conversation.participant1_id:
+            recipient_id = conversation.participant2_id
+        else:
+            recipient_id = conversation.participant1_id
+
+        message = Message.objects.create(sender=request.user, recipient_id=recipient_id, **validated_data)
+        conversation.register_message(message)
+        return message
+
 
 class MessageReactionSerializer(serializers.ModelSerializer):
     """消息表情回应序列化器"""
@@ -318,11 +414,13 @@ class BlockedUserSerializer(serializers.ModelSerializer):
         )
 
         for conversation in conversations:
-            if conversation.participant1 == request.user:
-                conversation.is_blocked_by_participant1 = True
+            if conversation.participant1_id == request.user.pk:
+                flag = 'is_blocked_by_participant1'
             else:
-                conversation.is_blocked_by_participant2 = True
-            conversation.save()
+                flag = 'is_blocked_by_participant2'
+            setattr(conversation, flag, True)
+            # 只写拉黑标记，不覆盖由 F() 维护的未读计数和最后消息
+            conversation.save(update_fields=[flag, 'updated_at'])
 
         return super().create(validated_data)
 
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Conversation, ConversationInbox, Message
+from .realtime import publish_message_created, publish_message_read
+
+
+@receiver(post_save, sender=Message)
+def publish_message_events(sender, instance, created=False, update_fields=None, **kwargs):
+    """Push new messages and read receipts to the participants' realtime channels"""
+    if created:
+        publish_message_created(instance)
+    elif update_fields is not None and 'is_read' in update_fields and instance.is_read:
+        publish_message_read(instance)
+
+
+@receiver(post_save, sender=Conversation)
+def sync_conversation_inbox(sender, instance, created=False, **kwargs):
+    """Keep both participants' inbox rows in line with the conversation"""
+    ConversationInbox.sync_conversation(instance, created=created)
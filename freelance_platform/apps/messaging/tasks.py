@@ -0,0 +1,17 @@
+from celery import shared_task
+
+from .bulk import send_bulk_messages
+
+
+@shared_task
+def send_bulk_messages_task(sender_id, recipient_ids, content, subject=''):
+    """Deliver a broadcast too large to send within the request"""
+    from apps.accounts.models import User
+
+    sender = User.objects.get(pk=sender_id)
+    success_count, failed_users = send_bulk_messages(sender, recipient_ids, content, subject)
+    return {
+        'success_count': success_count,
+        'failed_count': len(failed_users),
+        'failed_users': failed_users,
+    }
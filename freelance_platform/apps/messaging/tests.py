@@ -1,3 +1,281 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.models import User
+from . import consumers, realtime
+from .bulk import send_bulk_messages
+from .models import Conversation, ConversationInbox, Message
+from .realtime import MemoryPubSub, user_channel
+
+
+class MessagingTestCase(TestCase):
+    """两个用户之间的一个私信对话"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(username='alice', email='alice@example.com')
+        cls.bob = User.objects.create(username='bob', email='bob@example.com')
+        cls.conversation = Conversation.objects.create(participant1=cls.alice, participant2=cls.bob)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def send(self, sender, recipient, content='你好'):
+        conversation = Conversation.objects.get(pk=self.conversation.pk)
+        message = Message.objects.create(conversation=conversation, sender=sender, recipient=recipient, content=content)
+        conversation.register_message(message)
+        return message
+
+    def reload(self):
+        return Conversation.objects.get(pk=self.conversation.pk)
+
+
+class ConversationCounterTests(MessagingTestCase):
+    """未读计数由 F() 原子维护，过期的内存对象不会覆盖它"""
+
+    def test_each_message_increments_only_the_recipient(self):
+        self.send(self.alice, self.bob)
+        self.send(self.alice, self.bob)
+        reply = self.send(self.bob, self.alice)
+
+        conversation = self.reload()
+        self.assertEqual(conversation.participant2_unread_count, 2)
+        self.assertEqual(conversation.participant1_unread_count, 1)
+        self.assertEqual(conversation.last_message_id, reply.pk)
+
+    def test_stale_instances_never_lose_an_increment(self):
+        first = self.reload()
+        second = self.reload()
+        for conversation in (first, second):
+            message = Message.objects.create(conversation=conversation, sender=self.alice, recipient=self.bob, content='hi')
+            conversation.register_message(message)
+
+        self.assertEqual(self.reload().participant2_unread_count, 2)
+
+    def test_mark_as_read_clears_the_counter_and_flags_messages(self):
+        self.send(self.alice, self.bob)
+        self.send(self.alice, self.bob)
+
+        marked = self.reload().mark_as_read(self.bob)
+
+        self.assertEqual(marked, 2)
+        self.assertEqual(self.reload().participant2_unread_count, 0)
+        self.assertFalse(Message.objects.filter(recipient=self.bob, is_read=False).exists())
+
+    def test_detail_update_ignores_counters_and_keeps_concurrent_increments(self):
+        url = f'/api/messaging/{self.conversation.pk}/'
+        self.send(self.alice, self.bob)
+
+        response = self.client.patch(
+            url, {'subject': '项目沟通', 'participant2_unread_count': 0}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        conversation = self.reload()
+        self.assertEqual(conversation.subject, '项目沟通')
+        self.assertEqual(conversation.participant2_unread_count, 1)
+
+    def test_blocking_keeps_counters_and_last_message(self):
+        message = self.send(self.bob, self.alice)
+
+        response = self.client.post('/api/messaging/blocked-users/', {'blocked': str(self.bob.pk)}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        conversation = self.reload()
+        self.assertTrue(conversation.is_blocked_by_participant1)
+        self.assertEqual(conversation.participant1_unread_count, 1)
+        self.assertEqual(conversation.last_message_id, message.pk)
+
+
+class ConversationInboxTests(MessagingTestCase):
+    """收件箱行与对话的未读计数、最后消息时间和标记保持一致"""
+
+    def entry(self, user):
+        return ConversationInbox.objects.get(conversation=self.conversation, user=user)
+
+    def assert_inbox_matches_conversation(self):
+        conversation = self.reload()
+        for user, prefix in ((self.alice, 'participant1'), (self.bob, 'participant2')):
+            entry = self.entry(user)
+            self.assertEqual(entry.unread_count, getattr(conversation, f'{prefix}_unread_count'))
+            self.assertEqual(entry.last_message_at, conversation.last_message_at)
+            self.assertEqual(entry.is_archived, getattr(conversation, f'is_archived_by_{prefix}'))
+            self.assertEqual(entry.is_blocked, getattr(conversation, f'is_blocked_by_{prefix}'))
+
+    def test_new_conversation_gets_a_row_per_participant(self):
+        self.assertEqual(
+            set(ConversationInbox.objects.filter(conversation=self.conversation).values_list('user', flat=True)),
+            {self.alice.pk, self.bob.pk}
+        )
+
+    def test_messages_and_reads_keep_the_inbox_in_step(self):
+        self.send(self.alice, self.bob)
+        self.send(self.alice, self.bob)
+        self.send(self.bob, self.alice)
+        self.assertEqual(self.entry(self.bob).unread_count, 2)
+        self.assert_inbox_matches_conversation()
+
+        self.reload().mark_as_read(self.bob)
+        self.assertEqual(self.entry(self.bob).unread_count, 0)
+        self.assert_inbox_matches_conversation()
+
+    def test_archiving_copies_the_flag_without_touching_counters(self):
+        self.send(self.bob, self.alice)
+
+        response = self.client.patch(
+            f'/api/messaging/{self.conversation.pk}/', {'is_archived_by_participant1': True}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.entry(self.alice).is_archived)
+        self.assertEqual(self.entry(self.alice).unread_count, 1)
+        self.assert_inbox_matches_conversation()
+
+    def test_bulk_send_updates_conversations_and_inboxes_together(self):
+        carol = User.objects.create(username='carol', email='carol@example.com')
+        self.send(self.bob, self.alice)
+
+        success_count, failed_users = send_bulk_messages(self.alice, [str(self.bob.pk), str(carol.pk)], '通知')
+
+        self.assertEqual((success_count, failed_users), (2, []))
+        self.assert_inbox_matches_conversation()
+        new_conversation = Conversation.objects.get(inbox_entries__user=carol)
+        self.assertEqual(ConversationInbox.objects.get(conversation=new_conversation, user=carol).unread_count, 1)
+        self.assertEqual(ConversationInbox.objects.get(conversation=new_conversation, user=self.alice).unread_count, 0)
+
+    def test_list_and_unread_count_are_served_from_the_inbox(self):
+        dave = User.objects.create(username='dave', email='dave@example.com')
+        other = Conversation.objects.create(participant1=self.alice, participant2=dave)
+        other.register_message(Message.objects.create(conversation=other, sender=self.alice, recipient=dave, content='早'))
+        self.send(self.bob, self.alice)
+        self.send(self.bob, self.alice)
+
+        response = self.client.get('/api/messaging/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], [str(self.conversation.pk), str(other.pk)]
+        )
+        self.assertEqual(response.data['results'][0]['unread_count'], 2)
+
+        response = self.client.get('/api/messaging/unread-count/')
+        self.assertEqual(response.data, {'unread_conversations': 1, 'unread_messages': 2})
+
+
+class RealtimeEndpointTests(MessagingTestCase):
+    """实时推送：WebSocket 和 SSE 连接收到已提交的消息与已读事件，未认证的连接被拒绝"""
+
+    def setUp(self):
+        super().setUp()
+        self.pubsub = MemoryPubSub()
+        for patcher in (
+            mock.patch.object(realtime, 'get_pubsub', return_value=self.pubsub),
+            mock.patch.object(consumers, 'get_pubsub', return_value=self.pubsub),
+            # Closing connections would end the test case's transaction
+            mock.patch.object(consumers, 'close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.tokens = {user.pk: str(AccessToken.for_user(user)) for user in (self.alice, self.bob)}
+
+    def scope(self, scope_type, user=None, token=None):
+        token = self.tokens[user.pk] if user is not None else token
+        return {
+            'type': scope_type,
+            'path': '/',
+            'query_string': f'token={token}'.encode() if token else b'',
+            'headers': [],
+        }
+
+    async def connect(self, app, scope, *first_messages):
+        """Run ``app`` as one client connection; returns its inbound queue, outbound queue and task"""
+        inbound, outbound = asyncio.Queue(), asyncio.Queue()
+        for message in first_messages:
+            inbound.put_nowait(message)
+        return inbound, outbound, asyncio.create_task(app(scope, inbound.get, outbound.put))
+
+    async def wait_for_subscribers(self, *users):
+        for _ in range(200):
+            if all(user_channel(user.pk) in self.pubsub._subscribers for user in users):
+                return
+            await asyncio.sleep(0.01)
+        self.fail('connections never subscribed')
+
+    async def receive(self, outbound):
+        return await asyncio.wait_for(outbound.get(), timeout=2)
+
+    async def open_streams(self):
+        """Alice over WebSocket, Bob over SSE, both past their handshakes"""
+        socket = await self.connect(consumers.websocket_app, self.scope('websocket', self.alice), {'type': 'websocket.connect'})
+        stream = await self.connect(consumers.sse_app, self.scope('http', self.bob))
+        self.assertEqual(await self.receive(socket[1]), {'type': 'websocket.accept'})
+        self.assertEqual((await self.receive(stream[1]))['status'], 200)
+        self.assertEqual((await self.receive(stream[1]))['body'], b': ping\n\n')
+        await self.wait_for_subscribers(self.alice, self.bob)
+        return socket, stream
+
+    async def close_streams(self, socket, stream):
+        socket[0].put_nowait({'type': 'websocket.disconnect'})
+        stream[0].put_nowait({'type': 'http.disconnect'})
+        await asyncio.wait_for(asyncio.gather(socket[2], stream[2]), timeout=2)
+        self.assertEqual(self.pubsub._subscribers, {})
+
+    async def websocket_event(self, socket):
+        message = await self.receive(socket[1])
+        self.assertEqual(message['type'], 'websocket.send')
+        return json.loads(message['text'])
+
+    async def sse_event(self, stream):
+        body = (await self.receive(stream[1]))['body'].decode()
+        event_line, data_line = body.strip().split('\n')
+        event = json.loads(data_line.removeprefix('data: '))
+        self.assertEqual(event_line, f"event: {event['type']}")
+        return event
+
+    def commit(self, action, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            return action(*args)
+
+    async def test_committed_message_reaches_both_participants(self):
+        socket, stream = await self.open_streams()
+
+        message = await sync_to_async(self.commit)(self.send, self.alice, self.bob, '在吗')
+
+        for event in (await self.websocket_event(socket), await self.sse_event(stream)):
+            self.assertEqual(event['type'], 'message.created')
+            self.assertEqual(event['conversation'], str(self.conversation.pk))
+            self.assertEqual(
+                (event['message']['id'], event['message']['content']), (str(message.pk), '在吗')
+            )
+        await self.close_streams(socket, stream)
+
+    async def test_mark_as_read_sends_conversation_read(self):
+        await sync_to_async(self.send)(self.alice, self.bob)
+        socket, stream = await self.open_streams()
+
+        await sync_to_async(self.commit)(lambda: self.reload().mark_as_read(self.bob))
+
+        for event in (await self.websocket_event(socket), await self.sse_event(stream)):
+            self.assertEqual(event['type'], 'conversation.read')
+            self.assertEqual((event['conversation'], event['reader']), (str(self.conversation.pk), str(self.bob.pk)))
+        await self.close_streams(socket, stream)
+
+    async def test_unauthenticated_connections_are_refused(self):
+        for token in (None, 'not-a-token'):
+            _, outbound, task = await self.connect(
+                consumers.websocket_app, self.scope('websocket', token=token), {'type': 'websocket.connect'}
+            )
+            await asyncio.wait_for(task, timeout=2)
+            self.assertEqual(await self.receive(outbound), {'type': 'websocket.close', 'code': 4401})
+
+            _, outbound, task = await self.connect(consumers.sse_app, self.scope('http', token=token))
+            await asyncio.wait_for(task, timeout=2)
+            self.assertEqual((await self.receive(outbound))['status'], 401)
 
-# Create your tests here.
+        self.assertEqual(self.pubsub._subscribers, {})
@@ -17,19 +17,19 @@ urlpatterns = [
     # 对话管理
     path('', views.ConversationListAPIView.as_view(), name='conversation-list'),
     path('create/', views.ConversationCreateAPIView.as_view(), name='conversation-create'),
-    path('<int:pk>/', views.ConversationDetailAPIView.as_view(), name='conversation-detail'),
+    path('<uuid:pk>/', views.ConversationDetailAPIView.as_view(), name='conversation-detail'),
 
     # 消息管理
-    path('<int:conversation_id>/messages/', views.MessageListCreateAPIView.as_view(), name='message-list-create'),
-    path('messages/<int:message_id>/reactions/', views.MessageReactionAPIView.as_view(), name='message-reactions'),
-    path('messages/<int:message_id>/report/', views.MessageReportCreateAPIView.as_view(), name='message-report'),
+    path('<uuid:conversation_id>/messages/', views.MessageListCreateAPIView.as_view(), name='message-list-create'),
+    path('messages/<uuid:message_id>/reactions/', views.MessageReactionAPIView.as_view(), name='message-reactions'),
+    path('messages/<uuid:message_id>/report/', views.MessageReportCreateAPIView.as_view(), name='message-report'),
 
     # 拉黑用户管理
     path('blocked-users/', views.BlockedUserListCreateAPIView.as_view(), name='blocked-user-list-create'),
-    path('blocked-users/<int:blocked_id>/', views.BlockedUserDestroyAPIView.as_view(), name='blocked-user-destroy'),
+    path('blocked-users/<uuid:blocked_id>/', views.BlockedUserDestroyAPIView.as_view(), name='blocked-user-destroy'),
 
     # 对话标签
-    path('<int:conversation_id>/tags/', views.ConversationTagListCreateAPIView.as_view(), name='conversation-tag-list-create'),
+    path('<uuid:conversation_id>/tags/', views.ConversationTagListCreateAPIView.as_view(), name='conversation-tag-list-create'),
 
     # 消息模板
     path('templates/', views.MessageTemplateListAPIView.as_view(), name='message-template-list'),
@@ -13,6 +13,7 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
 from django.db import transaction
 from django.db.models import Q, Count, Sum, Avg
 from django.utils import timezone
@@ -20,36 +21,43 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
 from .models import (
-    Conversation, Message, MessageAttachment, MessageTemplate,
+    Conversation, ConversationInbox, Message, MessageAttachment, MessageTemplate,
     MessageReaction, BlockedUser, MessageReport, MessagingStat,
     ConversationTag
 )
+from .bulk import send_bulk_messages
+from .filters import ConversationInboxFilter
+from .tasks import send_bulk_messages_task
 from .serializers import (
-    ConversationListSerializer, ConversationDetailSerializer, ConversationCreateSerializer,
-    MessageSerializer, MessageCreateSerializer, MessageReactionSerializer,
+    ConversationInboxSerializer, ConversationDetailSerializer,
+    ConversationCreateSerializer, MessageSerializer, MessageCreateSerializer, MessageReactionSerializer,
     BlockedUserSerializer, MessageReportSerializer, ConversationTagSerializer,
     MessageTemplateSerializer, MessagingStatSerializer
 )
 from apps.accounts.permissions import IsOwnerOrReadOnly
+from apps.common.pagination import KeysetOptInPagination
 
 
 class ConversationListAPIView(generics.ListAPIView):
-    """对话列表API视图"""
-    serializer_class = ConversationListSerializer
+    """对话列表API视图（按用户收件箱查询）"""
+    serializer_class = ConversationInboxSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetOptInPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['subject', 'participant1__username', 'participant2__username']
-    filterset_fields = ['conversation_type', 'is_active']
+    search_fields = ['conversation__subject', 'conversation__participant1__username', 'conversation__participant2__username']
+    filterset_class = ConversationInboxFilter
     ordering_fields = ['last_message_at', 'created_at']
     ordering = ['-last_message_at']
 
     def get_queryset(self):
-        """获取当前用户的对话列表"""
-        user = self.request.user
-        return Conversation.objects.filter(
-            Q(participant1=user) | Q(participant2=user),
-            is_active=True
-        ).select_related('participant1', 'participant2', 'last_message', 'order')
+        """获取当前用户的对话列表：收件箱 (user, last_message_at) 索引上的一次范围扫描"""
+        return ConversationInbox.objects.filter(
+            user=self.request.user,
+            conversation__is_active=True
+        ).select_related(
+            'conversation', 'conversation__participant1', 'conversation__participant2',
+            'conversation__last_message', 'conversation__order'
+        )
 
     def get_serializer_context(self):
         """添加请求上下文"""
@@ -99,6 +107,7 @@ class ConversationCreateAPIView(generics.CreateAPIView):
 class MessageListCreateAPIView(generics.ListCreateAPIView):
     """消息列表和创建API视图"""
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetOptInPagination
 
     def get_serializer_class(self):
         """根据请求方法选择序列化器"""
@@ -121,11 +130,10 @@ class MessageListCreateAPIView(generics.ListCreateAPIView):
         if not conversation:
             return Message.objects.none()
 
-        return Message.objects.filter(
-            conversation=conversation
-        ).select_related('sender', 'recipient', 'reply_to').prefetch_related(
-            'message_attachments', 'reactions'
-        ).order_by('created_at')
+        # 表情回应由序列化器按页分组聚合，无需预取
+        return conversation.get_visible_messages(user).select_related(
+            'sender', 'recipient', 'reply_to'
+        ).prefetch_related('message_attachments').order_by('created_at')
 
     def get_serializer_context(self):
         """添加请求上下文"""
@@ -250,24 +258,18 @@ def messaging_stats(request):
     """获取用户消息统计"""
     user = request.user
 
-    # 基础统计
-    conversations = Conversation.objects.filter(
-        Q(participant1=user) | Q(participant2=user)
-    )
-
-    active_conversations = conversations.filter(is_active=True)
-    archived_conversations = conversations.filter(
-        Q(is_archived_by_participant1=True, participant1=user) |
-        Q(is_archived_by_participant2=True, participant2=user)
+    # 基础统计（一次聚合读取收件箱）
+    inbox = ConversationInbox.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(conversation__is_active=True)),
+        archived=Count('id', filter=Q(is_archived=True)),
+        unread=Sum('unread_count')
     )
 
     # 消息统计
     sent_messages = Message.objects.filter(sender=user).count()
     received_messages = Message.objects.filter(recipient=user).count()
-    unread_messages = Message.objects.filter(
-        recipient=user,
-        is_read=False
-    ).count()
+    unread_messages = inbox['unread'] or 0
 
     # 拉黑统计
     blocked_count = BlockedUser.objects.filter(blocker=user).count()
@@ -275,9 +277,9 @@ def messaging_stats(request):
 
     stats = {
         'conversations': {
-            'total': conversations.count(),
-            'active': active_conversations.count(),
-            'archived': archived_conversations.count()
+            'total': inbox['total'],
+            'active': inbox['active'],
+            'archived': inbox['archived']
         },
         'messages': {
             'sent': sent_messages,
@@ -299,18 +301,14 @@ def get_unread_count(request):
     """获取未读消息总数"""
     user = request.user
 
-    # 计算未读对话数
-    unread_conversations = Conversation.objects.filter(
-        Q(participant1=user, participant1_unread_count__gt=0) |
-        Q(participant2=user, participant2_unread_count__gt=0),
-        is_active=True
-    ).count()
-
-    # 计算未读消息数
-    unread_messages = Message.objects.filter(
-        recipient=user,
-        is_read=False
-    ).count()
+    # 未读对话数和未读消息数都来自收件箱
+    unread = ConversationInbox.objects.filter(
+        user=user,
+        unread_count__gt=0,
+        conversation__is_active=True
+    ).aggregate(conversations=Count('id'), messages=Sum('unread_count'))
+    unread_conversations = unread['conversations']
+    unread_messages = unread['messages'] or 0
 
     return Response({
         'unread_conversations': unread_conversations,
@@ -331,71 +329,29 @@ def send_bulk_message(request):
             'error': '接收者和消息内容不能为空'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    if len(recipients) > 50:  # 限制批量发送数量
+    if not isinstance(recipients, list):
         return Response({
-            'error': '一次最多只能发送给50个用户'
+            'error': '接收者必须是用户ID列表'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    sender = request.user
-    success_count = 0
-    failed_users = []
-
-    with transaction.atomic():
-        for recipient_id in recipients:
-            try:
-                from apps.accounts.models import User
-                recipient = User.objects.get(id=recipient_id)
-
-                # 检查是否被拉黑
-                if BlockedUser.objects.filter(
-                    Q(blocker=sender, blocked=recipient) |
-                    Q(blocker=recipient, blocked=sender)
-                ).exists():
-                    failed_users.append({
-                        'user_id': recipient_id,
-                        'username': recipient.username,
-                        'reason': '用户被拉黑'
-                    })
-                    continue
-
-                # 检查是否已存在对话
-                conversation, created = Conversation.objects.get_or_create(
-                    participant1=min(sender.id, recipient.id),
-                    participant2=max(sender.id, recipient.id),
-                    defaults={
-                        'conversation_type': 'direct',
-                        'subject': subject,
-                        'is_active': True
-                    }
-                )
-
-                # 创建消息
-                message = Message.objects.create(
-                    conversation=conversation,
-                    sender=sender,
-                    recipient=recipient,
-                    message_type='text',
-                    content=message_content.strip()
-                )
-
-                # 更新对话
-                conversation.last_message = message
-                conversation.last_message_at = message.created_at
-                conversation.increment_unread_count(sender)
-                conversation.save()
-
-                success_count += 1
-
-            except User.DoesNotExist:
-                failed_users.append({
-                    'user_id': recipient_id,
-                    'reason': '用户不存在'
-                })
-            except Exception as e:
-                failed_users.append({
-                    'user_id': recipient_id,
-                    'reason': str(e)
-                })
+    max_recipients = getattr(settings, 'MESSAGING_BULK_MAX_RECIPIENTS', 5000)
+    if len(recipients) > max_recipients:  # 限制批量发送数量
+        return Response({
+            'error': f'一次最多只能发送给{max_recipients}个用户'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # 接收者较多时交给后台任务发送
+    if len(recipients) > getattr(settings, 'MESSAGING_BULK_SYNC_LIMIT', 50):
+        task = send_bulk_messages_task.delay(
+            str(request.user.pk), [str(recipient) for recipient in recipients], message_content, subject
+        )
+        return Response({
+            'message': '批量发送任务已提交',
+            'task_id': task.id,
+            'recipient_count': len(recipients)
+        }, status=status.HTTP_202_ACCEPTED)
+
+    success_count, failed_users = send_bulk_messages(request.user, recipients, message_content, subject)
 
     return Response({
         'message': '批量发送完成',
@@ -0,0 +1,202 @@
+"""
+Order statistics rollup
+Rebuilds daily OrderStat rows for the dates touched by new orders and
+OrderStatusHistory events; each date is recomputed in full, so reruns and
+overlapping backfills are harmless
+"""
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.common.models import RollupCheckpoint
+from .models import Order, OrderStat, OrderStatusHistory
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'order_stats'
+
+# Status events counted per day, mapped to their OrderStat counter
+EVENT_COUNTERS = {
+    'completed': 'completed_orders',
+    'cancelled': 'cancelled_orders',
+    'refunded': 'refunded_orders',
+    'disputed': 'disputed_orders',
+}
+
+STAT_FIELDS = [
+    'total_orders', 'completed_orders', 'cancelled_orders', 'refunded_orders',
+    'disputed_orders', 'total_revenue', 'platform_fees', 'refunds_amount',
+    'average_order_value', 'average_completion_time',
+]
+
+TWO_PLACES = Decimal('0.01')
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _quantize(value):
+    return Decimal(value or 0).quantize(TWO_PLACES)
+
+
+def compute_order_stats(start_date, end_date):
+    """
+    Daily figures for ``start_date <= date < end_date``
+
+    Orders count towards the day they were created; completions, cancellations,
+    refunds and disputes towards the day of the status event.
+    """
+    start, end = _day_start(start_date), _day_start(end_date)
+    days = {}
+
+    def day(value):
+        return days.setdefault(value, {
+            'total_orders': 0, 'completed_orders': 0, 'cancelled_orders': 0,
+            'refunded_orders': 0, 'disputed_orders': 0,
+            'total_revenue': 0, 'platform_fees': 0, 'refunds_amount': 0,
+            'average_order_value': 0, 'average_completion_time': 0,
+        })
+
+    created = Order.objects.filter(created_at__gte=start, created_at__lt=end).values(
+        date=TruncDate('created_at')
+    ).annotate(orders=Count('id'), avg_value=Avg('total_price'))
+    for row in created:
+        stats = day(row['date'])
+        stats['total_orders'] = row['orders']
+        stats['average_order_value'] = _quantize(row['avg_value'])
+
+    # One row per order, status and day: an order with repeated events still
+    # counts, and adds its amounts, once
+    events = OrderStatusHistory.objects.filter(
+        created_at__gte=start, created_at__lt=end, new_status__in=EVENT_COUNTERS
+    ).values(
+        'order', 'new_status', 'order__total_price', 'order__platform_fee', 'order__created_at',
+        date=TruncDate('created_at'),
+    ).annotate(event_at=Min('created_at')).order_by()
+
+    totals = {}
+    for row in events.iterator():
+        total = totals.setdefault((row['date'], row['new_status']), {
+            'orders': 0, 'amount': Decimal('0'), 'fees': Decimal('0'), 'duration': timedelta(0),
+        })
+        total['orders'] += 1
+        total['amount'] += row['order__total_price'] or 0
+        total['fees'] += row['order__platform_fee'] or 0
+        total['duration'] += row['event_at'] - row['order__created_at']
+
+    for (date, status), total in totals.items():
+        stats = day(date)
+        stats[EVENT_COUNTERS[status]] = total['orders']
+        if status == 'completed':
+            stats['total_revenue'] = _quantize(total['amount'])
+            stats['platform_fees'] = _quantize(total['fees'])
+            stats['average_completion_time'] = _quantize(
+                total['duration'].total_seconds() / total['orders'] / 86400
+            )
+        elif status == 'refunded':
+            stats['refunds_amount'] = _quantize(total['amount'])
+
+    return days
+
+
+def rebuild_order_stats(dates):
+    """Recompute and overwrite OrderStat for each of ``dates``; returns the number of rows written"""
+    dates = sorted(set(dates))
+    if not dates:
+        return 0
+
+    figures = compute_order_stats(dates[0], dates[-1] + timedelta(days=1))
+    empty = dict.fromkeys(STAT_FIELDS, 0)
+
+    with transaction.atomic():
+        existing = {
+            stat.date: stat
+            for stat in OrderStat.objects.select_for_update().filter(date__in=dates)
+        }
+        to_create, to_update = [], []
+        for date in dates:
+            values = figures.get(date, empty)
+            stat = existing.get(date)
+            if stat is None:
+                to_create.append(OrderStat(date=date, **values))
+            else:
+                for field, value in values.items():
+                    setattr(stat, field, value)
+                to_update.append(stat)
+
+        OrderStat.objects.bulk_create(to_create, batch_size=500)
+        OrderStat.objects.bulk_update(to_update, STAT_FIELDS, batch_size=500)
+    return len(dates)
+
+
+def backfill_order_stats(start_date, end_date):
+    """Rebuild every date in ``start_date <= date < end_date``, with or without activity"""
+    count = (end_date - start_date).days
+    return rebuild_order_stats(start_date + timedelta(days=offset) for offset in range(count))
+
+
+def _touched_dates(since, until):
+    """Local dates with new orders or counted status events in ``[since, until)``"""
+    def dates(queryset):
+        queryset = queryset.filter(created_at__lt=until)
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        return set(queryset.annotate(date=TruncDate('created_at')).values_list('date', flat=True).distinct())
+
+    return dates(Order.objects.all()) | dates(
+        OrderStatusHistory.objects.filter(new_status__in=EVENT_COUNTERS)
+    )
+
+
+def rollup_order_stats(until=None):
+    """
+    Rebuild the OrderStat rows of dates that gained orders or events since the
+    last run. Rows newer than ``ORDER_STAT_ROLLUP_LAG`` seconds wait for the next run.
+    """
+    if until is None:
+        until = timezone.now() - timedelta(seconds=getattr(settings, 'ORDER_STAT_ROLLUP_LAG', 60))
+
+    with transaction.atomic():
+        checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+        since = checkpoint.high_water_mark
+        if since is not None and since >= until:
+            return 0
+
+        rebuilt = rebuild_order_stats(_touched_dates(since, until))
+
+        checkpoint.high_water_mark = until
+        checkpoint.save(update_fields=['high_water_mark', 'updated_at'])
+
+    logger.info(f"Order stats rollup up to {until.isoformat()}: {rebuilt} days rebuilt")
+    return rebuilt
+
+
+def summarize_order_stats(stats):
+    """Combine daily OrderStat rows into period totals"""
+    totals = dict.fromkeys(
+        ['total_orders', 'completed_orders', 'cancelled_orders', 'refunded_orders', 'disputed_orders'], 0
+    )
+    totals.update(dict.fromkeys(['total_revenue', 'platform_fees', 'refunds_amount'], Decimal('0')))
+    order_value = Decimal('0')
+    completion_days = Decimal('0')
+
+    for stat in stats:
+        for field in totals:
+            totals[field] += getattr(stat, field)
+        order_value += stat.average_order_value * stat.total_orders
+        completion_days += stat.average_completion_time * stat.completed_orders
+
+    totals['average_order_value'] = (
+        (order_value / totals['total_orders']).quantize(TWO_PLACES) if totals['total_orders'] else 0
+    )
+    totals['average_completion_time'] = (
+        (completion_days / totals['completed_orders']).quantize(TWO_PLACES) if totals['completed_orders'] else 0
+    )
+    return totals
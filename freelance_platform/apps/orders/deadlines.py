@@ -0,0 +1,115 @@
+"""
+Order deadline sweeper
+Finds open orders that are overdue or close to their delivery deadline and
+have not been notified yet, marks them, and queues one email per recipient
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DEADLINE_TRACKED_STATUSES, Order
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_SUBJECTS = {
+    'overdue': '订单已逾期',
+    'due_soon': '订单即将到期',
+}
+
+# Notice kind -> (per-order marker, recipients)
+NOTICES = {
+    'overdue': ('overdue_notified_at', ('freelancer__email', 'client__email')),
+    'due_soon': ('reminder_sent_at', ('freelancer__email',)),
+}
+
+
+def claim_orders(kind, now, lead, chunk_size=500):
+    """
+    Yield chunks of open orders owed a ``kind`` notice, marking each chunk as notified
+
+    The query is level-triggered (deadline reached, marker still empty), so an
+    order created inside the reminder window or reopened after its deadline is
+    still picked up on the next sweep. It walks the matching partial index;
+    marked rows drop out of it, so every chunk starts from the front again.
+    Rows locked by an overlapping sweep are skipped.
+    """
+    marker, _ = NOTICES[kind]
+    filters = {'status__in': DEADLINE_TRACKED_STATUSES, f'{marker}__isnull': True}
+    if kind == 'overdue':
+        filters['delivery_deadline__lt'] = now
+    else:
+        # Orders already past their deadline get the overdue notice instead
+        filters.update(delivery_deadline__gte=now, delivery_deadline__lt=now + lead)
+
+    queryset = Order.objects.filter(**filters).order_by('delivery_deadline', 'id').select_for_update(
+        skip_locked=True, of=('self',)
+    ).values('id', 'order_number', 'title', 'delivery_deadline', 'client__email', 'freelancer__email')
+
+    while True:
+        rows = list(queryset[:chunk_size])
+        if not rows:
+            return
+        Order.objects.filter(pk__in=[row['id'] for row in rows]).update(**{marker: now})
+        yield rows
+        if len(rows) < chunk_size:
+            return
+
+
+def build_notifications(pending):
+    """Turn ``{(kind, email): [order rows]}`` into ``send_mass_mail`` datatuples"""
+    messages = []
+    for (kind, email), rows in pending.items():
+        lines = [
+            f"{row['order_number']} {row['title']} 截止时间 "
+            f"{timezone.localtime(row['delivery_deadline']):%Y-%m-%d %H:%M}"
+            for row in rows
+        ]
+        messages.append((
+            f"{NOTIFICATION_SUBJECTS[kind]}（{len(rows)}个）",
+            '\n'.join(lines),
+            None,
+            [email],
+        ))
+    return messages
+
+
+def enqueue_notifications(messages):
+    from .tasks import send_order_notifications
+
+    batch_size = getattr(settings, 'ORDER_NOTIFICATION_BATCH_SIZE', 100)
+    for start in range(0, len(messages), batch_size):
+        send_order_notifications.delay(messages[start:start + batch_size])
+
+
+def sweep_order_deadlines(now=None):
+    """
+    Notify about open orders that are overdue or due within
+    ``ORDER_DEADLINE_REMINDER_HOURS`` and have not had that notice yet
+
+    Markers are set in the same transaction that queues the emails (after
+    commit), so each order gets each notice once.
+    """
+    now = now or timezone.now()
+    lead = timedelta(hours=getattr(settings, 'ORDER_DEADLINE_REMINDER_HOURS', 24))
+    chunk_size = getattr(settings, 'ORDER_SWEEP_CHUNK_SIZE', 500)
+
+    pending = defaultdict(list)
+    counts = dict.fromkeys(NOTICES, 0)
+
+    with transaction.atomic():
+        for kind, (_, recipients) in NOTICES.items():
+            for rows in claim_orders(kind, now, lead, chunk_size):
+                counts[kind] += len(rows)
+                for row in rows:
+                    for recipient in recipients:
+                        pending[(kind, row[recipient])].append(row)
+
+        messages = build_notifications({key: rows for key, rows in pending.items() if key[1]})
+        transaction.on_commit(lambda: enqueue_notifications(messages))
+
+    logger.info(f"Order deadline sweep at {now.isoformat()}: {counts}, {len(messages)} emails queued")
+    return counts
@@ -0,0 +1,16 @@
+"""
+Custom exceptions for order processing
+"""
+
+class OrderTransitionError(Exception):
+    """Raised when an order cannot move to the requested status"""
+    def __init__(self, message, old_status=None, new_status=None):
+        self.message = message
+        self.old_status = old_status
+        self.new_status = new_status
+        super().__init__(self.message)
+
+
+class StaleOrderStatusError(OrderTransitionError):
+    """Raised when the order's status changed between reading and updating it"""
+    pass
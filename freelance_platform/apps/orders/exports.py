@@ -0,0 +1,132 @@
+"""
+Streaming order exports
+Orders, deliveries and status history are written out as CSV or NDJSON straight
+from ``values_list`` tuples read through ``.iterator()``, so the whole export is
+never held in memory; on PostgreSQL the iterator uses a server-side cursor
+"""
+import csv
+import datetime
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Delivery, Order, OrderStatusHistory
+
+
+class ExportDataset:
+    """A queryset plus the ``(header, lookup)`` columns exported from it"""
+
+    def __init__(self, model, columns, date_field='created_at', status_field=None):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+        self.status_field = status_field
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def get_queryset(self, start=None, end=None, statuses=None):
+        """Rows created in ``start <= date < end`` (local dates) with one of ``statuses``"""
+        queryset = self.model.objects.all()
+        if start is not None:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': _day_start(start)})
+        if end is not None:
+            queryset = queryset.filter(**{f'{self.date_field}__lt': _day_start(end)})
+        if statuses and self.status_field:
+            queryset = queryset.filter(**{f'{self.status_field}__in': statuses})
+        return queryset.order_by(self.date_field, 'pk').values_list(*[lookup for _, lookup in self.columns])
+
+
+EXPORT_DATASETS = {
+    'orders': ExportDataset(Order, [
+        ('order_number', 'order_number'),
+        ('status', 'status'),
+        ('priority', 'priority'),
+        ('title', 'title'),
+        ('client', 'client__username'),
+        ('freelancer', 'freelancer__username'),
+        ('gig', 'gig__title'),
+        ('base_price', 'base_price'),
+        ('extras_price', 'extras_price'),
+        ('total_price', 'total_price'),
+        ('platform_fee', 'platform_fee'),
+        ('freelancer_earnings', 'freelancer_earnings'),
+        ('delivery_deadline', 'delivery_deadline'),
+        ('actual_delivery', 'actual_delivery'),
+        ('cancellation_date', 'cancellation_date'),
+        ('created_at', 'created_at'),
+    ], status_field='status'),
+    'deliveries': ExportDataset(Delivery, [
+        ('order_number', 'order__order_number'),
+        ('order_status', 'order__status'),
+        ('title', 'title'),
+        ('revision_number', 'revision_number'),
+        ('file_count', 'file_count'),
+        ('is_final_delivery', 'is_final_delivery'),
+        ('is_accepted', 'is_accepted'),
+        ('accepted_at', 'accepted_at'),
+        ('created_at', 'created_at'),
+    ], status_field='order__status'),
+    'status_history': ExportDataset(OrderStatusHistory, [
+        ('order_number', 'order__order_number'),
+        ('old_status', 'old_status'),
+        ('new_status', 'new_status'),
+        ('changed_by', 'changed_by__username'),
+        ('notes', 'notes'),
+        ('created_at', 'created_at'),
+    ], status_field='new_status'),
+}
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _localize(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    # BOM so spreadsheet software opens the Chinese text as UTF-8
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([
+            '' if value is None else str(value) if isinstance(value, Decimal) else _localize(value)
+            for value in row
+        ])
+
+
+def _ndjson_lines(headers, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(headers, map(_localize, row))), cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
+
+
+def stream_export(dataset, export_format, start=None, end=None, statuses=None):
+    """Yield the encoded lines of ``dataset`` in ``export_format`` ('csv' or 'ndjson')"""
+    export = EXPORT_DATASETS[dataset]
+    rows = export.get_queryset(start, end, statuses).iterator(
+        chunk_size=getattr(settings, 'ORDER_EXPORT_CHUNK_SIZE', 2000)
+    )
+    lines = _csv_lines if export_format == 'csv' else _ndjson_lines
+    return lines(export.headers, rows)
@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.orders.analytics import backfill_order_stats
+from apps.orders.tasks import backfill_order_statistics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily OrderStat rows for a date range, optionally fanned out to Celery workers in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='First date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last date to rebuild, inclusive (default: today)')
+        parser.add_argument('--chunk-days', type=int, default=31)
+        parser.add_argument('--async', action='store_true', dest='use_celery',
+                            help='Queue one Celery task per chunk instead of running inline')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end']) if options['end'] else timezone.localdate()
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+        if end < start:
+            raise CommandError('--end must not be before --start')
+
+        chunk = timedelta(days=options['chunk_days'])
+        chunk_start, stop, chunks = start, end + timedelta(days=1), 0
+        while chunk_start < stop:
+            chunk_end = min(chunk_start + chunk, stop)
+            if options['use_celery']:
+                backfill_order_statistics.delay(chunk_start.isoformat(), chunk_end.isoformat())
+            else:
+                backfill_order_stats(chunk_start, chunk_end)
+            chunk_start = chunk_end
+            chunks += 1
+
+        verb = 'Queued' if options['use_celery'] else 'Rebuilt'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {chunks} chunks covering {start} to {end}'))
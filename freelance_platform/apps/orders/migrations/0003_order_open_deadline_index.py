@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0007_gig_search_query'),
+        ('orders', '0002_alter_delivery_options_alter_order_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['paid', 'requirements_provided', 'in_progress', 'revision_requested'])), fields=['delivery_deadline', 'id'], name='orders_open_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+# Frozen copy of apps.orders.search.build_search_document as of this migration
+def build_search_document(order):
+    parts = [
+        order.order_number,
+        order.title,
+        order.gig.title if order.gig_id else '',
+        order.client.username if order.client_id else '',
+        order.freelancer.username if order.freelancer_id else '',
+    ]
+    return ' '.join(' '.join(part.lower().split()) for part in parts if part)
+
+
+def build_search_documents(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX orders_order_search_document_trgm ON orders_order "
+            "USING gin (search_document gin_trgm_ops)"
+        )
+
+    batch = []
+    for order in Order.objects.select_related('gig', 'client', 'freelancer').iterator(chunk_size=500):
+        order.search_document = build_search_document(order)
+        batch.append(order)
+        if len(batch) >= 500:
+            Order.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    Order.objects.bulk_update(batch, ['search_document'])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS orders_order_search_document_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_open_deadline_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(build_search_documents, drop_search_index),
+    ]
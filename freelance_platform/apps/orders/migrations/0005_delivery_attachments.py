@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0001_initial'),
+        ('orders', '0004_order_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='attachments',
+            field=models.ManyToManyField(blank=True, related_name='deliveries', to='files.fileupload'),
+        ),
+    ]
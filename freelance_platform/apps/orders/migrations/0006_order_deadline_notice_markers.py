@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:13
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+TRACKED_STATUSES = ['paid', 'requirements_provided', 'in_progress', 'revision_requested']
+
+
+def mark_existing_notices(apps, schema_editor):
+    """
+    Open orders the old window-based sweeper has already covered are marked as
+    notified, so the first level-triggered sweep does not resend their notices
+    """
+    Order = apps.get_model('orders', 'Order')
+    now = timezone.now()
+    lead = timedelta(hours=getattr(settings, 'ORDER_DEADLINE_REMINDER_HOURS', 24))
+    open_orders = Order.objects.filter(status__in=TRACKED_STATUSES)
+    open_orders.filter(delivery_deadline__lt=now).update(overdue_notified_at=now, reminder_sent_at=now)
+    open_orders.filter(delivery_deadline__gte=now, delivery_deadline__lt=now + lead).update(reminder_sent_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gigs', '0009_search_results_count_unknown'),
+        ('orders', '0005_delivery_attachments'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_open_deadline_idx',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='overdue_notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('reminder_sent_at__isnull', True), ('status__in', ['paid', 'requirements_provided', 'in_progress', 'revision_requested'])), fields=['delivery_deadline', 'id'], name='orders_reminder_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('overdue_notified_at__isnull', True), ('status__in', ['paid', 'requirements_provided', 'in_progress', 'revision_requested'])), fields=['delivery_deadline', 'id'], name='orders_overdue_due_idx'),
+        ),
+        migrations.RunPython(mark_existing_notices, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,16 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from apps.common.ids import generate_number
 from apps.common.models import BaseModel
 from apps.accounts.models import User
 from apps.gigs.models import Gig, GigPackage
+from .search import DOCUMENT_FIELDS, build_search_document, document_source
 from decimal import Decimal
 from django.utils import timezone
 
+# Order statuses in which work is still owed to the client, so the delivery deadline matters
+DEADLINE_TRACKED_STATUSES = ['paid', 'requirements_provided', 'in_progress', 'revision_requested']
+
 
 class Order(BaseModel):
     """Main order model"""
@@ -23,6 +28,8 @@ class Order(BaseModel):
         ('disputed', 'Disputed'),
     ]
 
+    DEADLINE_TRACKED_STATUSES = DEADLINE_TRACKED_STATUSES
+
     PRIORITY_CHOICES = [
         ('low', 'Low'),
         ('standard', 'Standard'),
@@ -53,6 +60,7 @@ class Order(BaseModel):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     client_requirements = models.TextField(blank=True)
+    search_document = models.TextField(blank=True, default='', editable=False)  # Number, titles and usernames, see apps.orders.search
 
     # Pricing
     base_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
@@ -69,6 +77,9 @@ class Order(BaseModel):
     delivery_deadline = models.DateTimeField(db_index=True)
     estimated_delivery = models.DateTimeField(db_index=True)
     actual_delivery = models.DateTimeField(null=True, blank=True)
+    # Set by the deadline sweeper once the matching notice has been queued
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+    overdue_notified_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     # Communication Preferences
     preferred_communication_method = models.CharField(
@@ -114,6 +125,17 @@ class Order(BaseModel):
             models.Index(fields=['estimated_delivery']),
             models.Index(fields=['total_price']),
             models.Index(fields=['priority']),
+            # Deadline sweeps only ever look at open orders still owed a notice
+            models.Index(
+                fields=['delivery_deadline', 'id'],
+                condition=models.Q(status__in=DEADLINE_TRACKED_STATUSES, reminder_sent_at__isnull=True),
+                name='orders_reminder_due_idx',
+            ),
+            models.Index(
+                fields=['delivery_deadline', 'id'],
+                condition=models.Q(status__in=DEADLINE_TRACKED_STATUSES, overdue_notified_at__isnull=True),
+                name='orders_overdue_due_idx',
+            ),
         ]
 
     def __str__(self):
@@ -122,31 +144,40 @@ class Order(BaseModel):
     def save(self, *args, **kwargs):
         if not self.order_number:
             self.order_number = self.generate_order_number()
+
+        # Keep the denormalized search document in step with the fields it is built
+        # from; saves that leave them untouched skip the rebuild and its lookups.
+        # Gig title and username changes are picked up by apps.orders.signals.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or DOCUMENT_FIELDS.intersection(update_fields):
+            source = document_source(self)
+            if source is None or source != getattr(self, '_document_source', None):
+                self.search_document = build_search_document(self)
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'search_document'}
         super().save(*args, **kwargs)
+        self._document_source = document_source(self)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        # What the stored search document was built from, compared in save()
+        order._document_source = document_source(order)
+        return order
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Fields may now differ from the load-time snapshot; rebuild on the next save
+        self._document_source = None
 
     def generate_order_number(self):
         """Generate unique order number"""
-        from django.utils import timezone
-        timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-        import random
-        random_num = random.randint(1000, 9999)
-        return f"ORD{timestamp}{random_num}"
+        return generate_number('order', 'ORD')
 
     def update_status(self, new_status, user=None, notes=''):
-        """Update order status with tracking"""
-        from .models import OrderStatusHistory
-        old_status = self.status
-        self.status = new_status
-        self.save(update_fields=['status', 'updated_at'])
-
-        # Create status history record
-        OrderStatusHistory.objects.create(
-            order=self,
-            old_status=old_status,
-            new_status=new_status,
-            changed_by=user,
-            notes=notes
-        )
+        """Update order status with tracking (see ``apps.orders.state_machine``)"""
+        from .state_machine import transition_order
+        return transition_order(self, new_status, user=user, notes=notes)
 
     @property
     def is_overdue(self):
@@ -250,6 +281,7 @@ class Delivery(BaseModel):
     # Files
     files = models.JSONField(default=list, blank=True)  # Array of file information
     file_count = models.PositiveIntegerField(default=0)
+    attachments = models.ManyToManyField('files.FileUpload', blank=True, related_name='deliveries')  # Chunked uploads, see apps.files
 
     # Status
     is_final_delivery = models.BooleanField(default=False, db_index=True)
@@ -0,0 +1,88 @@
+"""
+Order search
+Each order carries a denormalized lowercase search document (number, titles and
+party usernames). PostgreSQL matches it through a pg_trgm GIN index; order
+numbers take an exact-prefix path on their own btree index.
+"""
+import re
+
+from django.db import transaction
+
+# Order fields that feed the search document; saves touching none of them skip the rebuild
+DOCUMENT_FIELDS = frozenset({'order_number', 'title', 'gig', 'client', 'freelancer'})
+# The same fields by attribute name, as loaded from the database
+DOCUMENT_ATTNAMES = ('order_number', 'title', 'gig_id', 'client_id', 'freelancer_id')
+
+MAX_QUERY_TERMS = 5
+
+_ORDER_NUMBER_RE = re.compile(r'^ORD\d{0,17}$', re.IGNORECASE)
+
+
+def build_search_document(order):
+    """Lowercase text matched by order search"""
+    parts = [
+        order.order_number,
+        order.title,
+        order.gig.title if order.gig_id else '',
+        order.client.username if order.client_id else '',
+        order.freelancer.username if order.freelancer_id else '',
+    ]
+    return ' '.join(' '.join(part.lower().split()) for part in parts if part)
+
+
+def document_source(order):
+    """The order's own values the document is built from, or None when some are not loaded"""
+    values = order.__dict__
+    if any(name not in values for name in DOCUMENT_ATTNAMES):
+        return None
+    return tuple(values[name] for name in DOCUMENT_ATTNAMES)
+
+
+def refresh_search_documents(queryset, chunk_size=500):
+    """Rebuild the stored document of every order in ``queryset``; returns the number of rows updated"""
+    from .models import Order
+
+    updated = 0
+    batch = []
+    orders = queryset.select_related('gig', 'client', 'freelancer').only(
+        'id', 'order_number', 'title', 'search_document', 'gig__title', 'client__username', 'freelancer__username'
+    )
+    for order in orders.iterator(chunk_size=chunk_size):
+        document = build_search_document(order)
+        if document != order.search_document:
+            order.search_document = document
+            batch.append(order)
+        if len(batch) >= chunk_size:
+            with transaction.atomic():
+                Order.objects.bulk_update(batch, ['search_document'])
+            updated += len(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            Order.objects.bulk_update(batch, ['search_document'])
+        updated += len(batch)
+    return updated
+
+
+def is_order_number_prefix(query):
+    return bool(_ORDER_NUMBER_RE.match(query))
+
+
+def search_orders(queryset, query):
+    """
+    Filter ``queryset`` to orders matching ``query``
+
+    Something shaped like an order number is a prefix lookup on ``order_number``;
+    anything else must have every whitespace separated term somewhere in the
+    search document.
+    """
+    query = query.strip()
+    if is_order_number_prefix(query):
+        return queryset.filter(order_number__startswith=query.upper())
+
+    terms = query.lower().split()[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset.none()
+    for term in terms:
+        queryset = queryset.filter(search_document__contains=term)
+    return queryset
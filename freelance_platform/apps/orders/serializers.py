@@ -1,18 +1,42 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Sum, Avg, Count
 from django.core.exceptions import ValidationError
 from datetime import timedelta
+from decimal import Decimal
+import uuid
 
 from .models import (
     Order, OrderStatusHistory, OrderExtra, OrderRequirement,
     Delivery, OrderMessage, OrderReview, OrderDispute,
     OrderStat, OrderCancellation
 )
+from apps.files.models import FileUpload
+from apps.files.serializers import FileUploadSerializer
+from .state_machine import can_transition
+from .search import build_search_document
+from .stats import invalidate_order_stats
 
 User = get_user_model()
 
+PLATFORM_FEE_RATE = Decimal('0.10')  # 10% 平台手续费
+
+
+def calculate_order_pricing(base_price, extras_price):
+    """计算订单总价、平台手续费和自由职业者收入"""
+    total_price = Decimal(base_price) + Decimal(extras_price)
+    platform_fee = (total_price * PLATFORM_FEE_RATE).quantize(Decimal('0.01'))
+    return {
+        'base_price': base_price,
+        'extras_price': extras_price,
+        'total_price': total_price,
+        'platform_fee': platform_fee,
+        'freelancer_earnings': total_price - platform_fee,
+    }
+
 
 class OrderExtraSerializer(serializers.ModelSerializer):
     """订单附加项序列化器"""
@@ -35,16 +59,37 @@ class OrderRequirementSerializer(serializers.ModelSerializer):
 class DeliverySerializer(serializers.ModelSerializer):
     """交付序列化器"""
     previous_delivery_info = serializers.SerializerMethodField()
+    attachments = FileUploadSerializer(many=True, read_only=True)
+    attachment_ids = serializers.PrimaryKeyRelatedField(
+        many=True,
+        write_only=True,
+        required=False,
+        source='attachments',
+        queryset=FileUpload.objects.filter(status='completed')
+    )
 
     class Meta:
         model = Delivery
         fields = [
             'id', 'title', 'description', 'message', 'files', 'file_count',
+            'attachments', 'attachment_ids',
             'is_final_delivery', 'is_accepted', 'accepted_at', 'rejected_reason',
             'revision_number', 'previous_delivery_info', 'created_at'
         ]
         read_only_fields = ['id', 'accepted_at', 'created_at']
 
+    def validate_attachment_ids(self, value):
+        """只能引用本人已完成的上传"""
+        user = self.context['request'].user
+        if any(upload.owner_id != user.pk for upload in value):
+            raise ValidationError('只能使用自己上传的文件')
+        return value
+
+    def create(self, validated_data):
+        if validated_data.get('attachments'):
+            validated_data['file_count'] = len(validated_data['attachments'])
+        return super().create(validated_data)
+
     def get_previous_delivery_info(self, obj):
         if obj.previous_delivery:
             return {
@@ -312,15 +357,7 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             for extra in attrs.get('extras', [])
         )
 
-        total_price = base_price + extras_price
-        platform_fee = total_price * 0.1  # 10% 平台手续费
-        freelancer_earnings = total_price - platform_fee
-
-        attrs['base_price'] = base_price
-        attrs['extras_price'] = extras_price
-        attrs['total_price'] = total_price
-        attrs['platform_fee'] = platform_fee
-        attrs['freelancer_earnings'] = freelancer_earnings
+        attrs.update(calculate_order_pricing(base_price, extras_price))
 
         # 设置交付时间
         delivery_days = gig_package.delivery_days if gig_package else 7
@@ -336,29 +373,185 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         requirements_data = validated_data.pop('requirements', [])
 
         # 创建订单
+        validated_data.setdefault('client', self.context['request'].user)
         order = Order.objects.create(
-            client=self.context['request'].user,
             freelancer=validated_data['gig'].freelancer,
             **validated_data
         )
 
-        # 创建订单附加项
-        for extra_data in extras_data:
-            OrderExtra.objects.create(
+        # 批量创建订单附加项和需求
+        OrderExtra.objects.bulk_create([
+            OrderExtra(
                 order=order,
-                gig_extra_id=extra_data['gig_extra']['id'],
+                gig_extra=extra_data['gig_extra'],
                 quantity=extra_data.get('quantity', 1),
                 price=extra_data.get('price', 0)
             )
+            for extra_data in extras_data
+        ])
+        OrderRequirement.objects.bulk_create([
+            OrderRequirement(order=order, **requirement_data)
+            for requirement_data in requirements_data
+        ])
 
-        # 创建订单需求
-        for requirement_data in requirements_data:
-            OrderRequirement.objects.create(
-                order=order,
-                **requirement_data
+        return order
+
+
+class OrderBulkExtraSerializer(serializers.Serializer):
+    """批量下单中的附加项"""
+    gig_extra = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class OrderBulkItemSerializer(serializers.Serializer):
+    """批量下单中的单个订单，服务/套餐/附加项从 context['lookups'] 中读取，不单独查询"""
+    gig = serializers.UUIDField()
+    gig_package = serializers.UUIDField()
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    client_requirements = serializers.CharField(required=False, allow_blank=True, default='')
+    priority = serializers.ChoiceField(choices=Order.PRIORITY_CHOICES, default='standard')
+    preferred_communication_method = serializers.ChoiceField(
+        choices=Order._meta.get_field('preferred_communication_method').choices,
+        default='platform'
+    )
+    client_email = serializers.EmailField()
+    client_phone = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
+    extras = OrderBulkExtraSerializer(many=True, required=False, default=list)
+    requirements = OrderRequirementSerializer(many=True, required=False, default=list)
+
+    def validate(self, attrs):
+        lookups = self.context['lookups']
+
+        gig = lookups['gigs'].get(attrs['gig'])
+        if gig is None or gig.status != 'active':
+            raise ValidationError({'gig': '服务不存在或未上架'})
+
+        gig_package = lookups['packages'].get(attrs['gig_package'])
+        if gig_package is None or gig_package.gig_id != gig.pk:
+            raise ValidationError({'gig_package': '选择的套餐不属于该服务'})
+
+        extras = []
+        for extra_data in attrs['extras']:
+            gig_extra = lookups['extras'].get(extra_data['gig_extra'])
+            if gig_extra is None or gig_extra.gig_id != gig.pk:
+                raise ValidationError({'extras': f"附加项 {extra_data['gig_extra']} 不属于该服务"})
+            extras.append({'gig_extra': gig_extra, 'quantity': extra_data['quantity']})
+
+        attrs['gig'] = gig
+        attrs['gig_package'] = gig_package
+        attrs['extras'] = extras
+
+        # 价格以服务端数据为准
+        extras_price = sum((extra['gig_extra'].price * extra['quantity'] for extra in extras), Decimal('0'))
+        attrs.update(calculate_order_pricing(gig_package.price, extras_price))
+
+        estimated_delivery = timezone.now() + timedelta(days=gig_package.delivery_days)
+        attrs['delivery_deadline'] = estimated_delivery
+        attrs['estimated_delivery'] = estimated_delivery
+        return attrs
+
+
+class OrderBulkCreateSerializer(serializers.Serializer):
+    """批量下单序列化器：共享查询校验每个订单，合法的订单在一个事务中批量写入"""
+    orders = serializers.ListField(child=serializers.DictField(), min_length=1)
+
+    def validate_orders(self, value):
+        max_items = getattr(settings, 'ORDER_BULK_CREATE_MAX_ITEMS', 50)
+        if len(value) > max_items:
+            raise ValidationError(f'单次最多创建 {max_items} 个订单')
+        return value
+
+    @staticmethod
+    def _collect_ids(items, field, nested=None):
+        ids = set()
+        for item in items:
+            values = [entry.get(nested) for entry in item.get(field) or [] if isinstance(entry, dict)] \
+                if nested else [item.get(field)]
+            for value in values:
+                try:
+                    ids.add(uuid.UUID(str(value)))
+                except ValueError:
+                    continue
+        return ids
+
+    def load_lookups(self, items):
+        """一次性加载所有订单引用的服务、套餐和附加项"""
+        from apps.gigs.models import Gig, GigExtra, GigPackage
+
+        return {
+            'gigs': Gig.objects.select_related('freelancer').in_bulk(self._collect_ids(items, 'gig')),
+            'packages': GigPackage.objects.in_bulk(self._collect_ids(items, 'gig_package')),
+            'extras': GigExtra.objects.in_bulk(self._collect_ids(items, 'extras', 'gig_extra')),
+        }
+
+    def validate(self, attrs):
+        lookups = self.load_lookups(attrs['orders'])
+        context = dict(self.context, lookups=lookups)
+
+        attrs['valid_items'], attrs['errors'] = [], {}
+        for index, item in enumerate(attrs['orders']):
+            item_serializer = OrderBulkItemSerializer(data=item, context=context)
+            if item_serializer.is_valid():
+                attrs['valid_items'].append((index, item_serializer.validated_data))
+            else:
+                attrs['errors'][index] = item_serializer.errors
+        return attrs
+
+    def create(self, validated_data):
+        """批量写入订单、附加项和需求，返回与请求顺序一致的逐项结果"""
+        client = self.context['request'].user
+        orders, order_extras, order_requirements = [], [], []
+
+        for index, data in validated_data['valid_items']:
+            data = dict(data)
+            extras_data = data.pop('extras')
+            requirements_data = data.pop('requirements')
+
+            # bulk_create 不会调用 save()，订单号需在此生成
+            order = Order(client=client, freelancer=data['gig'].freelancer, **data)
+            order.order_number = order.generate_order_number()
+            order.search_document = build_search_document(order)
+            orders.append(order)
+
+            order_extras.extend(
+                OrderExtra(
+                    order=order,
+                    gig_extra=extra['gig_extra'],
+                    quantity=extra['quantity'],
+                    price=extra['gig_extra'].price
+                )
+                for extra in extras_data
+            )
+            order_requirements.extend(
+                OrderRequirement(order=order, **requirement_data)
+                for requirement_data in requirements_data
             )
 
-        return order
+        with transaction.atomic():
+            Order.objects.bulk_create(orders, batch_size=100)
+            OrderExtra.objects.bulk_create(order_extras, batch_size=500)
+            OrderRequirement.objects.bulk_create(order_requirements, batch_size=500)
+
+            # bulk_create 不触发 post_save，手动清理双方的订单统计缓存
+            user_ids = {client.pk} | {order.freelancer_id for order in orders}
+            transaction.on_commit(lambda: invalidate_order_stats(*user_ids))
+
+        created = iter(orders)
+        results = []
+        for index in range(len(validated_data['orders'])):
+            if index in validated_data['errors']:
+                results.append({'index': index, 'success': False, 'errors': validated_data['errors'][index]})
+            else:
+                order = next(created)
+                results.append({
+                    'index': index,
+                    'success': True,
+                    'id': order.id,
+                    'order_number': order.order_number,
+                    'total_price': order.total_price
+                })
+        return results
 
 
 class OrderStatusUpdateSerializer(serializers.Serializer):
@@ -514,7 +707,7 @@ class OrderDisputeCreateSerializer(serializers.ModelSerializer):
             raise ValidationError("订单ID是必需的")
 
         # 验证订单状态
-        if order.status in ['pending', 'cancelled', 'refunded']:
+        if not can_transition(order.status, 'disputed'):
             raise ValidationError("此订单状态不允许创建纠纷")
 
         # 检查是否已存在纠纷
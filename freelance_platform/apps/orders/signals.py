@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.accounts.models import User
+from apps.gigs.models import Gig
+from .models import Delivery, Order, OrderCancellation, OrderDispute, OrderMessage, OrderStatusHistory
+from .stats import ORDER_STATS_FIELDS, invalidate_order_stats
+from .timeline import invalidate_order_timeline
+
+
+@receiver(post_save, sender=Order)
+def invalidate_order_stats_on_save(sender, instance, update_fields=None, **kwargs):
+    """Drop both parties' cached dashboards when a counted field changes"""
+    if update_fields is not None and not ORDER_STATS_FIELDS.intersection(update_fields):
+        return
+    client_id, freelancer_id = instance.client_id, instance.freelancer_id
+    # After commit, so a concurrent request cannot re-cache the old figures
+    transaction.on_commit(lambda: invalidate_order_stats(client_id, freelancer_id))
+
+
+@receiver(post_delete, sender=Order)
+def invalidate_order_stats_on_delete(sender, instance, **kwargs):
+    client_id, freelancer_id = instance.client_id, instance.freelancer_id
+    transaction.on_commit(lambda: invalidate_order_stats(client_id, freelancer_id))
+
+
+@receiver(pre_save, sender=Gig)
+def snapshot_gig_title(sender, instance, update_fields=None, **kwargs):
+    # Compared against the value loaded with the instance, no extra query
+    instance._order_search_stale = instance.field_changed('title', update_fields)
+
+
+@receiver(post_save, sender=Gig)
+def refresh_order_search_on_gig_save(sender, instance, **kwargs):
+    """Order search documents embed the gig title; rebuild them off-request when it changed"""
+    if not getattr(instance, '_order_search_stale', False):
+        return
+    from .tasks import refresh_order_search_documents
+
+    gig_id = str(instance.pk)
+    transaction.on_commit(lambda: refresh_order_search_documents.delay(gig_id=gig_id))
+
+
+@receiver(pre_save, sender=User)
+def snapshot_username(sender, instance, update_fields=None, **kwargs):
+    instance._order_search_stale = instance.field_changed('username', update_fields)
+
+
+@receiver(post_save, sender=User)
+def refresh_order_search_on_username_change(sender, instance, **kwargs):
+    """Order search documents embed both parties' usernames"""
+    if not getattr(instance, '_order_search_stale', False):
+        return
+    from .tasks import refresh_order_search_documents
+
+    user_id = str(instance.pk)
+    transaction.on_commit(lambda: refresh_order_search_documents.delay(user_id=user_id))
+
+
+TIMELINE_MODELS = (OrderStatusHistory, Delivery, OrderMessage, OrderDispute, OrderCancellation)
+
+
+def invalidate_order_timeline_on_change(sender, instance, **kwargs):
+    """Any new, edited or removed timeline event drops the order's cached timeline"""
+    order_id = instance.order_id
+    transaction.on_commit(lambda: invalidate_order_timeline(order_id))
+
+
+for model in TIMELINE_MODELS:
+    post_save.connect(invalidate_order_timeline_on_change, sender=model, dispatch_uid=f'order_timeline_save_{model.__name__}')
+    post_delete.connect(invalidate_order_timeline_on_change, sender=model, dispatch_uid=f'order_timeline_delete_{model.__name__}')
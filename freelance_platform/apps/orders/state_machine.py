@@ -0,0 +1,109 @@
+"""
+Order status state machine
+Validates transitions against a declarative table and applies them with a
+compare-and-swap UPDATE plus one history INSERT; side effects run on commit
+"""
+import logging
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+
+from .exceptions import OrderTransitionError, StaleOrderStatusError
+from .models import Order, OrderStatusHistory
+
+logger = logging.getLogger(__name__)
+
+# status -> statuses it may move to
+TRANSITIONS = {
+    'pending': {'paid', 'cancelled'},
+    'paid': {'requirements_provided', 'in_progress', 'cancelled', 'refunded', 'disputed'},
+    'requirements_provided': {'in_progress', 'cancelled', 'disputed'},
+    'in_progress': {'delivered', 'cancelled', 'disputed'},
+    'delivered': {'completed', 'revision_requested', 'cancelled', 'disputed'},
+    'revision_requested': {'in_progress', 'delivered', 'cancelled', 'disputed'},
+    'completed': {'disputed'},
+    'disputed': {'in_progress', 'completed', 'cancelled', 'refunded'},
+    'cancelled': {'refunded'},
+    'refunded': set(),
+}
+
+ANY_STATUS = '*'
+
+_hooks = defaultdict(list)
+
+
+def on_transition(*statuses):
+    """
+    Register ``hook(order, old_status, new_status, user)`` to run after commit
+    whenever an order enters one of ``statuses`` (all statuses when none given)
+    """
+    def decorator(hook):
+        for status in statuses or (ANY_STATUS,):
+            _hooks[status].append(hook)
+        return hook
+    return decorator
+
+
+def can_transition(old_status, new_status):
+    return new_status in TRANSITIONS.get(old_status, ())
+
+
+def _run_hook(hook, order, old_status, new_status, user):
+    try:
+        hook(order, old_status, new_status, user)
+    except Exception as e:
+        # The status change is already committed; a failing side effect must not mask it
+        logger.error(f"Order transition hook {hook.__name__} failed for {order.order_number}: {str(e)}")
+
+
+def transition_order(order, new_status, user=None, notes='', **fields):
+    """
+    Move ``order`` from its current status to ``new_status``
+
+    Only ``status``, ``updated_at`` and the extra ``fields`` are written, and only
+    if the row still has the status ``order`` was read with; otherwise
+    ``StaleOrderStatusError`` is raised and nothing changes. Returns the old status.
+    """
+    old_status = order.status
+    if not can_transition(old_status, new_status):
+        raise OrderTransitionError(
+            f'订单状态为 {old_status}，无法变更为 {new_status}',
+            old_status=old_status,
+            new_status=new_status
+        )
+
+    values = dict(fields, status=new_status, updated_at=timezone.now())
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, status=old_status).update(**values)
+        if not updated:
+            raise StaleOrderStatusError(
+                '订单状态已被其他操作修改，请刷新后重试',
+                old_status=old_status,
+                new_status=new_status
+            )
+
+        OrderStatusHistory.objects.create(
+            order=order,
+            old_status=old_status,
+            new_status=new_status,
+            changed_by=user,
+            notes=notes
+        )
+
+        for field, value in values.items():
+            setattr(order, field, value)
+
+        for hook in _hooks[new_status] + _hooks[ANY_STATUS]:
+            transaction.on_commit(partial(_run_hook, hook, order, old_status, new_status, user))
+
+    return old_status
+
+
+@on_transition()
+def invalidate_dashboards(order, old_status, new_status, user):
+    """QuerySet.update() skips post_save, so clear cached order stats here"""
+    from .stats import invalidate_order_stats
+
+    invalidate_order_stats(order.client_id, order.freelancer_id)
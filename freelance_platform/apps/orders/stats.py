@@ -0,0 +1,119 @@
+"""
+Cached order dashboards
+Order stats and freelancer earnings are each computed with one conditional
+aggregate query and cached per user until one of the user's orders changes
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Order
+
+ORDER_STATS_CACHE_KEY = 'orders:stats:{user_id}'
+FREELANCER_EARNINGS_CACHE_KEY = 'orders:earnings:{user_id}'
+
+# Fields whose change alters a dashboard figure
+ORDER_STATS_FIELDS = frozenset({'status', 'total_price', 'freelancer_earnings', 'client', 'freelancer'})
+
+
+def _cache_timeout():
+    return getattr(settings, 'ORDER_STATS_CACHE_TIMEOUT', 300)
+
+
+def compute_order_stats(orders):
+    """Status counts and completed revenue for ``orders`` in a single query"""
+    aggregates = {
+        status: Count('id', filter=Q(status=status))
+        for status, _ in Order.STATUS_CHOICES
+    }
+    totals = orders.aggregate(
+        total_orders=Count('id'),
+        total_revenue=Sum('total_price', filter=Q(status='completed')),
+        **aggregates
+    )
+
+    return {
+        'total_orders': totals['total_orders'],
+        'active_orders': totals['in_progress'],
+        'completed_orders': totals['completed'],
+        'cancelled_orders': totals['cancelled'],
+        'total_revenue': totals['total_revenue'] or 0,
+        'pending_orders': totals['pending'],
+        'disputed_orders': totals['disputed'],
+        'by_status': [
+            {'status': status, 'count': totals[status]}
+            for status in sorted(aggregates)
+            if totals[status]
+        ],
+    }
+
+
+def get_order_stats(user):
+    """Order statistics for the user's side of their orders, served from cache when available"""
+    key = ORDER_STATS_CACHE_KEY.format(user_id=user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        if user.user_type == 'client':
+            orders = Order.objects.filter(client=user)
+        elif user.user_type == 'freelancer':
+            orders = Order.objects.filter(freelancer=user)
+        else:
+            orders = Order.objects.none()
+        stats = compute_order_stats(orders)
+        cache.set(key, stats, timeout=_cache_timeout())
+    return stats
+
+
+def compute_freelancer_earnings(freelancer):
+    """Completed order earnings by month, with totals folded from the same rows"""
+    rows = Order.objects.filter(freelancer=freelancer, status='completed').annotate(
+        month=TruncMonth('created_at')
+    ).values('month').annotate(
+        monthly_total=Sum('freelancer_earnings'),
+        monthly_count=Count('id'),
+        monthly_price=Sum('total_price'),
+    ).order_by('month')
+
+    monthly_trend = []
+    total_earnings = Decimal('0')
+    total_price = Decimal('0')
+    completed_orders = 0
+    for row in rows:
+        total_earnings += row['monthly_total'] or 0
+        total_price += row['monthly_price'] or 0
+        completed_orders += row['monthly_count']
+        monthly_trend.append({
+            'month': row['month'].strftime('%Y-%m'),
+            'monthly_total': row['monthly_total'],
+            'monthly_count': row['monthly_count'],
+        })
+
+    return {
+        'total_earnings': total_earnings,
+        'avg_order_value': total_price / completed_orders if completed_orders else 0,
+        'completed_orders': completed_orders,
+        'monthly_trend': monthly_trend,
+    }
+
+
+def get_freelancer_earnings(freelancer):
+    key = FREELANCER_EARNINGS_CACHE_KEY.format(user_id=freelancer.pk)
+    earnings = cache.get(key)
+    if earnings is None:
+        earnings = compute_freelancer_earnings(freelancer)
+        cache.set(key, earnings, timeout=_cache_timeout())
+    return earnings
+
+
+def invalidate_order_stats(*user_ids):
+    """Drop cached dashboards of the given users"""
+    keys = []
+    for user_id in user_ids:
+        if user_id is not None:
+            keys.append(ORDER_STATS_CACHE_KEY.format(user_id=user_id))
+            keys.append(FREELANCER_EARNINGS_CACHE_KEY.format(user_id=user_id))
+    if keys:
+        cache.delete_many(keys)
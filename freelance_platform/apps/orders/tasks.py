@@ -0,0 +1,45 @@
+from datetime import date
+
+from celery import shared_task
+from django.core.mail import send_mass_mail
+from django.db.models import Q
+
+from .analytics import backfill_order_stats, rollup_order_stats
+from .deadlines import sweep_order_deadlines
+from .models import Order
+from .search import refresh_search_documents
+
+
+@shared_task
+def check_pending_orders():
+    """Queue reminders for orders that just became overdue or are due soon"""
+    return sweep_order_deadlines()
+
+
+@shared_task
+def send_order_notifications(messages):
+    """Send a batch of ``(subject, body, from_email, recipients)`` emails over one connection"""
+    return send_mass_mail([tuple(message) for message in messages], fail_silently=False)
+
+
+@shared_task
+def rollup_order_statistics():
+    """Rebuild OrderStat for dates touched since the last run"""
+    return rollup_order_stats()
+
+
+@shared_task
+def backfill_order_statistics(start_date, end_date):
+    """Rebuild OrderStat for one ``[start_date, end_date)`` chunk (ISO dates)"""
+    return backfill_order_stats(date.fromisoformat(start_date), date.fromisoformat(end_date))
+
+
+@shared_task
+def refresh_order_search_documents(gig_id=None, user_id=None):
+    """Rebuild order search documents, for one gig's or one user's orders, or all of them"""
+    orders = Order.objects.all()
+    if gig_id is not None:
+        orders = orders.filter(gig_id=gig_id)
+    if user_id is not None:
+        orders = orders.filter(Q(client_id=user_id) | Q(freelancer_id=user_id))
+    return refresh_search_documents(orders)
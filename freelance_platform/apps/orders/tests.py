@@ -1,3 +1,388 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.gigs.models import Category, Gig, GigExtra, GigPackage
+from . import deadlines, state_machine
+from .analytics import backfill_order_stats, rollup_order_stats, summarize_order_stats
+from .exceptions import OrderTransitionError, StaleOrderStatusError
+from .models import Order, OrderExtra, OrderRequirement, OrderStat, OrderStatusHistory
+from .search import search_orders
+from .stats import FREELANCER_EARNINGS_CACHE_KEY, ORDER_STATS_CACHE_KEY
+from .state_machine import transition_order
+from .tasks import refresh_order_search_documents
+
+
+class DeliveredOrderTestCase(TestCase):
+    """一个已交付、等待客户确认的订单"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create(username='client', email='client@example.com', user_type='client')
+        cls.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', user_type='freelancer')
+        category = Category.objects.create(name='设计')
+        gig = Gig.objects.create(
+            title='Logo设计',
+            description='专业设计',
+            freelancer=cls.freelancer,
+            category=category,
+            tags='logo',
+            searchable_text='Logo设计',
+            slug='logo',
+            status='active'
+        )
+        package = GigPackage.objects.create(
+            gig=gig, package_type='basic', title='basic', description='套餐', price=100, delivery_days=3
+        )
+        cls.order = Order.objects.create(
+            client=cls.client_user,
+            freelancer=cls.freelancer,
+            gig=gig,
+            gig_package=package,
+            title='Logo设计',
+            base_price=100,
+            total_price=100,
+            status='delivered',
+            delivery_deadline=timezone.now(),
+            estimated_delivery=timezone.now(),
+            client_email='client@example.com'
+        )
+
+
+class OrderStateMachineTests(DeliveredOrderTestCase):
+    """订单状态机：按转换表校验，按读取时的状态做 CAS 更新"""
+
+    def test_transition_updates_status_and_records_history(self):
+        order = Order.objects.get(pk=self.order.pk)
+        old_status = transition_order(order, 'completed', user=self.client_user, notes='确认')
+
+        self.assertEqual(old_status, 'delivered')
+        self.assertEqual(order.status, 'completed')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'completed')
+        history = OrderStatusHistory.objects.get(order=order)
+        self.assertEqual((history.old_status, history.new_status, history.changed_by), ('delivered', 'completed', self.client_user))
+
+    def test_transition_writes_only_status_and_extra_fields(self):
+        order = Order.objects.get(pk=self.order.pk)
+        order.title = '未保存的标题'
+        delivered_at = timezone.now()
+        transition_order(order, 'completed', actual_delivery=delivered_at)
+
+        stored = Order.objects.get(pk=order.pk)
+        self.assertEqual(stored.title, 'Logo设计')
+        self.assertEqual(stored.actual_delivery, delivered_at)
+
+    def test_transition_outside_the_table_is_rejected(self):
+        order = Order.objects.get(pk=self.order.pk)
+        with self.assertRaises(OrderTransitionError) as context:
+            transition_order(order, 'pending')
+
+        self.assertNotIsInstance(context.exception, StaleOrderStatusError)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'delivered')
+        self.assertFalse(OrderStatusHistory.objects.exists())
+
+    def test_stale_status_loses_the_compare_and_swap(self):
+        first = Order.objects.get(pk=self.order.pk)
+        second = Order.objects.get(pk=self.order.pk)
+        transition_order(first, 'completed')
+
+        with self.assertRaises(StaleOrderStatusError):
+            transition_order(second, 'revision_requested')
+
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'completed')
+        self.assertEqual(second.status, 'delivered')
+        self.assertEqual(OrderStatusHistory.objects.filter(order=self.order).count(), 1)
+
+    def test_hooks_run_only_after_commit(self):
+        hook = mock.Mock(__name__='hook')
+        order = Order.objects.get(pk=self.order.pk)
+        with mock.patch.dict(state_machine._hooks, {'completed': [hook]}):
+            with self.captureOnCommitCallbacks(execute=True):
+                transition_order(order, 'completed', user=self.client_user)
+                hook.assert_not_called()
+
+        hook.assert_called_once_with(order, 'delivered', 'completed', self.client_user)
+
+    def test_failing_hook_does_not_undo_the_transition(self):
+        hook = mock.Mock(__name__='hook', side_effect=RuntimeError('boom'))
+        order = Order.objects.get(pk=self.order.pk)
+        with mock.patch.dict(state_machine._hooks, {'completed': [hook]}):
+            with self.captureOnCommitCallbacks(execute=True):
+                transition_order(order, 'completed')
+
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'completed')
+
+
+class OrderTransitionConflictViewTests(DeliveredOrderTestCase):
+    """并发修改状态时接口返回 409"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.client_user)
+
+    def confirm_delivery(self, race_to=None):
+        """确认交付；``race_to`` 模拟读取订单后、更新前另一个请求改掉了状态"""
+        get = Order.objects.get
+
+        def get_order(*args, **kwargs):
+            order = get(pk=self.order.pk)
+            if race_to:
+                Order.objects.filter(pk=order.pk).update(status=race_to)
+            return order
+
+        with mock.patch.object(Order.objects, 'get', side_effect=get_order):
+            return self.client.post(f'/api/orders/{self.order.order_number}/confirm-delivery/')
+
+    def test_confirm_delivery_completes_the_order(self):
+        response = self.confirm_delivery()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order_status'], 'completed')
+
+    def test_concurrent_status_change_returns_409(self):
+        response = self.confirm_delivery(race_to='disputed')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'disputed')
+        self.assertFalse(OrderStatusHistory.objects.exists())
+
+
+class DeadlineSweepTests(DeliveredOrderTestCase):
+    """截止提醒：按订单标记判断，窗口内新建或截止后重新打开的订单也会收到通知"""
+
+    def setUp(self):
+        self.now = timezone.now()
+        enqueue = mock.patch.object(deadlines, 'enqueue_notifications')
+        self.enqueue = enqueue.start()
+        self.addCleanup(enqueue.stop)
+
+    def sweep(self, now=None):
+        self.enqueue.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            counts = deadlines.sweep_order_deadlines(now or self.now)
+        self.enqueue.assert_called_once()
+        return counts, {(subject.split('（')[0], tuple(recipients)) for subject, _, _, recipients in self.enqueue.call_args.args[0]}
+
+    def test_order_created_inside_the_reminder_window_is_reminded(self):
+        self.assertEqual(self.sweep()[0], {'overdue': 0, 'due_soon': 0})
+        Order.objects.filter(pk=self.order.pk).update(status='in_progress', delivery_deadline=self.now + timedelta(hours=2))
+
+        counts, messages = self.sweep(self.now + timedelta(minutes=5))
+
+        self.assertEqual(counts, {'overdue': 0, 'due_soon': 1})
+        self.assertEqual(messages, {('订单即将到期', ('freelancer@example.com',))})
+        self.assertIsNotNone(Order.objects.get(pk=self.order.pk).reminder_sent_at)
+
+    def test_order_reopened_after_its_deadline_is_reported_overdue(self):
+        Order.objects.filter(pk=self.order.pk).update(delivery_deadline=self.now - timedelta(days=2))
+        self.assertEqual(self.sweep()[0], {'overdue': 0, 'due_soon': 0})
+        Order.objects.filter(pk=self.order.pk).update(status='revision_requested')
+
+        counts, messages = self.sweep(self.now + timedelta(minutes=5))
+
+        self.assertEqual(counts, {'overdue': 1, 'due_soon': 0})
+        self.assertEqual(messages, {
+            ('订单已逾期', ('freelancer@example.com',)),
+            ('订单已逾期', ('client@example.com',)),
+        })
+
+    def test_each_notice_is_sent_once(self):
+        Order.objects.filter(pk=self.order.pk).update(status='in_progress', delivery_deadline=self.now + timedelta(hours=1))
+        self.assertEqual(self.sweep()[0], {'overdue': 0, 'due_soon': 1})
+        self.assertEqual(self.sweep()[0], {'overdue': 0, 'due_soon': 0})
+
+        # Crossing the deadline still earns the overdue notice, once
+        later = self.now + timedelta(hours=2)
+        self.assertEqual(self.sweep(later)[0], {'overdue': 1, 'due_soon': 0})
+        self.assertEqual(self.sweep(later)[0], {'overdue': 0, 'due_soon': 0})
+
+
+class OrderSearchDocumentRefreshTests(DeliveredOrderTestCase):
+    """服务标题或用户名变化时刷新订单搜索文本，其他保存不触发"""
+
+    def setUp(self):
+        delay = mock.patch.object(
+            refresh_order_search_documents, 'delay', side_effect=refresh_order_search_documents
+        )
+        self.delay = delay.start()
+        self.addCleanup(delay.stop)
+
+    def save(self, instance, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save(**kwargs)
+
+    def document(self):
+        return Order.objects.get(pk=self.order.pk).search_document
+
+    def test_gig_title_change_refreshes_the_document(self):
+        gig = Gig.objects.get(pk=self.order.gig_id)
+        gig.title = 'Brand Identity'
+        self.save(gig)
+
+        self.delay.assert_called_once_with(gig_id=str(gig.pk))
+        self.assertIn('brand identity', self.document())
+
+    def test_username_change_refreshes_the_document(self):
+        user = User.objects.get(pk=self.freelancer.pk)
+        user.username = 'studio'
+        self.save(user, update_fields=['username'])
+
+        self.delay.assert_called_once_with(user_id=str(user.pk))
+        self.assertIn('studio', self.document().split())
+
+    def test_other_saves_do_not_refresh(self):
+        gig = Gig.objects.get(pk=self.order.gig_id)
+        gig.description = '新的描述'
+        self.save(gig)
+        user = User.objects.get(pk=self.client_user.pk)
+        user.first_name = '小明'
+        self.save(user)
+        # Saving the same instance again compares against what it just wrote
+        gig.title = 'Brand Identity'
+        self.save(gig)
+        self.delay.reset_mock()
+        self.save(gig)
+
+        self.delay.assert_not_called()
+
+    def test_full_save_does_not_reread_the_row(self):
+        gig = Gig.objects.get(pk=self.order.gig_id)
+        gig.description = '新的描述'
+        with CaptureQueriesContext(connection) as context:
+            self.save(gig)
+        self.assertFalse([query for query in context.captured_queries if query['sql'].startswith('SELECT')])
+
+
+class OrderBulkCreateTests(DeliveredOrderTestCase):
+    """批量下单：订单号唯一、可搜索，附加项和需求一并写入，双方统计缓存被清理"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.extra = GigExtra.objects.create(gig=cls.order.gig, title='源文件', price=20)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.client_user)
+
+    def item(self, title, **extra):
+        return {
+            'gig': str(self.order.gig_id),
+            'gig_package': str(self.order.gig_package_id),
+            'title': title,
+            'client_email': 'client@example.com',
+            **extra
+        }
+
+    def bulk_create(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/orders/bulk-create/', {'orders': items}, format='json')
+
+    def test_valid_items_are_created_with_unique_numbers(self):
+        response = self.bulk_create([
+            self.item('名片设计'),
+            self.item('坏订单', gig_package=str(self.extra.pk)),
+            self.item('海报设计'),
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+        self.assertEqual([result['success'] for result in response.data['results']], [True, False, True])
+        numbers = [result['order_number'] for result in response.data['results'] if result['success']]
+        self.assertEqual(len(set(numbers)), 2)
+        self.assertNotIn(self.order.order_number, numbers)
+        self.assertEqual(
+            set(Order.objects.filter(order_number__in=numbers).values_list('client_id', 'freelancer_id')),
+            {(self.client_user.pk, self.freelancer.pk)}
+        )
+
+    def test_created_orders_are_searchable(self):
+        response = self.bulk_create([self.item('名片设计')])
+        order_id = response.data['results'][0]['id']
+
+        for query in ('名片设计', 'logo设计 名片 freelancer', response.data['results'][0]['order_number']):
+            self.assertEqual(list(search_orders(Order.objects.all(), query).values_list('pk', flat=True)), [order_id], query)
+
+    def test_extras_and_requirements_are_written(self):
+        response = self.bulk_create([self.item(
+            '名片设计',
+            extras=[{'gig_extra': str(self.extra.pk), 'quantity': 2}],
+            requirements=[{'requirement_text': '公司名称'}, {'requirement_text': '配色'}]
+        )])
+
+        order = Order.objects.get(pk=response.data['results'][0]['id'])
+        extra = OrderExtra.objects.get(order=order)
+        self.assertEqual((extra.gig_extra_id, extra.quantity, extra.price), (self.extra.pk, 2, 20))
+        self.assertEqual(
+            sorted(OrderRequirement.objects.filter(order=order).values_list('requirement_text', flat=True)),
+            ['公司名称', '配色']
+        )
+        self.assertEqual(order.total_price, response.data['results'][0]['total_price'])
+
+    def test_both_parties_stats_caches_are_cleared(self):
+        keys = [
+            key.format(user_id=user.pk)
+            for key in (ORDER_STATS_CACHE_KEY, FREELANCER_EARNINGS_CACHE_KEY)
+            for user in (self.client_user, self.freelancer)
+        ]
+        cache.set_many(dict.fromkeys(keys, {'cached': True}))
+
+        self.bulk_create([self.item('名片设计')])
+
+        self.assertEqual(cache.get_many(keys), {})
+
+
+class OrderStatRollupTests(DeliveredOrderTestCase):
+    """订单统计汇总：按日期整日重算，重复执行结果不变，同一订单同日多次事件只计一次"""
+
+    def setUp(self):
+        Order.objects.filter(pk=self.order.pk).update(platform_fee=10)
+
+    def record(self, new_status, times=1):
+        for _ in range(times):
+            OrderStatusHistory.objects.create(order=self.order, old_status='delivered', new_status=new_status)
+
+    def totals(self):
+        return summarize_order_stats(OrderStat.objects.all())
+
+    def test_rerunning_the_rollup_does_not_change_the_figures(self):
+        self.record('completed')
+        until = timezone.now() + timedelta(minutes=1)
+        rollup_order_stats(until)
+        first = self.totals()
+
+        self.assertEqual(rollup_order_stats(until), 0)
+        # Later runs and an overlapping backfill recompute the same dates from scratch
+        rollup_order_stats(until + timedelta(minutes=1))
+        today = timezone.localdate()
+        backfill_order_stats(today - timedelta(days=1), today + timedelta(days=2))
+
+        self.assertEqual(self.totals(), first)
+        self.assertEqual((first['total_orders'], first['completed_orders']), (1, 1))
+        self.assertEqual((first['total_revenue'], first['platform_fees']), (100, 10))
+
+    def test_repeated_events_for_one_order_count_once(self):
+        self.record('completed', times=2)
+        self.record('disputed', times=3)
+        rollup_order_stats(timezone.now() + timedelta(minutes=1))
+
+        totals = self.totals()
+        self.assertEqual((totals['completed_orders'], totals['disputed_orders']), (1, 1))
+        self.assertEqual((totals['total_revenue'], totals['platform_fees']), (100, 10))
+
+    def test_events_after_a_run_rebuild_their_date(self):
+        until = timezone.now() + timedelta(minutes=1)
+        rollup_order_stats(until)
+        self.assertEqual(self.totals()['refunded_orders'], 0)
+
+        self.record('refunded', times=2)
+        OrderStatusHistory.objects.update(created_at=until + timedelta(seconds=1))
+        rollup_order_stats(until + timedelta(minutes=1))
 
-# Create your tests here.
+        totals = self.totals()
+        self.assertEqual((totals['total_orders'], totals['refunded_orders'], totals['refunds_amount']), (1, 1, 100))
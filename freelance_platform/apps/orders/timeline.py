@@ -0,0 +1,80 @@
+"""
+Order timeline
+Status changes, deliveries, messages, the dispute and the cancellation of an
+order are read with one UNION ALL query in time order and cached per order until
+one of them changes
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast, Left
+
+from .models import Delivery, OrderCancellation, OrderDispute, OrderMessage, OrderStatusHistory
+
+ORDER_TIMELINE_CACHE_KEY = 'orders:timeline:{order_id}'
+
+SUMMARY_LENGTH = 200
+
+
+def _text(expression):
+    return Cast(expression, output_field=CharField())
+
+
+def _events(model, event_type, order_id, actor, summary, detail):
+    """
+    One UNION branch. Every branch annotates the same names in the same order,
+    which is what keeps the combined columns aligned.
+    """
+    return model.objects.filter(order_id=order_id, is_deleted=False).annotate(
+        event_type=Value(event_type, output_field=CharField()),
+        event_id=F('id'),
+        occurred_at=F('created_at'),
+        actor=actor,
+        summary=summary,
+        detail=detail,
+    ).values('event_type', 'event_id', 'occurred_at', 'actor', 'summary', 'detail').order_by()
+
+
+def build_order_timeline(order):
+    """All timeline events of ``order`` as compact dicts, oldest first"""
+    order_id = order.pk
+    queries = [
+        _events(OrderStatusHistory, 'status', order_id,
+                actor=F('changed_by__username'), summary=F('new_status'), detail=F('old_status')),
+        # Deliveries are always made by the order's freelancer
+        _events(Delivery, 'delivery', order_id,
+                actor=F('order__freelancer__username'), summary=Left('title', SUMMARY_LENGTH), detail=_text('revision_number')),
+        _events(OrderMessage, 'message', order_id,
+                actor=F('sender__username'), summary=Left('message', SUMMARY_LENGTH), detail=F('message_type')),
+        _events(OrderDispute, 'dispute', order_id,
+                actor=F('raised_by__username'), summary=F('dispute_type'), detail=F('status')),
+        _events(OrderCancellation, 'cancellation', order_id,
+                actor=F('cancelled_by__username'), summary=F('reason'), detail=_text('refund_amount')),
+    ]
+
+    events = queries[0].union(*queries[1:], all=True).order_by('occurred_at', 'event_id')
+    return [
+        {
+            'type': event['event_type'],
+            'id': event['event_id'],
+            'at': event['occurred_at'],
+            'actor': event['actor'],
+            'summary': event['summary'],
+            'detail': event['detail'],
+        }
+        for event in events
+    ]
+
+
+def get_order_timeline(order):
+    """Timeline of ``order``, served from cache when available"""
+    key = ORDER_TIMELINE_CACHE_KEY.format(order_id=order.pk)
+    timeline = cache.get(key)
+    if timeline is None:
+        timeline = build_order_timeline(order)
+        cache.set(key, timeline, getattr(settings, 'ORDER_TIMELINE_CACHE_TIMEOUT', 600))
+    return timeline
+
+
+def invalidate_order_timeline(order_id):
+    cache.delete(ORDER_TIMELINE_CACHE_KEY.format(order_id=order_id))
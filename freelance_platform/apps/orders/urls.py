@@ -14,6 +14,15 @@ urlpatterns = [
     # 订单基础操作
     path('', views.OrderListAPIView.as_view(), name='order-list'),
     path('create/', views.OrderCreateAPIView.as_view(), name='order-create'),
+    path('bulk-create/', views.OrderBulkCreateAPIView.as_view(), name='order-bulk-create'),
+
+    # 统计和搜索（需在 <slug:slug>/ 之前，否则会被订单详情路由匹配）
+    path('stats/', views.order_stats, name='order-stats'),
+    path('earnings/', views.freelancer_earnings, name='freelancer-earnings'),
+    path('analytics/', views.platform_order_analytics, name='platform-order-analytics'),
+    path('export/<str:dataset>/', views.export_orders, name='order-export'),
+    path('search/', views.search_orders, name='search-orders'),
+
     path('<slug:slug>/', views.OrderDetailAPIView.as_view(), name='order-detail'),
     path('<slug:slug>/status/', views.OrderStatusUpdateAPIView.as_view(), name='order-status-update'),
 
@@ -27,11 +36,7 @@ urlpatterns = [
     path('<slug:slug>/cancel/', views.OrderCancellationAPIView.as_view(), name='order-cancel'),
     path('<slug:slug>/dispute/', views.OrderDisputeCreateAPIView.as_view(), name='order-dispute'),
     path('<slug:slug>/tracking/', views.OrderTrackingAPIView.as_view(), name='order-tracking'),
+    path('<slug:slug>/timeline/', views.order_timeline, name='order-timeline'),
     path('<slug:slug>/confirm-delivery/', views.confirm_delivery, name='confirm-delivery'),
     path('<slug:slug>/request-revision/', views.request_revision, name='request-revision'),
-
-    # 统计和搜索
-    path('stats/', views.order_stats, name='order-stats'),
-    path('earnings/', views.freelancer_earnings, name='freelancer-earnings'),
-    path('search/', views.search_orders, name='search-orders'),
 ]
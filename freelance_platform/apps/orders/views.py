@@ -10,7 +10,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.db import transaction
 from django.db.models import Q, Count, Sum, Avg
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
@@ -20,19 +23,28 @@ from .models import (
     OrderStat, OrderCancellation
 )
 from .serializers import (
-    OrderListSerializer, OrderDetailSerializer, OrderCreateSerializer,
+    OrderListSerializer, OrderDetailSerializer, OrderCreateSerializer, OrderBulkCreateSerializer,
     OrderStatusUpdateSerializer, OrderExtraSerializer,
     OrderRequirementSerializer, DeliverySerializer, OrderMessageSerializer,
-    OrderDisputeSerializer, OrderCancellationSerializer
+    OrderDisputeSerializer, OrderCancellationSerializer, OrderStatsSerializer
 )
 from apps.gigs.models import Gig
-from apps.accounts.permissions import IsClient, IsFreelancer
+from apps.accounts.permissions import IsAdmin, IsClient, IsFreelancer
+from apps.common.pagination import KeysetOptInPagination, KeysetPagination
+from .analytics import summarize_order_stats
+from .exports import EXPORT_CONTENT_TYPES, EXPORT_DATASETS, stream_export
+from .exceptions import OrderTransitionError, StaleOrderStatusError
+from .state_machine import can_transition, transition_order
+from .search import search_orders as search_order_documents
+from .stats import get_freelancer_earnings, get_order_stats
+from .timeline import get_order_timeline
 
 
 class OrderListAPIView(generics.ListAPIView):
     """订单列表API视图"""
     serializer_class = OrderListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetOptInPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['order_number', 'gig__title', 'client__username', 'freelancer__username']
     filterset_fields = ['status', 'priority']
@@ -75,6 +87,22 @@ class OrderCreateAPIView(generics.CreateAPIView):
         serializer.save(client=self.request.user)
 
 
+class OrderBulkCreateAPIView(APIView):
+    """批量下单API视图：一次请求创建多个订单，逐项返回结果"""
+    permission_classes = [permissions.IsAuthenticated, IsClient]
+
+    def post(self, request):
+        serializer = OrderBulkCreateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+
+        created = sum(1 for result in results if result['success'])
+        return Response(
+            {'created': created, 'failed': len(results) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
+
+
 class OrderStatusUpdateAPIView(APIView):
     """订单状态更新API视图"""
     permission_classes = [permissions.IsAuthenticated]
@@ -97,27 +125,24 @@ class OrderStatusUpdateAPIView(APIView):
             )
 
             if serializer.is_valid():
-                with transaction.atomic():
-                    # 更新订单状态
-                    old_status = order.status
-                    new_status = serializer.validated_data['status']
-                    order.status = new_status
-                    order.save()
-
-                    # 创建状态历史记录
-                    OrderStatusHistory.objects.create(
-                        order=order,
-                        old_status=old_status,
-                        new_status=new_status,
-                        changed_by=user,
+                # 状态机校验并原子更新（仅当状态未被并发修改时生效）
+                try:
+                    old_status = transition_order(
+                        order,
+                        serializer.validated_data['status'],
+                        user=user,
                         notes=serializer.validated_data.get('notes', '')
                     )
+                except StaleOrderStatusError as e:
+                    return Response({'error': e.message}, status=status.HTTP_409_CONFLICT)
+                except OrderTransitionError as e:
+                    return Response({'error': e.message}, status=status.HTTP_400_BAD_REQUEST)
 
-                    return Response({
-                        'message': '订单状态更新成功',
-                        'old_status': old_status,
-                        'new_status': new_status
-                    })
+                return Response({
+                    'message': '订单状态更新成功',
+                    'old_status': old_status,
+                    'new_status': order.status
+                })
 
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -155,7 +180,7 @@ class OrderDeliveryListCreateAPIView(generics.ListCreateAPIView):
     def get_queryset(self):
         """获取指定订单的交付记录"""
         order_slug = self.kwargs.get('slug')
-        return Delivery.objects.filter(order__slug=order_slug)
+        return Delivery.objects.filter(order__slug=order_slug).prefetch_related('attachments__stored_file')
 
     def post(self, request, *args, **kwargs):
         # 权限检查：只有自由职业者可以提交交付
@@ -230,7 +255,7 @@ class OrderCancellationAPIView(APIView):
                 )
 
             # 检查订单状态是否允许取消
-            if order.status in ['completed', 'cancelled', 'refunded']:
+            if not can_transition(order.status, 'cancelled'):
                 return Response(
                     {'error': f'订单状态为 {order.status}，无法取消'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -238,24 +263,26 @@ class OrderCancellationAPIView(APIView):
 
             serializer = OrderCancellationSerializer(data=request.data)
             if serializer.is_valid():
-                with transaction.atomic():
-                    # 更新订单状态
-                    order.status = 'cancelled'
-                    order.save()
-
-                    # 创建状态历史记录
-                    OrderStatusHistory.objects.create(
-                        order=order,
-                        old_status='pending',  # 假设之前是待处理状态
-                        new_status='cancelled',
-                        changed_by=user,
-                        notes=f"取消原因: {serializer.validated_data['reason']}"
+                reason = serializer.validated_data['reason']
+                try:
+                    transition_order(
+                        order,
+                        'cancelled',
+                        user=user,
+                        notes=f"取消原因: {reason}",
+                        cancellation_reason=reason,
+                        cancelled_by=user,
+                        cancellation_date=timezone.now()
                     )
+                except StaleOrderStatusError as e:
+                    return Response({'error': e.message}, status=status.HTTP_409_CONFLICT)
+                except OrderTransitionError as e:
+                    return Response({'error': e.message}, status=status.HTTP_400_BAD_REQUEST)
 
-                    return Response({
-                        'message': '订单取消申请已提交',
-                        'order_status': order.status
-                    })
+                return Response({
+                    'message': '订单取消申请已提交',
+                    'order_status': order.status
+                })
 
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -266,66 +293,71 @@ class OrderCancellationAPIView(APIView):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def order_stats(request):
-    """获取用户订单统计"""
-    user = request.user
-
-    if user.user_type == 'client':
-        orders = Order.objects.filter(client=user)
-    elif user.user_type == 'freelancer':
-        orders = Order.objects.filter(freelancer=user)
-    else:
-        orders = Order.objects.none()
+    """获取用户订单统计（单次条件聚合查询，按用户缓存，订单变更时失效）"""
+    return Response(get_order_stats(request.user))
 
-    # 基础统计
-    stats = {
-        'total_orders': orders.count(),
-        'active_orders': orders.filter(status='in_progress').count(),
-        'completed_orders': orders.filter(status='completed').count(),
-        'cancelled_orders': orders.filter(status='cancelled').count(),
-        'total_revenue': orders.filter(status='completed').aggregate(
-            total=Sum('total_price'))['total'] or 0,
-        'pending_orders': orders.filter(status='pending').count(),
-        'disputed_orders': orders.filter(status='disputed').count(),
-    }
 
-    # 按状态分组统计
-    status_stats = orders.values('status').annotate(
-        count=Count('id')
-    ).order_by('status')
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsAdmin])
+def platform_order_analytics(request):
+    """平台订单分析（读取预汇总的每日订单统计）"""
+    try:
+        days = min(int(request.GET.get('days', 30)), 366)
+    except ValueError:
+        return Response({'error': 'days 参数必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
 
-    stats['by_status'] = list(status_stats)
+    start_date = timezone.localdate() - timedelta(days=days)
+    daily_stats = list(OrderStat.objects.filter(date__gte=start_date).order_by('date'))
 
-    return Response(stats)
+    return Response({
+        'period_days': days,
+        'totals': summarize_order_stats(daily_stats),
+        'daily_stats': OrderStatsSerializer(daily_stats, many=True).data
+    })
 
 
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated, IsFreelancer])
-def freelancer_earnings(request):
-    """获取自由职业者收入统计"""
-    freelancer = request.user
-    orders = Order.objects.filter(freelancer=freelancer, status='completed')
-
-    # 收入统计
-    earnings = orders.aggregate(
-        total_earnings=Sum('freelancer_earnings'),
-        avg_order_value=Avg('total_price'),
-        completed_orders=Count('id')
+@permission_classes([permissions.IsAuthenticated, IsAdmin])
+def export_orders(request, dataset):
+    """流式导出订单、交付或状态历史（CSV / NDJSON），内存占用与导出行数无关"""
+    if dataset not in EXPORT_DATASETS:
+        return Response({'error': f'不支持的导出数据: {dataset}'}, status=status.HTTP_404_NOT_FOUND)
+
+    # 不使用 format 参数名，避免与 DRF 的格式后缀冲突
+    export_format = request.GET.get('export_format', 'csv')
+    if export_format not in EXPORT_CONTENT_TYPES:
+        return Response({'error': 'export_format 只能是 csv 或 ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+
+    dates = {}
+    for param in ('start_date', 'end_date'):
+        value = request.GET.get(param)
+        try:
+            dates[param] = parse_date(value) if value else None
+        except ValueError:
+            dates[param] = None
+        if value and dates[param] is None:
+            return Response({'error': f'{param} 格式应为 YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+    statuses = [value for value in request.GET.get('status', '').split(',') if value]
+
+    # 结束日期包含在内
+    lines = stream_export(
+        dataset,
+        export_format,
+        start=dates['start_date'],
+        end=dates['end_date'] + timedelta(days=1) if dates['end_date'] else None,
+        statuses=statuses
     )
+    response = StreamingHttpResponse(lines, content_type=EXPORT_CONTENT_TYPES[export_format])
+    filename = f"{dataset}_{timezone.localdate():%Y%m%d}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
-    # 月度收入趋势
-    monthly_earnings = orders.extra(
-        select={'month': 'strftime("%%Y-%%m", created_at)'}
-    ).values('month').annotate(
-        monthly_total=Sum('freelancer_earnings'),
-        monthly_count=Count('id')
-    ).order_by('month')
 
-    return Response({
-        'total_earnings': earnings['total_earnings'] or 0,
-        'avg_order_value': earnings['avg_order_value'] or 0,
-        'completed_orders': earnings['completed_orders'] or 0,
-        'monthly_trend': list(monthly_earnings)
-    })
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsFreelancer])
+def freelancer_earnings(request):
+    """获取自由职业者收入统计（按月分组的单次查询，按用户缓存）"""
+    return Response(get_freelancer_earnings(request.user))
 
 
 @api_view(['GET'])
@@ -346,24 +378,17 @@ def search_orders(request):
     else:
         base_queryset = Order.objects.all()
 
-    # 执行搜索
-    orders = base_queryset.filter(
-        Q(order_number__icontains=query) |
-        Q(gig__title__icontains=query) |
-        Q(gig__description__icontains=query) |
-        Q(client__username__icontains=query) |
-        Q(freelancer__username__icontains=query) |
-        Q(title__icontains=query)
-    ).select_related('client', 'freelancer', 'gig')
+    # 订单号前缀走 order_number 索引，其余关键词匹配预先生成的搜索文档（PostgreSQL 上有 trigram GIN 索引）
+    orders = search_order_documents(base_queryset, query).select_related('client', 'freelancer', 'gig')
 
-    # 序列化结果
-    serializer = OrderListSerializer(orders, many=True)
+    # 强制分页，单次搜索的开销以页大小为上限
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(orders, request)
+    serializer = OrderListSerializer(page, many=True)
 
-    return Response({
-        'query': query,
-        'count': orders.count(),
-        'results': serializer.data
-    })
+    response = paginator.get_paginated_response(serializer.data)
+    response.data['query'] = query
+    return response
 
 
 class OrderTrackingAPIView(APIView):
@@ -396,6 +421,23 @@ class OrderTrackingAPIView(APIView):
             return Response({'error': '订单不存在'}, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def order_timeline(request, slug):
+    """订单时间线：状态变更、交付、消息、争议和取消按时间合并，一次查询并按订单缓存"""
+    # 订单没有 slug 字段，路由中的 slug 即订单号
+    try:
+        order = Order.objects.only('id', 'client_id', 'freelancer_id').get(order_number=slug)
+    except Order.DoesNotExist:
+        return Response({'error': '订单不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+    user = request.user
+    if not (order.client_id == user.pk or order.freelancer_id == user.pk or user.user_type == 'admin'):
+        return Response({'error': '您没有权限查看此订单'}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response({'order_number': slug, 'events': get_order_timeline(order)})
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def confirm_delivery(request, slug):
@@ -417,26 +459,22 @@ def confirm_delivery(request, slug):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
-            # 更新订单状态
-            order.status = 'completed'
-            order.actual_delivery = timezone.now()
-            order.save()
-
-            # 创建状态历史记录
-            OrderStatusHistory.objects.create(
-                order=order,
-                old_status='delivered',
-                new_status='completed',
-                changed_by=request.user,
-                notes='客户端确认交付完成'
+        try:
+            transition_order(
+                order,
+                'completed',
+                user=request.user,
+                notes='客户端确认交付完成',
+                actual_delivery=timezone.now()
             )
+        except StaleOrderStatusError as e:
+            return Response({'error': e.message}, status=status.HTTP_409_CONFLICT)
 
-            return Response({
-                'message': '交付确认成功，订单已完成',
-                'order_status': order.status,
-                'completed_at': order.actual_delivery
-            })
+        return Response({
+            'message': '交付确认成功，订单已完成',
+            'order_status': order.status,
+            'completed_at': order.actual_delivery
+        })
 
     except Order.DoesNotExist:
         return Response({'error': '订单不存在'}, status=status.HTTP_404_NOT_FOUND)
@@ -470,25 +508,21 @@ def request_revision(request, slug):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
-            # 更新订单状态
-            order.status = 'revision_requested'
-            order.save()
-
-            # 创建状态历史记录
-            OrderStatusHistory.objects.create(
-                order=order,
-                old_status='delivered',
-                new_status='revision_requested',
-                changed_by=request.user,
+        try:
+            transition_order(
+                order,
+                'revision_requested',
+                user=request.user,
                 notes=f'修改请求: {revision_request}'
             )
-
-            return Response({
-                'message': '修改请求已发送',
-                'order_status': order.status,
-                'revision_request': revision_request
-            })
+        except StaleOrderStatusError as e:
+            return Response({'error': e.message}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'message': '修改请求已发送',
+            'order_status': order.status,
+            'revision_request': revision_request
+        })
 
     except Order.DoesNotExist:
         return Response({'error': '订单不存在'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from apps.common.ids import generate_number
 from apps.common.models import BaseModel
 from apps.accounts.models import User
 from apps.orders.models import Order
@@ -234,10 +235,7 @@ class Transaction(BaseModel):
 
     def generate_transaction_id(self):
         """Generate unique transaction ID"""
-        timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-        import random
-        random_num = random.randint(1000, 9999)
-        return f"TXN{timestamp}{random_num}"
+        return generate_number('transaction', 'TXN')
 
     def process_transaction(self):
         """Process the transaction"""
@@ -581,7 +579,4 @@ class PayoutBatch(BaseModel):
 
     def generate_batch_id(self):
         """Generate unique batch ID"""
-        timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-        import random
-        random_num = random.randint(100, 999)
-        return f"PAY{timestamp}{random_num}"
\ No newline at end of file
+        return generate_number('payout_batch', 'PAY')
\ No newline at end of file
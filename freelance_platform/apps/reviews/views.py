@@ -29,12 +29,14 @@ from .serializers import (
     ReviewTemplateSerializer, ReviewStatSerializer, ReviewModerationSerializer,
     ReviewSearchSerializer, ReviewAnalyticsSerializer
 )
+from apps.common.pagination import KeysetOptInPagination
 
 
 class ReviewListAPIView(generics.ListAPIView):
     """评价列表API视图"""
     serializer_class = ReviewListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetOptInPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'content', 'reviewee__username', 'gig__title']
     filterset_fields = ['review_type', 'rating', 'status', 'is_visible']
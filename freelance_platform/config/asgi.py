@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup so the consumers can use the ORM and settings
+from apps.messaging.consumers import RealtimeRouter  # noqa: E402
+
+# Realtime messaging (WebSocket / Server-Sent Events) is served next to the regular Django app
+application = RealtimeRouter(django_application)
@@ -27,6 +27,31 @@ app.conf.beat_schedule = {
         'task': 'apps.accounts.tasks.send_daily_digest',
         'schedule': crontab(hour=8, minute=0),
     },
+    # Flush buffered gig views (Redis buffer backend)
+    'flush-gig-view-buffer': {
+        'task': 'apps.gigs.tasks.flush_gig_view_buffer',
+        'schedule': settings.GIG_VIEW_FLUSH_INTERVAL,
+    },
+    # Flush buffered gig search logs (Redis buffer backend)
+    'flush-gig-search-buffer': {
+        'task': 'apps.gigs.tasks.flush_gig_search_buffer',
+        'schedule': settings.GIG_SEARCH_LOG_FLUSH_INTERVAL,
+    },
+    # Roll gig views/orders/favorites into daily GigStat rows
+    'rollup-gig-statistics': {
+        'task': 'apps.gigs.tasks.rollup_gig_statistics',
+        'schedule': crontab(minute='*/10'),
+    },
+    # Rebuild daily OrderStat rows touched by new orders and status changes
+    'rollup-order-statistics': {
+        'task': 'apps.orders.tasks.rollup_order_statistics',
+        'schedule': crontab(minute='*/10'),
+    },
+    # Remove abandoned chunked uploads
+    'cleanup-file-uploads': {
+        'task': 'apps.files.tasks.cleanup_file_uploads',
+        'schedule': crontab(minute=30),
+    },
 }
 
 @app.task(bind=True)
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'apps.messaging',
     'apps.reviews',
     'apps.common',
+    'apps.files',
     'apps.social_accounts',
 ]
 
@@ -200,6 +201,26 @@ SIMPLE_JWT = {
 # Redis Configuration
 REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 
+# Cache
+# Cached category trees, order stats and order timelines are invalidated on commit,
+# which only reaches every worker when they share one cache. 'locmem' is per process
+# and only suitable for single-process development, so only the SQLite setup defaults to it.
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'redis')
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_REDIS_URL', default=REDIS_URL),
+            'KEY_PREFIX': 'freelance_platform',
+        }
+    }
+
 # Celery Configuration
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=REDIS_URL)
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=REDIS_URL)
@@ -208,6 +229,80 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Business numbers (order numbers etc.): counter values each process reserves per round trip
+ID_BLOCK_SIZE = config('ID_BLOCK_SIZE', default=50, cast=int)
+
+# Gig search backend: 'postgres' (full-text) or 'inverted_index'; empty picks by database vendor
+GIG_SEARCH_BACKEND = config('GIG_SEARCH_BACKEND', default='')
+
+# Gig view tracking
+# 'memory' buffers per process and flushes from a background thread;
+# 'redis' shares one buffer across workers, flushed by the Celery beat task
+GIG_VIEW_BUFFER_BACKEND = config('GIG_VIEW_BUFFER_BACKEND', default='memory')
+GIG_VIEW_FLUSH_INTERVAL = config('GIG_VIEW_FLUSH_INTERVAL', default=10, cast=int)  # seconds
+GIG_VIEW_FLUSH_BATCH_SIZE = config('GIG_VIEW_FLUSH_BATCH_SIZE', default=1000, cast=int)
+GIG_VIEW_BUFFER_MAX_SIZE = config('GIG_VIEW_BUFFER_MAX_SIZE', default=10000, cast=int)
+
+# Gig search logging: same buffer backends as view tracking. Every search counts
+# towards query popularity; only SAMPLE_RATE of them are kept as history rows
+GIG_SEARCH_LOG_BACKEND = config('GIG_SEARCH_LOG_BACKEND', default='memory')
+GIG_SEARCH_LOG_FLUSH_INTERVAL = config('GIG_SEARCH_LOG_FLUSH_INTERVAL', default=10, cast=int)  # seconds
+GIG_SEARCH_LOG_SAMPLE_RATE = config('GIG_SEARCH_LOG_SAMPLE_RATE', default=1.0, cast=float)
+GIG_SEARCH_LOG_BATCH_SIZE = config('GIG_SEARCH_LOG_BATCH_SIZE', default=1000, cast=int)
+GIG_SEARCH_LOG_MAX_SIZE = config('GIG_SEARCH_LOG_MAX_SIZE', default=10000, cast=int)
+
+# Search suggestion index (per process): pick up changed rows every REFRESH_INTERVAL
+# seconds, rebuild from scratch every REBUILD_INTERVAL seconds
+GIG_SUGGESTION_REFRESH_INTERVAL = config('GIG_SUGGESTION_REFRESH_INTERVAL', default=60, cast=int)
+GIG_SUGGESTION_REBUILD_INTERVAL = config('GIG_SUGGESTION_REBUILD_INTERVAL', default=3600, cast=int)
+
+# Gig statistics rollup: rows younger than this many seconds wait for the next run
+GIG_STAT_ROLLUP_LAG = config('GIG_STAT_ROLLUP_LAG', default=60, cast=int)
+
+# Order statistics rollup: orders and status events younger than this many seconds wait for the next run
+ORDER_STAT_ROLLUP_LAG = config('ORDER_STAT_ROLLUP_LAG', default=60, cast=int)
+
+# Category tree cache lifetime in seconds (entries are also dropped when categories or gigs change)
+CATEGORY_TREE_CACHE_TIMEOUT = config('CATEGORY_TREE_CACHE_TIMEOUT', default=7200, cast=int)
+
+# Order dashboard cache lifetime in seconds (entries are also dropped when one of the user's orders changes)
+ORDER_STATS_CACHE_TIMEOUT = config('ORDER_STATS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Order deadline sweeper: remind freelancers this many hours before delivery is due
+ORDER_DEADLINE_REMINDER_HOURS = config('ORDER_DEADLINE_REMINDER_HOURS', default=24, cast=int)
+# Orders read per query and emails per send task
+ORDER_SWEEP_CHUNK_SIZE = config('ORDER_SWEEP_CHUNK_SIZE', default=500, cast=int)
+ORDER_NOTIFICATION_BATCH_SIZE = config('ORDER_NOTIFICATION_BATCH_SIZE', default=100, cast=int)
+
+# Order timeline cache lifetime in seconds (entries are also dropped on every new event)
+ORDER_TIMELINE_CACHE_TIMEOUT = config('ORDER_TIMELINE_CACHE_TIMEOUT', default=600, cast=int)
+
+# Bulk order creation: maximum number of orders accepted per request
+ORDER_BULK_CREATE_MAX_ITEMS = config('ORDER_BULK_CREATE_MAX_ITEMS', default=50, cast=int)
+
+# Streaming order exports: rows fetched per server-side cursor round trip
+ORDER_EXPORT_CHUNK_SIZE = config('ORDER_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Realtime messaging over WebSocket / Server-Sent Events (served by config.asgi).
+# Use the redis pub/sub backend whenever more than one ASGI worker runs.
+MESSAGING_PUBSUB_BACKEND = config('MESSAGING_PUBSUB_BACKEND', default='memory')
+MESSAGING_WEBSOCKET_PATH = '/ws/messaging/'
+MESSAGING_SSE_PATH = '/api/messaging/stream/'
+MESSAGING_HEARTBEAT_INTERVAL = config('MESSAGING_HEARTBEAT_INTERVAL', default=25, cast=int)  # seconds
+
+# Bulk messaging: larger recipient lists are sent by a Celery task, up to the overall cap
+MESSAGING_BULK_SYNC_LIMIT = config('MESSAGING_BULK_SYNC_LIMIT', default=50, cast=int)
+MESSAGING_BULK_MAX_RECIPIENTS = config('MESSAGING_BULK_MAX_RECIPIENTS', default=5000, cast=int)
+
+# Conversation detail embeds only this many recent messages; older ones page through the message list
+MESSAGING_CONVERSATION_MESSAGE_WINDOW = config('MESSAGING_CONVERSATION_MESSAGE_WINDOW', default=50, cast=int)
+
+# Chunked uploads: partial files live on local disk (outside MEDIA_ROOT) until complete, then move to default storage
+FILE_UPLOAD_PARTIAL_DIR = config('FILE_UPLOAD_PARTIAL_DIR', default=str(BASE_DIR / 'tmp' / 'uploads'))
+FILE_UPLOAD_MAX_SIZE = config('FILE_UPLOAD_MAX_SIZE', default=5 * 1024 ** 3, cast=int)  # bytes
+FILE_UPLOAD_MAX_CHUNK_SIZE = config('FILE_UPLOAD_MAX_CHUNK_SIZE', default=8 * 1024 * 1024, cast=int)  # bytes
+FILE_UPLOAD_EXPIRY_HOURS = config('FILE_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
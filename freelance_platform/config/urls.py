@@ -44,6 +44,7 @@ urlpatterns = [
     path('api/payments/', include('apps.payments.urls')),
     path('api/messaging/', include('apps.messaging.urls')),
     path('api/reviews/', include('apps.reviews.urls')),
+    path('api/files/', include('apps.files.urls')),
 ]
 
 # Media and static files